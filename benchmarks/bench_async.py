@@ -0,0 +1,165 @@
+"""
+Concurrency benchmark for the agent: N distinct queries answered at once,
+either as BioinfoAgent.run() calls on a thread pool or as
+BioinfoAgent.arun() tasks on one event loop, against the stub upstreams
+and the fake Gemini client.
+
+    python benchmarks/bench_async.py
+    python benchmarks/bench_async.py -n 64 --threads 8 --threads 32 --mode planner
+
+Reports wall time, throughput, per-query p50 / p95, the most client
+threads alive during the pass (the stub servers' threads are not counted) and
+the sockets the collectors' httpx pool holds open at the end of it. The response cache is off and every query is a
+different gene or rsID, so nothing is served from the cache or coalesced.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+from fake_genai import FakeClient
+from run_benchmarks import load_pipelines, percentile
+from stub_servers import StubCluster
+
+
+def client_threads() -> int:
+    # the stub servers live in this process too; their per-connection handler threads don't count
+    return sum(1 for t in threading.enumerate()
+               if "process_request_thread" not in t.name and not t.name.startswith("stub-"))
+
+
+class ThreadPeak:
+    # samples client_threads() in the background while the pass runs
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak = client_threads()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, client_threads())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        # the sampler itself is not part of the work
+        self.peak -= 1
+
+
+def queries(n: int, start: int = 0) -> List[str]:
+    # alternate genes and SNPs, all distinct
+    return [f"GENE{i}" if i % 2 == 0 else f"rs{100000 + i}" for i in range(start, start + n)]
+
+
+def open_sockets(agent) -> int:
+    # AsyncHttpTransport.pool_stats() covers every loop's client: the background loop's for run(), ours for arun()
+    return sum(host.get("open_connections", 0) for host in agent.ahttp.pool_stats().values())
+
+
+def threaded_pass(agent, items: List[str], mode: str, threads: int) -> Dict[str, float]:
+    latencies: List[float] = []
+
+    def one(query):
+        started = time.perf_counter()
+        result = agent.run(query, mode=mode)
+        latencies.append((time.perf_counter() - started) * 1000)
+        return "error" not in result
+
+    started = time.perf_counter()
+    with ThreadPeak() as peak, ThreadPoolExecutor(max_workers=threads) as pool:
+        ok = sum(pool.map(one, items))
+    return summarize(latencies, time.perf_counter() - started, ok, len(items), peak.peak, open_sockets(agent))
+
+
+def async_pass(agent, items: List[str], mode: str) -> Dict[str, float]:
+    latencies: List[float] = []
+
+    async def one(query):
+        started = time.perf_counter()
+        result = await agent.arun(query, mode=mode)
+        latencies.append((time.perf_counter() - started) * 1000)
+        return "error" not in result
+
+    async def run_all():
+        try:
+            return sum(await asyncio.gather(*(one(q) for q in items))), open_sockets(agent)
+        finally:
+            await agent.ahttp.aclose()
+
+    started = time.perf_counter()
+    with ThreadPeak() as peak:
+        ok, sockets = asyncio.run(run_all())
+    return summarize(latencies, time.perf_counter() - started, ok, len(items), peak.peak, sockets)
+
+
+def summarize(latencies: List[float], wall_s: float, ok: int, total: int, threads: int,
+              sockets: int) -> Dict[str, float]:
+    return {
+        "wall_s": wall_s,
+        "per_s": total / wall_s,
+        "p50_ms": percentile(latencies, 0.5),
+        "p95_ms": percentile(latencies, 0.95),
+        "threads": threads,
+        "sockets": sockets,
+        "failed": total - ok,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="run() on a thread pool vs arun() on one event loop.")
+    parser.add_argument("-n", "--queries", type=int, default=32, help="distinct queries per pass")
+    parser.add_argument("--threads", type=int, action="append", help="thread pool sizes for run() (repeatable)")
+    parser.add_argument("--mode", choices=("direct", "planner"), default="direct")
+    parser.add_argument("--latency-ms", type=float, default=80, help="stub upstream latency")
+    parser.add_argument("--jitter-ms", type=float, default=20, help="stub upstream latency jitter")
+    parser.add_argument("--llm-latency-ms", type=float, default=600, help="fake Gemini time to first token")
+    args = parser.parse_args(argv)
+
+    stubs = StubCluster(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms)
+    env = stubs.start()
+    try:
+        agent_module, _ = load_pipelines(env, use_cache=False)
+        agent = agent_module.BioinfoAgent()
+        agent.client = FakeClient(latency_ms=args.llm_latency_ms)
+
+        passes: Dict[str, Callable[[List[str]], Dict[str, float]]] = {}
+        for threads in args.threads or [8, 32]:
+            passes[f"run(), {threads} threads"] = lambda items, threads=threads: threaded_pass(agent, items, args.mode, threads)
+        passes["arun(), one event loop"] = lambda items: async_pass(agent, items, args.mode)
+
+        # one throwaway query per pass type: imports, Gemini types and connection pools
+        with contextlib.redirect_stdout(io.StringIO()):
+            threaded_pass(agent, queries(1), args.mode, 1)
+            async_pass(agent, queries(1, start=1), args.mode)
+
+        print(f"{args.queries} concurrent {args.mode} queries, upstream {args.latency_ms:.0f} ms, "
+              f"LLM {args.llm_latency_ms:.0f} ms")
+        print(f"{'':<26}{'wall s':>8}{'q/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'threads':>9}{'sockets':>9}{'failed':>8}")
+        for i, (name, run_pass) in enumerate(passes.items()):
+            # fresh queries for every pass so the in-process caches can't help
+            items = queries(args.queries, start=(i + 1) * args.queries)
+            print(f"running {name} ...", file=sys.stderr)
+            with contextlib.redirect_stdout(io.StringIO()):
+                r = run_pass(items)
+            print(f"{name:<26}{r['wall_s']:>8.2f}{r['per_s']:>8.1f}{r['p50_ms']:>9.0f}{r['p95_ms']:>9.0f}"
+                  f"{r['threads']:>9}{r['sockets']:>9}{r['failed']:>8}")
+    finally:
+        stubs.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Cold-start benchmark: how long a fresh process takes to import each app's
+entry module, and how long its first request takes with and without the
+startup prewarm (BioinfoAgent.prewarm / team_GC main.prewarm), against
+the local stub upstreams and the fake Gemini client.
+
+    python benchmarks/bench_cold_start.py
+    python benchmarks/bench_cold_start.py --repeat 7 --latency-ms 40
+
+Every measurement runs in a new interpreter, so nothing is already
+imported or connected. The Gemini client is really built (that cost is
+part of a cold start) but calls go to fake_genai. The stubs are plain
+HTTP on localhost, so TLS and DNS costs of the real upstreams are not in
+the numbers; --latency-ms adds per-request latency.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+MINORS_DIR = os.path.join(ROOT, "team_bioinformatics_minors")
+GC_DIR = os.path.join(ROOT, "team_GC")
+sys.path.insert(0, HERE)
+
+IMPORTS = [
+    ("agent (minors)", MINORS_DIR, "agent"),
+    ("main (team_GC)", GC_DIR, "main"),
+    ("frontend (team_GC)", GC_DIR, "frontend"),
+    ("google.genai, for reference", MINORS_DIR, "google.genai"),
+]
+
+CHILD_IMPORT = """
+import sys, time
+sys.path.insert(0, {dir!r})
+started = time.perf_counter()
+import {module}
+print(time.perf_counter() - started)
+"""
+
+# runs in the child: one pipeline, optional prewarm, then two timed requests
+CHILD_REQUEST = """
+import contextlib, io, json, sys, time
+sys.path.insert(0, {here!r})
+sys.path.insert(0, {dir!r})
+fakes = []
+
+
+def fake():
+    # fake_genai imports google.genai, so it is only loaded where the real client would be
+    if not fakes:
+        from fake_genai import FakeClient
+        fakes.append(FakeClient(latency_ms={llm_latency_ms}, jitter_ms=0))
+    return fakes[0]
+
+
+timings = {{}}
+started = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    if {pipeline!r} == "agent":
+        import agent
+
+        class BenchAgent(agent.BioinfoAgent):
+            @property
+            def client(self):
+                super().client  # builds the real client once, like a cold process would
+                return fake()
+
+        bioinfo = BenchAgent()
+        request = lambda query: bioinfo.run(query, mode="direct")
+        prewarm = bioinfo.prewarm
+    else:
+        import main
+        build = main.build_gemini_client
+        main.build_gemini_client = lambda: (build(), fake())[1]
+        request = lambda query: main.test_in_terminal(query, verbose=False)
+        prewarm = main.prewarm
+    timings["startup_ms"] = (time.perf_counter() - started) * 1000
+    if {prewarm}:
+        started = time.perf_counter()
+        prewarm()
+        timings["prewarm_ms"] = (time.perf_counter() - started) * 1000
+    for key, query in (("first_ms", "TP53"), ("second_ms", "BRCA1")):
+        started = time.perf_counter()
+        request(query)
+        timings[key] = (time.perf_counter() - started) * 1000
+print(json.dumps(timings))
+"""
+
+
+def run_child(code: str, env: Dict[str, str]) -> str:
+    result = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    return result.stdout.strip().splitlines()[-1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import time and first-request latency of fresh processes.")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh processes per measurement, the median is reported")
+    parser.add_argument("--latency-ms", type=float, default=20, help="stub upstream latency")
+    parser.add_argument("--llm-latency-ms", type=float, default=50, help="fake Gemini time to first token")
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ, GEMINI_API_KEY=os.environ.get("GEMINI_API_KEY", "offline-benchmark"),
+               BIOINFO_CACHE_PATH="", GC_SUMMARY_CACHE_PATH="", GC_PREWARM="0")
+
+    print(f"{'import':<30}{'median ms':>11}{'min ms':>9}")
+    for name, directory, module in IMPORTS:
+        samples = [float(run_child(CHILD_IMPORT.format(dir=directory, module=module), env)) * 1000
+                   for _ in range(args.repeat)]
+        print(f"{name:<30}{statistics.median(samples):>11.1f}{min(samples):>9.1f}")
+
+    from stub_servers import StubCluster
+
+    stubs = StubCluster(latency_ms=args.latency_ms, jitter_ms=0)
+    env.update(stubs.start())
+    try:
+        print()
+        print(f"{'first request':<30}{'startup':>9}{'prewarm':>9}{'1st req':>9}{'2nd req':>9}  (median ms)")
+        for pipeline, directory in (("agent", MINORS_DIR), ("team_GC", GC_DIR)):
+            for prewarm in (False, True):
+                code = CHILD_REQUEST.format(here=HERE, dir=directory, pipeline=pipeline, prewarm=prewarm,
+                                            llm_latency_ms=args.llm_latency_ms)
+                runs: List[Dict[str, float]] = [json.loads(run_child(code, env)) for _ in range(args.repeat)]
+
+                def median(key):
+                    values = [run[key] for run in runs if key in run]
+                    return f"{statistics.median(values):>9.1f}" if values else f"{'-':>9}"
+
+                label = f"{pipeline}, {'prewarm' if prewarm else 'no prewarm'}"
+                print(f"{label:<30}{median('startup_ms')}{median('prewarm_ms')}{median('first_ms')}{median('second_ms')}")
+    finally:
+        stubs.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Micro-benchmark for team_GC's MyGene / MyVariant decoding: json.loads plus
+main.normalize_gene_hit / normalize_snp_record on full payloads against the
+same normalizers on payloads cut down by the `fields` projection
+(MYGENE_FIELDS / MYVARIANT_FIELDS) the lookups send.
+
+    python benchmarks/bench_normalizers.py
+    python benchmarks/bench_normalizers.py -n 2000 --repeat 7
+
+Each row is json.loads + normalize for a batch of -n records, best of
+--repeat, plus the payload size. Both payloads are checked to normalize to
+the same output first, so a speed-up never comes from dropping data.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import time
+from typing import Callable, Dict, List
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+GC_DIR = os.path.join(os.path.dirname(HERE), "team_GC")
+sys.path.insert(0, HERE)
+sys.path.insert(0, GC_DIR)
+
+import fixtures
+
+# loaded under another name so it does not shadow team_bioinformatics_minors/main.py
+_spec = importlib.util.spec_from_file_location("team_gc_main", os.path.join(GC_DIR, "main.py"))
+gc_main = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(gc_main)
+
+URL = "https://example.invalid"
+
+
+def payloads(n: int) -> Dict[str, List[str]]:
+    genes = [fixtures.mygene_hit(f"GENE{i}") for i in range(n)]
+    snps = [fixtures.myvariant_record(f"rs{1000 + i}") for i in range(n)]
+    return {
+        "gene_full": [json.dumps(hit) for hit in genes],
+        "gene_projected": [json.dumps(fixtures.project(hit, gc_main.MYGENE_FIELDS)) for hit in genes],
+        "snp_full": [json.dumps(record) for record in snps],
+        "snp_projected": [json.dumps(fixtures.project(record, gc_main.MYVARIANT_FIELDS)) for record in snps],
+    }
+
+
+def check_equivalent(data: Dict[str, List[str]]):
+    for full, projected in zip(data["gene_full"], data["gene_projected"]):
+        assert gc_main.normalize_gene_hit("q", json.loads(projected), URL) == \
+            gc_main.normalize_gene_hit("q", json.loads(full), URL)
+    for full, projected in zip(data["snp_full"], data["snp_projected"]):
+        assert gc_main.normalize_snp_record("rs", json.loads(projected), URL) == \
+            gc_main.normalize_snp_record("rs", json.loads(full), URL)
+
+
+def best_of(fn: Callable[[], None], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Normalizers on full vs field-projected payloads.")
+    parser.add_argument("-n", "--records", type=int, default=1000, help="records per batch")
+    parser.add_argument("--repeat", type=int, default=5, help="timed batches, the best one is reported")
+    args = parser.parse_args(argv)
+
+    data = payloads(args.records)
+    check_equivalent(data)
+
+    normalize_gene = lambda raw: gc_main.normalize_gene_hit("q", raw, URL)
+    normalize_snp = lambda raw: gc_main.normalize_snp_record("rs", raw, URL)
+    cases = [
+        ("gene, full payload", "gene_full", normalize_gene),
+        ("gene, projected", "gene_projected", normalize_gene),
+        ("snp, full payload", "snp_full", normalize_snp),
+        ("snp, projected", "snp_projected", normalize_snp),
+    ]
+    print(f"{'case':<28}{'us/record':>11}{'KiB/record':>12}")
+    for name, key, normalize in cases:
+        batch = data[key]
+        elapsed = best_of(lambda: [normalize(json.loads(payload)) for payload in batch], args.repeat)
+        size = sum(len(payload) for payload in batch) / len(batch) / 1024
+        print(f"{name:<28}{elapsed / len(batch) * 1e6:>11.1f}{size:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
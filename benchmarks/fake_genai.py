@@ -0,0 +1,205 @@
+"""
+Drop-in stand-in for google.genai.Client used by the benchmarks.
+
+Responses are real google.genai.types objects, so the code under test goes
+through exactly the same parsing paths as with Gemini:
+
+* planner calls (config.tools set): the first turn asks for every declared
+  tool with the query as argument, the next turn answers in prose, which
+  makes BioinfoAgent fall back to the data it collected itself;
+* JSON mode (response_mime_type="application/json", team_GC): an object
+  following SUMMARY_SYSTEM_PROMPT's schema, or an array of them for a
+  packed request;
+* anything else: a markdown summary with the four sections the Streamlit
+  app renders, also available through generate_content_stream.
+
+client.aio.models offers the same calls as coroutines (asyncio.sleep
+instead of time.sleep), for BioinfoAgent.arun.
+
+Latency is a fixed time to first token plus a cost per 1k prompt tokens, so
+prompt size changes (pruning, packing) show up in the numbers.
+"""
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from google.genai import types
+
+CHARS_PER_TOKEN = 4
+
+
+class FakeModels:
+    def __init__(self, client: "FakeClient"):
+        self._client = client
+
+    def generate_content(self, model: str, contents: Any, config: Optional[types.GenerateContentConfig] = None):
+        self._client._record(contents)
+        self._client._wait_first_token(contents)
+        if config is not None and config.tools:
+            return _planner_response(contents, config)
+        if config is not None and config.response_mime_type == "application/json":
+            return _text_response(json.dumps(_json_summaries(contents)))
+        text = _markdown_summary(contents)
+        time.sleep(self._client.chunk_ms * len(_split_chunks(text)) / 1000)
+        return _text_response(text)
+
+    def generate_content_stream(self, model: str, contents: Any,
+                                config: Optional[types.GenerateContentConfig] = None) -> Iterator[types.GenerateContentResponse]:
+        self._client._record(contents)
+        self._client._wait_first_token(contents)
+        for i, chunk in enumerate(_split_chunks(_markdown_summary(contents))):
+            if i:
+                time.sleep(self._client.chunk_ms / 1000)
+            yield _text_response(chunk)
+
+
+class FakeAsyncModels:
+    def __init__(self, client: "FakeClient"):
+        self._client = client
+
+    async def generate_content(self, model: str, contents: Any, config: Optional[types.GenerateContentConfig] = None):
+        self._client._record(contents)
+        await asyncio.sleep(self._client._first_token_s(contents))
+        if config is not None and config.tools:
+            return _planner_response(contents, config)
+        if config is not None and config.response_mime_type == "application/json":
+            return _text_response(json.dumps(_json_summaries(contents)))
+        text = _markdown_summary(contents)
+        await asyncio.sleep(self._client.chunk_ms * len(_split_chunks(text)) / 1000)
+        return _text_response(text)
+
+    async def generate_content_stream(self, model: str, contents: Any,
+                                      config: Optional[types.GenerateContentConfig] = None
+                                      ) -> AsyncIterator[types.GenerateContentResponse]:
+        # like the SDK: awaiting the call returns the async iterator
+        self._client._record(contents)
+        await asyncio.sleep(self._client._first_token_s(contents))
+
+        async def chunks():
+            for i, chunk in enumerate(_split_chunks(_markdown_summary(contents))):
+                if i:
+                    await asyncio.sleep(self._client.chunk_ms / 1000)
+                yield _text_response(chunk)
+        return chunks()
+
+
+class FakeAio:
+    def __init__(self, client: "FakeClient"):
+        self.models = FakeAsyncModels(client)
+
+
+class FakeClient:
+    """
+    latency_ms: time to first token, jitter_ms: gaussian jitter on it,
+    ms_per_1k_prompt_tokens: extra wait per 1k prompt tokens,
+    chunk_ms: delay between streamed chunks.
+    """
+
+    def __init__(self, latency_ms: float = 600, jitter_ms: float = 100,
+                 ms_per_1k_prompt_tokens: float = 40, chunk_ms: float = 30):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.ms_per_1k_prompt_tokens = ms_per_1k_prompt_tokens
+        self.chunk_ms = chunk_ms
+        self.calls = 0
+        self.prompt_tokens = 0
+        self._lock = threading.Lock()
+        self.models = FakeModels(self)
+        self.aio = FakeAio(self)
+
+    def _record(self, contents: Any):
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += len(_contents_text(contents)) // CHARS_PER_TOKEN
+
+    def _first_token_s(self, contents: Any) -> float:
+        tokens = len(_contents_text(contents)) // CHARS_PER_TOKEN
+        ms = random.gauss(self.latency_ms, self.jitter_ms) + tokens / 1000 * self.ms_per_1k_prompt_tokens
+        return max(0.0, ms) / 1000
+
+    def _wait_first_token(self, contents: Any):
+        time.sleep(self._first_token_s(contents))
+
+
+def _contents_text(contents: Any) -> str:
+    if isinstance(contents, str):
+        return contents
+    if isinstance(contents, types.Content):
+        return "".join(_part_text(p) for p in contents.parts or [])
+    if isinstance(contents, list):
+        return "".join(_contents_text(c) for c in contents)
+    return str(contents)
+
+
+def _part_text(part: types.Part) -> str:
+    if part.text:
+        return part.text
+    if part.function_response is not None:
+        return json.dumps(part.function_response.response)
+    return ""
+
+
+def _text_response(text: str) -> types.GenerateContentResponse:
+    return types.GenerateContentResponse(candidates=[
+        types.Candidate(content=types.Content(role="model", parts=[types.Part(text=text)]))
+    ])
+
+
+def _planner_response(contents: List[types.Content], config: types.GenerateContentConfig) -> types.GenerateContentResponse:
+    if any(c.role == "tool" for c in contents):
+        return _text_response("All available data has been collected.")
+
+    match = re.search(r"Collect all data for (\S+)", _contents_text(contents[0]))
+    query = match.group(1) if match else ""
+    parts = []
+    for tool in config.tools:
+        for decl in tool.function_declarations or []:
+            args = {name: query for name in (decl.parameters.required or [])}
+            parts.append(types.Part(function_call=types.FunctionCall(name=decl.name, args=args)))
+    return types.GenerateContentResponse(candidates=[
+        types.Candidate(content=types.Content(role="model", parts=parts))
+    ])
+
+
+def _json_summaries(contents: Any) -> Any:
+    # one object per entity, or an array of them when team_GC packs several entities in one request
+    try:
+        payload = json.loads(contents[0] if isinstance(contents, list) else contents)
+    except (TypeError, ValueError):
+        payload = {}
+    if isinstance(payload, list):
+        return [_json_summary(entity) for entity in payload if isinstance(entity, dict)]
+    return _json_summary(payload if isinstance(payload, dict) else {})
+
+
+def _json_summary(entity: Dict[str, Any]) -> Dict[str, Any]:
+    name = entity.get("symbol") or entity.get("rsid") or entity.get("input") or "unknown"
+    return {
+        "input": entity.get("input", name),
+        "entity_type": entity.get("entity_type", "unknown"),
+        "species": "Homo sapiens",
+        "headline": f"{name} summarized from the provided record.",
+        "functional_role": (entity.get("summary") or "unknown")[:400],
+        "disease_associations": [],
+        "notable_details": [f"{k}: {v}" for k, v in list(entity.items())[:4] if isinstance(v, (str, int, float))],
+        "source_list": ["MyGene.info"] if entity.get("entity_type") == "gene" else ["MyVariant.info"],
+    }
+
+
+def _markdown_summary(prompt: Any) -> str:
+    text = _contents_text(prompt)
+    match = re.search(r"# (\S+) - (Gene|SNP) Summary", text)
+    title = f"{match.group(1)} - {match.group(2)} Summary" if match else "Summary"
+    filler = "According to the provided sources, the data describes this entity in some detail. "
+    sections = ["Functional Role", "Disease Associations", "Known Variants and Population Frequency", "Clinical Relevance"]
+    body = "".join(f"## {i}. {name}\n{filler * 6}\n\n" for i, name in enumerate(sections, start=1))
+    return f"# {title}\n\n{body}"
+
+
+def _split_chunks(text: str, words: int = 24) -> List[str]:
+    tokens = re.findall(r"\S+\s*", text)
+    return ["".join(tokens[i:i + words]) for i in range(0, len(tokens), words)]
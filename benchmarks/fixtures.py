@@ -0,0 +1,242 @@
+"""
+Response payloads for the stub upstreams.
+
+Recorded responses (see record_fixtures.py) are replayed from
+benchmarks/fixtures/<service>/<key>.json when present. Everything else is
+generated deterministically from the query, with the same shape as the
+real APIs, so the benchmarks run with no network and no recordings at all.
+"""
+import hashlib
+import json
+import os
+import random
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# genes large enough to stress the tiled variant retrieval (hg38 loci)
+BIG_GENES = {
+    "TTN": ("2", 178525989, 178830802),
+    "DMD": ("X", 31097677, 33339441),
+    "BRCA2": ("13", 32315508, 32400268),
+}
+# variants per kb in generated overlap responses
+VARIANT_DENSITY = {"big": 160, "default": 20}
+
+CONSEQUENCES = [
+    "intron_variant", "intron_variant", "intron_variant", "intron_variant", "synonymous_variant",
+    "3_prime_UTR_variant", "5_prime_UTR_variant", "upstream_gene_variant", "downstream_gene_variant",
+    "missense_variant", "splice_region_variant", "stop_gained", "frameshift_variant", "splice_donor_variant",
+]
+CLIN_SIG = [[], [], [], [], [], [], ["benign"], ["likely_benign"], ["uncertain_significance"], ["likely pathogenic"], ["pathogenic"]]
+
+
+def _seed(*parts) -> int:
+    return int(hashlib.sha1("|".join(map(str, parts)).encode()).hexdigest()[:8], 16)
+
+
+def recorded(service: str, key: str):
+    safe = key.strip("/").replace("/", "_").replace(":", "_") or "root"
+    path = os.path.join(FIXTURE_DIR, service, f"{safe}.json")
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return None
+
+
+def entrez_id(symbol: str) -> str:
+    return str(_seed("entrez", symbol.upper()) % 900000 + 100)
+
+
+def gene_locus(symbol: str):
+    symbol = symbol.upper()
+    if symbol in BIG_GENES:
+        return BIG_GENES[symbol]
+    start = _seed("locus", symbol) % 200_000_000 + 1_000_000
+    return str(_seed("chr", symbol) % 22 + 1), start, start + 40_000
+
+
+def mygene_hit(symbol: str) -> dict:
+    symbol = symbol.upper()
+    chrom, start, end = gene_locus(symbol)
+    gid = entrez_id(symbol)
+    return {
+        "_id": gid,
+        "_score": 90.0,
+        "entrezgene": gid,
+        "symbol": symbol,
+        "name": f"{symbol} protein coding gene",
+        "taxid": 9606,
+        "alias": [f"{symbol}L1", f"{symbol}-AS"],
+        "map_location": f"{chrom}q21.3",
+        "ensembl": {"gene": f"ENSG{int(gid):011d}"},
+        "summary": f"This gene encodes {symbol}. " * 20,
+        "genomic_pos": {"chr": chrom, "start": start, "end": end, "strand": 1},
+        "genomic_pos_hg38": {"chr": chrom, "start": start, "end": end, "strand": 1},
+        "pathway": {
+            "reactome": [{"id": f"R-HSA-{i}", "name": f"{symbol} pathway {i}"} for i in range(12)],
+            "kegg": {"id": "hsa03440", "name": "Homologous recombination"},
+        },
+        "clinvar": {"gene": {"id": gid, "symbol": symbol}},
+    }
+
+
+def myvariant_record(rsid: str) -> dict:
+    rng = random.Random(_seed("myvariant", rsid))
+    chrom = str(rng.randint(1, 22))
+    pos = rng.randint(1_000_000, 200_000_000)
+    ref, alt = rng.sample("ACGT", 2)
+    return {
+        "_id": f"chr{chrom}:g.{pos}{ref}>{alt}",
+        "dbsnp": {
+            "rsid": rsid.lower(), "chrom": chrom, "ref": ref, "alt": alt,
+            "hg19": {"start": pos, "end": pos},
+            "gene": [{"symbol": f"GENE{rng.randint(1, 999)}", "geneid": rng.randint(1, 99999)}],
+        },
+        "clinvar": {
+            "clinical_significance": rng.choice(["Pathogenic", "Benign", "Uncertain significance"]),
+            "rcv": [
+                {
+                    "accession": f"RCV{rng.randint(1, 10**6):09d}",
+                    "clinical_significance": "Pathogenic",
+                    "conditions": {"name": f"Condition {i}", "identifiers": {"medgen": f"C{i:07d}"}},
+                }
+                for i in range(rng.randint(2, 12))
+            ],
+        },
+        "gnomad_genome": {"af": {"af": rng.random() / 10, "af_afr": rng.random() / 10, "af_nfe": rng.random() / 10}},
+        "cadd": {"phred": round(rng.random() * 40, 2), "consequence": "NON_SYNONYMOUS"},
+        # padding that the pruners and field projection are supposed to drop
+        "dbnsfp": {f"score_{i}": rng.random() for i in range(200)},
+    }
+
+
+def project(record: dict, fields: str) -> dict:
+    """Server-side `fields` projection as MyGene / MyVariant do it: dotted paths, lists are kept as lists."""
+    tree: dict = {}
+    for field in fields.split(","):
+        node = tree
+        for key in field.strip().split("."):
+            node = node.setdefault(key, {})
+    projected = _project(record, tree)
+    if "_id" in record:
+        projected["_id"] = record["_id"]
+    return projected
+
+
+def _project(value, tree: dict):
+    if not tree:
+        return value
+    if isinstance(value, list):
+        return [_project(v, tree) for v in value]
+    if not isinstance(value, dict):
+        return value
+    return {key: _project(value[key], sub) for key, sub in tree.items() if key in value}
+
+
+def myvariant_dotfield(record: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in record.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(myvariant_dotfield(value, name + "."))
+        else:
+            flat[name] = value
+    return flat
+
+
+def ensembl_lookup(symbol: str) -> dict:
+    chrom, start, end = gene_locus(symbol)
+    return {
+        "id": f"ENSG{int(entrez_id(symbol)):011d}",
+        "display_name": symbol.upper(),
+        "seq_region_name": chrom,
+        "start": start,
+        "end": end,
+        "strand": 1,
+        "biotype": "protein_coding",
+        "species": "homo_sapiens",
+    }
+
+
+def ensembl_overlap(chrom: str, start: int, end: int, big: bool = False):
+    """Yields variation records for the region, one at a time (the stub streams them)."""
+    density = VARIANT_DENSITY["big" if big else "default"]
+    count = max(1, (end - start + 1) * density // 1000)
+    rng = random.Random(_seed("overlap", chrom, start, end))
+    for i in range(count):
+        pos = start + rng.randint(0, max(0, end - start))
+        ref, alt = rng.sample("ACGT", 2)
+        yield {
+            "id": f"rs{_seed(chrom, start, i) % 10**9}",
+            "feature_type": "variation",
+            "seq_region_name": chrom,
+            "start": pos,
+            "end": pos,
+            "strand": 1,
+            "alleles": [ref, alt],
+            "assembly_name": "GRCh38",
+            "source": "dbSNP",
+            "consequence_type": rng.choice(CONSEQUENCES),
+            "clinical_significance": rng.choice(CLIN_SIG),
+        }
+
+
+def ensembl_vep(rsid: str) -> dict:
+    rng = random.Random(_seed("vep", rsid))
+    chrom = str(rng.randint(1, 22))
+    pos = rng.randint(1_000_000, 200_000_000)
+    return {
+        "id": rsid, "input": rsid, "seq_region_name": chrom, "start": pos, "end": pos,
+        "allele_string": "A/T", "most_severe_consequence": "missense_variant",
+        "colocated_variants": [{"id": rsid, "clin_sig": ["pathogenic"], "frequencies": {"T": {"af": 0.01, "gnomade": 0.004}}}],
+        "transcript_consequences": [
+            {
+                "gene_symbol": f"GENE{i}", "transcript_id": f"ENST{i:011d}", "consequence_terms": ["missense_variant"],
+                "impact": "MODERATE", "amino_acids": "E/V", "protein_start": 7, "canonical": 1 if i == 0 else None,
+                "sift_prediction": "deleterious", "polyphen_prediction": "probably_damaging",
+            }
+            for i in range(rng.randint(3, 15))
+        ],
+    }
+
+
+def ncbi_gene_summary(uid: str) -> dict:
+    return {
+        "uid": uid, "name": f"GENE{uid}", "description": "protein coding gene", "chromosome": "17",
+        "maplocation": "17q21.31", "otheraliases": "A1, A2", "mim": ["113705"],
+        "summary": "Summary text from NCBI Gene. " * 15,
+        "genomicinfo": [{"chrloc": "17", "chrstart": 43125482, "chrstop": 43044294}],
+        "locationhist": [{"annotationrelease": str(i), "chrloc": "17"} for i in range(40)],
+    }
+
+
+def ncbi_snp_summary(uid: str) -> dict:
+    return {
+        "uid": uid, "snp_id": int(uid), "genes": [{"name": "HBB", "gene_id": "3043"}],
+        "clinical_significance": "pathogenic,likely-pathogenic", "chrpos": "11:5227002",
+        "global_mafs": [{"study": "GnomAD", "freq": "T=0.0051/1426"}, {"study": "1000Genomes", "freq": "T=0.0128/64"}],
+        "fxn_class": "missense_variant,coding_sequence_variant", "spdi": "NC_000011.10:5227001:T:A",
+        "docsum": "HGVS=NC_000011.10:g.5227002T>A|SEQ=[T/A]",
+    }
+
+
+def clinicaltables_search(rsid: str) -> list:
+    rng = random.Random(_seed("ct", rsid))
+    return [1, [rsid], None, [[rsid, str(rng.randint(1, 22)), str(rng.randint(10**6, 10**8)), "A/T", "HBB"]]]
+
+
+def uniprot_entry(symbol: str) -> dict:
+    symbol = symbol.upper()
+    return {
+        "primaryAccession": f"P{_seed('uniprot', symbol) % 99999:05d}",
+        "genes": [{"geneName": {"value": symbol}}],
+        "proteinDescription": {"recommendedName": {"fullName": {"value": f"{symbol} protein"}}},
+        "comments": [
+            {"commentType": "FUNCTION", "texts": [{"value": f"{symbol} does important things. " * 5}]},
+            {"commentType": "DISEASE", "disease": {"diseaseId": f"{symbol}-related disorder", "acronym": "XRD",
+                                                   "description": "A disorder."}, "note": {"texts": [{"value": "Note."}]}},
+            {"commentType": "SUBCELLULAR LOCATION", "subcellularLocations": [{"location": {"value": "Nucleus"}}]},
+        ],
+        "features": [{"type": "Domain", "location": {"start": {"value": i}, "end": {"value": i + 10}}} for i in range(300)],
+        "uniProtKBCrossReferences": [{"database": "PDB", "id": f"{i}ABC"} for i in range(1500)],
+    }
@@ -0,0 +1,63 @@
+"""
+Records real upstream responses into benchmarks/fixtures/ so the stubs can
+replay them instead of generated payloads. Needs network access, run it once:
+
+    python benchmarks/record_fixtures.py BRCA1 TP53 TTN rs334 rs7412
+"""
+import json
+import os
+import sys
+
+import requests
+
+from fixtures import FIXTURE_DIR
+
+MYGENE = "https://mygene.info"
+MYVARIANT = "https://myvariant.info"
+ENSEMBL = "https://rest.ensembl.org"
+UNIPROT = "https://rest.uniprot.org"
+JSON = {"Content-Type": "application/json"}
+
+
+def save(service: str, key: str, payload):
+    os.makedirs(os.path.join(FIXTURE_DIR, service), exist_ok=True)
+    path = os.path.join(FIXTURE_DIR, service, f"{key}.json")
+    with open(path, "w") as f:
+        json.dump(payload, f)
+    print(f"saved {path}")
+
+
+def fetch(url: str, **kwargs):
+    response = requests.get(url, timeout=30, **kwargs)
+    response.raise_for_status()
+    return response.json()
+
+
+def record_gene(symbol: str):
+    hits = fetch(f"{MYGENE}/v3/query", params={"q": symbol, "species": "human", "size": 1})
+    save("mygene", f"query_{symbol}", hits)
+    if hits.get("hits"):
+        gene_id = hits["hits"][0]["_id"]
+        save("mygene", f"gene_{gene_id}", fetch(f"{MYGENE}/v3/gene/{gene_id}"))
+    save("ensembl", f"lookup_{symbol}", fetch(f"{ENSEMBL}/lookup/symbol/homo_sapiens/{symbol}", headers=JSON))
+    save("uniprot", f"search_{symbol}", fetch(
+        f"{UNIPROT}/uniprotkb/search",
+        params={"query": f"gene:{symbol} AND organism_id:9606", "format": "json", "size": "1"},
+    ))
+
+
+def record_snp(rs_id: str):
+    save("myvariant", f"variant_{rs_id}", fetch(f"{MYVARIANT}/v1/variant/{rs_id}"))
+    save("ensembl", f"vep_{rs_id}", fetch(f"{ENSEMBL}/vep/homo_sapiens/id/{rs_id}", headers=JSON))
+
+
+def main(queries):
+    for query in queries:
+        if query.lower().startswith("rs"):
+            record_snp(query.lower())
+        else:
+            record_gene(query.upper())
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or ["BRCA1", "TP53", "TTN", "rs334", "rs7412"])
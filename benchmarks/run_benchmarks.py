@@ -0,0 +1,206 @@
+"""
+Offline benchmarks for both pipelines.
+
+Starts the stub upstreams (stub_servers.py), points MYGENE_URL, ENSEMBL_URL,
+... at them, swaps Gemini for fake_genai.FakeClient and then measures every
+scenario three ways:
+
+* latency:    sequential runs, p50 / p90 / p99 / mean in milliseconds
+* throughput: the same number of runs spread over --concurrency threads
+* memory:     one extra run under tracemalloc, peak Python heap in MiB
+
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py -n 50 -c 8 --scenario agent_gene_direct --json out.json
+
+The agent's response cache and team_GC's summary cache are off by default
+so every run goes to the stubs and the fake LLM; pass --cache to measure
+warm runs instead.
+"""
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+MINORS_DIR = os.path.join(ROOT, "team_bioinformatics_minors")
+GC_DIR = os.path.join(ROOT, "team_GC")
+sys.path.insert(0, HERE)
+
+from fake_genai import FakeClient
+from stub_servers import StubCluster
+
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    pos = (len(ordered) - 1) * q
+    low = int(pos)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+
+def load_pipelines(env: Dict[str, str], use_cache: bool):
+    """
+    Imports both apps after the stub URLs are in the environment (the base
+    URLs are read at import time). team_GC/main.py is loaded under another
+    module name so it does not shadow team_bioinformatics_minors/main.py.
+    """
+    os.environ.update(env)
+    os.environ.setdefault("GEMINI_API_KEY", "offline-benchmark")
+    if not use_cache:
+        os.environ["BIOINFO_CACHE_PATH"] = ""
+        os.environ["GC_SUMMARY_CACHE_PATH"] = ""
+
+    sys.path.insert(0, MINORS_DIR)
+    sys.path.insert(0, GC_DIR)
+    import agent
+
+    spec = importlib.util.spec_from_file_location("team_gc_main", os.path.join(GC_DIR, "main.py"))
+    gc_main = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(gc_main)
+    return agent, gc_main
+
+
+def build_scenarios(agent_module, gc_main, llm: FakeClient) -> Dict[str, Callable[[], bool]]:
+    bioinfo = agent_module.BioinfoAgent()
+    bioinfo.client = llm
+
+    def agent_run(query: str, mode: str) -> Callable[[], bool]:
+        def run() -> bool:
+            result = bioinfo.run(query, mode=mode)
+            return "error" not in result and any(v is not None for v in result["raw_data"].values())
+        return run
+
+    def gc_run(query: str) -> Callable[[], bool]:
+        def run() -> bool:
+            return gc_main.test_in_terminal(query, client=llm) != "error"
+        return run
+
+    def gc_batch(queries: List[str], packed: bool) -> Callable[[], bool]:
+        def run() -> bool:
+            records = list(gc_main.run_batch(queries, client=llm, packed=packed))
+            return len(records) == len(queries) and all("summary" in r for r in records)
+        return run
+
+    panel = [f"GENE{i}" for i in range(12)] + [f"rs{5000 + i}" for i in range(12)]
+
+    return {
+        "agent_gene_direct": agent_run("BRCA1", "direct"),
+        "agent_gene_planner": agent_run("BRCA1", "planner"),
+        "agent_snp_direct": agent_run("rs334", "direct"),
+        "agent_snp_planner": agent_run("rs334", "planner"),
+        "agent_big_gene_direct": agent_run("TTN", "direct"),
+        "gc_gene": gc_run("TP53"),
+        "gc_snp": gc_run("rs7412"),
+        "gc_batch": gc_batch(panel, packed=False),
+        "gc_batch_packed": gc_batch(panel, packed=True),
+    }
+
+
+def measure(name: str, fn: Callable[[], bool], iterations: int, concurrency: int,
+            stubs: StubCluster, llm: FakeClient, track_memory: bool) -> Dict[str, Any]:
+    fn()  # warm-up: imports, connection pool, numpy
+    requests_before = sum(stubs.request_counts().values())
+    llm_calls_before = llm.calls
+
+    latencies, failures = [], 0
+    for _ in range(iterations):
+        started = time.perf_counter()
+        ok = fn()
+        latencies.append((time.perf_counter() - started) * 1000)
+        failures += not ok
+
+    upstream_requests = sum(stubs.request_counts().values()) - requests_before
+    llm_calls = llm.calls - llm_calls_before
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        failures += sum(not ok for ok in pool.map(lambda _: fn(), range(iterations)))
+    elapsed = time.perf_counter() - started
+
+    peak_mib = None
+    if track_memory:
+        tracemalloc.start()
+        fn()
+        peak_mib = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+
+    return {
+        "scenario": name,
+        "iterations": iterations,
+        "failures": failures,
+        "p50_ms": round(percentile(latencies, 0.50), 1),
+        "p90_ms": round(percentile(latencies, 0.90), 1),
+        "p99_ms": round(percentile(latencies, 0.99), 1),
+        "mean_ms": round(sum(latencies) / len(latencies), 1),
+        "throughput_rps": round(iterations / elapsed, 2),
+        "concurrency": concurrency,
+        "peak_mib": round(peak_mib, 2) if peak_mib is not None else None,
+        "upstream_requests_per_run": round(upstream_requests / iterations, 1),
+        "llm_calls_per_run": round(llm_calls / iterations, 1),
+    }
+
+
+def print_table(rows: List[Dict[str, Any]]):
+    columns = ["scenario", "p50_ms", "p90_ms", "p99_ms", "mean_ms", "throughput_rps", "peak_mib",
+               "upstream_requests_per_run", "llm_calls_per_run", "failures"]
+    headers = ["scenario", "p50", "p90", "p99", "mean", "runs/s", "peak MiB", "http/run", "llm/run", "fail"]
+    table = [headers] + [["-" if row[c] is None else str(row[c]) for c in columns] for row in rows]
+    widths = [max(len(r[i]) for r in table) for i in range(len(headers))]
+    for i, r in enumerate(table):
+        print("  ".join(cell.ljust(w) if j == 0 else cell.rjust(w) for j, (cell, w) in enumerate(zip(r, widths))))
+        if i == 0:
+            print("  ".join("-" * w for w in widths))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline latency / throughput / memory benchmarks.")
+    parser.add_argument("-n", "--iterations", type=int, default=20, help="runs per scenario and measurement")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="threads for the throughput pass")
+    parser.add_argument("--scenario", action="append", help="only run these scenarios (repeatable)")
+    parser.add_argument("--latency-ms", type=float, default=80, help="stub upstream latency")
+    parser.add_argument("--jitter-ms", type=float, default=20, help="stub upstream latency jitter")
+    parser.add_argument("--llm-latency-ms", type=float, default=600, help="fake Gemini time to first token")
+    parser.add_argument("--cache", action="store_true", help="keep the response and summary caches enabled")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--json", metavar="PATH", help="also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    stubs = StubCluster(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms)
+    env = stubs.start()
+    llm = FakeClient(latency_ms=args.llm_latency_ms)
+    try:
+        agent_module, gc_main = load_pipelines(env, args.cache)
+        scenarios = build_scenarios(agent_module, gc_main, llm)
+        selected = args.scenario or list(scenarios)
+        unknown = set(selected) - set(scenarios)
+        if unknown:
+            parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}; choose from {', '.join(scenarios)}")
+
+        rows = []
+        for name in selected:
+            print(f"running {name} ...", file=sys.stderr)
+            # both pipelines print progress and whole JSON payloads, keep that out of the report
+            with contextlib.redirect_stdout(io.StringIO()):
+                rows.append(measure(name, scenarios[name], args.iterations, args.concurrency,
+                                    stubs, llm, not args.no_memory))
+    finally:
+        stubs.stop()
+
+    print_table(rows)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""
+Local HTTP stand-ins for every upstream API used by the two pipelines.
+
+Each service runs its own ThreadingHTTPServer on 127.0.0.1 (ephemeral
+port) and answers with fixtures.py payloads after a configurable latency
+plus gaussian jitter. StubCluster.start() returns the env vars (MYGENE_URL,
+ENSEMBL_URL, ...) that point the pipelines at the stubs.
+"""
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import fixtures
+
+Route = Tuple[str, "re.Pattern", Callable]
+
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # clients drop streamed responses on purpose once they have enough data
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+
+class StubService:
+    def __init__(self, name: str, env_var: str, routes: List[Route], latency_ms: float, jitter_ms: float):
+        self.name = name
+        self.env_var = env_var
+        self.routes = routes
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.server = _QuietServer(("127.0.0.1", 0), self._handler_class())
+        self.thread = threading.Thread(target=self.server.serve_forever, name=f"stub-{name}", daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def delay(self):
+        seconds = max(0.0, random.gauss(self.latency_ms, self.jitter_ms)) / 1000
+        if seconds:
+            time.sleep(seconds)
+
+    def _handler_class(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _params(self) -> Dict[str, str]:
+                params = {k: v[-1] for k, v in parse_qs(urlsplit(self.path).query).items()}
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    body = self.rfile.read(length).decode()
+                    if "json" in (self.headers.get("Content-Type") or ""):
+                        params["_json"] = json.loads(body)
+                    else:
+                        params.update({k: v[-1] for k, v in parse_qs(body).items()})
+                return params
+
+            def _dispatch(self, method: str):
+                with service._lock:
+                    service.requests += 1
+                path = urlsplit(self.path).path
+                params = self._params()
+                service.delay()
+                for route_method, pattern, handler in service.routes:
+                    match = pattern.fullmatch(path)
+                    if route_method == method and match:
+                        self._send(handler(params, *match.groups()))
+                        return
+                self._send({"error": f"no stub for {method} {path}"}, status=404)
+
+            def _send(self, payload, status: int = 200):
+                if hasattr(payload, "__next__"):
+                    self._send_stream(payload)
+                    return
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_stream(self, items):
+                # chunked JSON array, so clients that parse incrementally actually get to
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                try:
+                    self._chunk(b"[")
+                    buf, first = [], True
+                    for item in items:
+                        buf.append(("" if first else ",") + json.dumps(item))
+                        first = False
+                        if len(buf) >= 500:
+                            self._chunk("".join(buf).encode())
+                            buf = []
+                    self._chunk(("".join(buf) + "]").encode())
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    # client stopped reading early (enough variants found)
+                    self.close_connection = True
+
+            def _chunk(self, data: bytes):
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+        return Handler
+
+
+def _csv(value: str) -> List[str]:
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+def _replay(service: str, path: str, build: Callable):
+    # recorded payload when we have one, generated otherwise
+    saved = fixtures.recorded(service, path)
+    return saved if saved is not None else build()
+
+
+def mygene_routes() -> List[Route]:
+    def query(params):
+        q = params.get("q", "")
+        return _replay("mygene", f"query_{q}", lambda: {"total": 1, "hits": [fixtures.mygene_hit(q)]})
+
+    def gene(params, gid):
+        return _replay("mygene", f"gene_{gid}", lambda: dict(fixtures.mygene_hit(f"GENE{gid}"), _id=gid))
+
+    def bulk(params):
+        return [dict(fixtures.mygene_hit(q), query=q) for q in _csv(params.get("q", ""))]
+
+    return [
+        ("GET", re.compile(r"/v3/query"), query),
+        ("POST", re.compile(r"/v3/query"), bulk),
+        ("GET", re.compile(r"/v3/gene/([^/]+)"), gene),
+    ]
+
+
+def myvariant_routes() -> List[Route]:
+    def shape(params, record):
+        if params.get("fields"):
+            record = fixtures.project(record, params["fields"])
+        return fixtures.myvariant_dotfield(record) if params.get("dotfield") == "true" else record
+
+    def variant(params, rsid):
+        return shape(params, _replay("myvariant", f"variant_{rsid}", lambda: fixtures.myvariant_record(rsid)))
+
+    def bulk(params):
+        out = []
+        for rsid in _csv(params.get("ids", "")):
+            record = fixtures.myvariant_record(rsid)
+            if params.get("fields"):
+                record = fixtures.project(record, params["fields"])
+            if params.get("dotfield") == "true":
+                record = fixtures.myvariant_dotfield(record)
+            out.append(dict(record, query=rsid))
+        return out
+
+    return [
+        ("GET", re.compile(r"/v1/variant/([^/]+)"), variant),
+        ("POST", re.compile(r"/v1/variant"), bulk),
+    ]
+
+
+def ensembl_routes() -> List[Route]:
+    def lookup(params, symbol):
+        return _replay("ensembl", f"lookup_{symbol}", lambda: fixtures.ensembl_lookup(symbol))
+
+    def lookup_bulk(params):
+        return {s: fixtures.ensembl_lookup(s) for s in params.get("_json", {}).get("symbols", [])}
+
+    def overlap_region(params, chrom, start, end):
+        big = any(chrom == c and int(start) <= e and int(end) >= s for c, s, e in fixtures.BIG_GENES.values())
+        return fixtures.ensembl_overlap(chrom, int(start), int(end), big=big)
+
+    def overlap_id(params, gene_id):
+        return fixtures.ensembl_overlap("1", 1_000_000, 1_040_000)
+
+    def vep(params, rsid):
+        return _replay("ensembl", f"vep_{rsid}", lambda: [fixtures.ensembl_vep(rsid)])
+
+    def vep_bulk(params):
+        return [fixtures.ensembl_vep(rsid) for rsid in params.get("_json", {}).get("ids", [])]
+
+    return [
+        ("GET", re.compile(r"/lookup/symbol/homo_sapiens/([^/]+)"), lookup),
+        ("POST", re.compile(r"/lookup/symbol/homo_sapiens"), lookup_bulk),
+        ("GET", re.compile(r"/overlap/region/human/([^:]+):(\d+)-(\d+)"), overlap_region),
+        ("GET", re.compile(r"/overlap/id/([^/]+)"), overlap_id),
+        ("GET", re.compile(r"/vep/homo_sapiens/id/([^/]+)"), vep),
+        ("POST", re.compile(r"/vep/homo_sapiens/id"), vep_bulk),
+    ]
+
+
+def ncbi_routes() -> List[Route]:
+    def esearch(params):
+        term = params.get("term", "").split("[")[0]
+        return {"esearchresult": {"count": "1", "idlist": [fixtures.entrez_id(term)]}}
+
+    def esummary(params):
+        ids = _csv(params.get("id", ""))
+        build = fixtures.ncbi_gene_summary if params.get("db") == "gene" else fixtures.ncbi_snp_summary
+        result = {"uids": ids}
+        result.update({uid: build(uid) for uid in ids})
+        return {"result": result}
+
+    return [
+        ("GET", re.compile(r"/esearch.fcgi"), esearch),
+        ("GET", re.compile(r"/esummary.fcgi"), esummary),
+        ("POST", re.compile(r"/esummary.fcgi"), esummary),
+    ]
+
+
+def clinicaltables_routes() -> List[Route]:
+    def search(params):
+        return fixtures.clinicaltables_search(params.get("terms", ""))
+
+    return [("GET", re.compile(r"/api/snps/v3/search"), search)]
+
+
+def uniprot_routes() -> List[Route]:
+    def search(params):
+        symbol = params.get("query", "").split(" ")[0].replace("gene:", "")
+        return _replay("uniprot", f"search_{symbol}", lambda: {"results": [fixtures.uniprot_entry(symbol)]})
+
+    def entry(params, accession):
+        return fixtures.uniprot_entry(accession)
+
+    return [
+        ("GET", re.compile(r"/uniprotkb/search"), search),
+        ("GET", re.compile(r"/uniprotkb/([^/.]+)(?:\.json)?"), entry),
+    ]
+
+
+SERVICES = {
+    "mygene": ("MYGENE_URL", mygene_routes),
+    "myvariant": ("MYVARIANT_URL", myvariant_routes),
+    "ensembl": ("ENSEMBL_URL", ensembl_routes),
+    "ncbi": ("NCBI_EUTILS_URL", ncbi_routes),
+    "clinicaltables": ("CLINICALTABLES_URL", clinicaltables_routes),
+    "uniprot": ("UNIPROT_URL", uniprot_routes),
+}
+
+
+class StubCluster:
+    def __init__(self, latency_ms: float = 80, jitter_ms: float = 20,
+                 overrides: Optional[Dict[str, Tuple[float, float]]] = None):
+        overrides = overrides or {}
+        self.services = {
+            name: StubService(name, env_var, routes(), *overrides.get(name, (latency_ms, jitter_ms)))
+            for name, (env_var, routes) in SERVICES.items()
+        }
+
+    def start(self) -> Dict[str, str]:
+        for service in self.services.values():
+            service.start()
+        return self.env()
+
+    def env(self) -> Dict[str, str]:
+        return {service.env_var: service.url for service in self.services.values()}
+
+    def request_counts(self) -> Dict[str, int]:
+        return {name: service.requests for name, service in self.services.items()}
+
+    def stop(self):
+        for service in self.services.values():
+            service.stop()
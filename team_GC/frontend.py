@@ -1,9 +1,37 @@
 import main
-from flask import Flask, request, render_template
+from flask import Flask, jsonify, request, render_template
 import json
+import os
+import threading
+from upstream import coalesce_stats, http_pool_stats, upstream_health
 
 app = Flask(__name__)
 
+# at most this many lookups run at once, so a burst of slow Gemini calls queues up instead of
+# piling up sockets; a request still queued after LOOKUP_TIMEOUT seconds gets the error page.
+# A running lookup is bounded by its own HTTP and Gemini timeouts (see main.py)
+MAX_CONCURRENT_LOOKUPS = int(os.environ.get("GC_MAX_CONCURRENT_LOOKUPS", 32))
+LOOKUP_TIMEOUT = float(os.environ.get("GC_LOOKUP_TIMEOUT", 60))
+lookup_slots = threading.BoundedSemaphore(MAX_CONCURRENT_LOOKUPS)
+
+
+# GC_PREWARM=0 turns the startup prewarm off
+PREWARM = os.environ.get("GC_PREWARM", "1") != "0"
+
+
+def warm_up():
+    """
+    This function is starting main.prewarm() (Gemini client, upstream connections, caches)
+    in the background once per process, so the app starts serving right away and the first
+    request finds everything ready.
+    """
+    main.get_http_session()
+    if PREWARM:
+        threading.Thread(target=main.prewarm, name="prewarm", daemon=True).start()
+
+
+warm_up()
+
 def extract_data(json_information):
     extracted_data = {}
     disease_info = ''
@@ -19,15 +47,19 @@ def extract_data(json_information):
     for source in json_information['source_list']:
         sources += source + "<br />"
 
-    print(sources)
     extracted_data.update(diseases=disease_info, entity_type=json_information['entity_type'], functional_role=json_information['functional_role'], headline=json_information['headline'], notable_details=not_details, source_list=sources, species=json_information['species'])
     return extracted_data
 
 @app.route("/", methods=["GET", "POST"])
 def start():
     if request.method == "POST":
-        string = request.form.get("fgene")
-        json_info=main.test_in_terminal(string)
+        string = request.form.get("fgene", "")
+        json_info = 'error'
+        if lookup_slots.acquire(timeout=LOOKUP_TIMEOUT):
+            try:
+                json_info = main.test_in_terminal(string, None, False)
+            finally:
+                lookup_slots.release()
 
         if json_info == 'error':
             return render_template('error_template.html')
@@ -35,3 +67,24 @@ def start():
             gene_dict = extract_data(json_info)
             return render_template('results_template.html', gene_dict=gene_dict)
     return render_template("begin_temp.html")
+
+
+
+@app.route("/health")
+def health():
+    """
+    This function is reporting the circuit state and recent error rate / latency of every
+    upstream, plus the connection pools and coalesced lookups. "degraded" means at least
+    one upstream is being skipped.
+    """
+    upstreams = upstream_health()
+    degraded = any(stats["state"] != "closed" for stats in upstreams.values())
+    return jsonify({
+        "status": "degraded" if degraded else "ok",
+        "upstreams": upstreams,
+        "http_pools": http_pool_stats(),
+        "coalesced": coalesce_stats(),
+    })
+
+if __name__ == "__main__":
+    app.run(threaded=True)
@@ -1,10 +1,40 @@
 import os
+import sys
 import json
+import time
+import argparse
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from typing import Any, Dict, List
 
-import requests
-from google import genai
-from google.genai import types
+from summary_cache import for_input, get_summary_cache, summary_cache_key
+from upstream import UpstreamUnavailable, call_upstream, coalesce, get_http_session, get_local_variant
+
+# base URLs can be pointed at local stubs (see benchmarks/)
+MYGENE_URL = os.environ.get("MYGENE_URL", "https://mygene.info")
+MYVARIANT_URL = os.environ.get("MYVARIANT_URL", "https://myvariant.info")
+
+# server-side field projection: the APIs only send what normalize_gene_hit / normalize_snp_record read
+MYGENE_FIELDS = ("symbol,name,entrezgene,ensembl.gene,map_location,genomic_pos.chr,genomic_pos.start,"
+                 "genomic_pos.end,genomic_pos.strand,alias,summary,taxid")
+MYVARIANT_FIELDS = ("dbsnp.rsid,dbsnp.chrom,dbsnp.hg19.start,dbsnp.ref,dbsnp.alt,dbsnp.gene.symbol,"
+                    "clinvar.clinical_significance,clinvar.rcv.conditions.name")
+# max ids per POST on the MyGene / MyVariant bulk endpoints
+BATCH_SIZE = 1000
+SUMMARY_MODEL = "models/gemini-2.5-flash"
+# one entity's summary call is given up after this many seconds, so a stuck Gemini call can't hold a lookup forever
+SUMMARY_TIMEOUT_S = float(os.environ.get("GC_SUMMARY_TIMEOUT_S", 45))
+# packed summaries: entity JSON per request (~4 characters per token) and the response size we plan for each entity
+PACK_TOKEN_BUDGET = int(os.environ.get("GC_PACK_TOKEN_BUDGET", 8000))
+PACK_MAX_OUTPUT_TOKENS = int(os.environ.get("GC_PACK_MAX_OUTPUT_TOKENS", 12000))
+PACK_OUTPUT_TOKENS_PER_ENTITY = 600
+PACK_RETRIES = 2
+# a packed summary call gets SUMMARY_TIMEOUT_S plus this much per entity after the first, as its answer grows with the pack
+PACK_TIMEOUT_PER_ENTITY_S = float(os.environ.get("GC_PACK_TIMEOUT_PER_ENTITY_S", 10))
+CHARS_PER_TOKEN = 4
+
+_client = None
+_client_lock = threading.Lock()
 
 
 def classify_user_input(raw_text):
@@ -25,15 +55,25 @@ def classify_user_input(raw_text):
 def get_gene_data_from_mygene(gene_query):
     """
     This function is calling MyGene.info and is returning a normalized gene dict.
+    Concurrent lookups of the same query share a single request, and while MyGene.info's
+    circuit is open the lookup fails at once with UpstreamUnavailable.
     """
-    url = "https://mygene.info/v3/query"
+    return coalesce(("mygene", gene_query),
+                    lambda: call_upstream("mygene", lambda: fetch_gene_data_from_mygene(gene_query)))
+
+
+def fetch_gene_data_from_mygene(gene_query):
+    """
+    This function is doing the actual MyGene.info request for get_gene_data_from_mygene.
+    """
+    url = f"{MYGENE_URL}/v3/query"
     params = {
         "q": gene_query,
-        "fields": "symbol,name,entrezgene,ensembl.gene,summary,genomic_pos,map_location,alias,taxid",
+        "fields": MYGENE_FIELDS,
         "size": 5,
     }
 
-    response = requests.get(url, params=params, timeout=10)
+    response = get_http_session().get(url, params=params, timeout=10)
     response.raise_for_status()
     data = response.json()
 
@@ -41,8 +81,13 @@ def get_gene_data_from_mygene(gene_query):
     if not hits:
         raise ValueError(f"No gene hits found for query: {gene_query}")
 
-    gene_hit = hits[0]
+    return normalize_gene_hit(gene_query, hits[0], response.url)
 
+
+def normalize_gene_hit(gene_query, gene_hit, query_url):
+    """
+    This function is turning one MyGene.info hit into the normalized gene dict.
+    """
     genomic_pos = gene_hit.get("genomic_pos") or {}
     if isinstance(genomic_pos, list) and genomic_pos:
         genomic_pos = genomic_pos[0]
@@ -83,7 +128,7 @@ def get_gene_data_from_mygene(gene_query):
         "trait_associations": [],
         "source_metadata": {
             "primary_source": "MyGene.info",
-            "mygene_query_url": response.url,
+            "mygene_query_url": query_url,
         },
     }
 
@@ -93,9 +138,25 @@ def get_gene_data_from_mygene(gene_query):
 def get_snp_data_from_myvariant(rs_id):
     """
     This function is calling MyVariant.info for an rsID and is returning a normalized SNP dict.
+    Concurrent lookups of the same rsID share a single request. When MyVariant.info fails, has
+    no record or its circuit is open, the rsID is answered from the local variant store if it is there.
     """
-    url = f"https://myvariant.info/v1/variant/{rs_id}"
-    resp = requests.get(url, timeout=10)
+    try:
+        return coalesce(("myvariant", rs_id),
+                        lambda: call_upstream("myvariant", lambda: fetch_snp_data_from_myvariant(rs_id)))
+    except Exception:
+        local_variant = get_local_variant(rs_id)
+        if local_variant is None:
+            raise
+        return normalize_local_snp_record(rs_id, local_variant)
+
+
+def fetch_snp_data_from_myvariant(rs_id):
+    """
+    This function is doing the actual MyVariant.info request for get_snp_data_from_myvariant.
+    """
+    url = f"{MYVARIANT_URL}/v1/variant/{rs_id}"
+    resp = get_http_session().get(url, params={"fields": MYVARIANT_FIELDS}, timeout=10)
 
     if resp.status_code == 404:
         raise ValueError(f"No SNP found for query: {rs_id}")
@@ -113,6 +174,13 @@ def get_snp_data_from_myvariant(rs_id):
         # picking the first variant in the list
         raw_data = raw_data[0]
 
+    return normalize_snp_record(rs_id, raw_data, resp.url)
+
+
+def normalize_snp_record(rs_id, raw_data, record_url):
+    """
+    This function is turning one MyVariant.info record into the normalized SNP dict.
+    """
     dbsnp_block = raw_data.get("dbsnp") or {}
     if not isinstance(dbsnp_block, dict):
         dbsnp_block = {}
@@ -186,13 +254,122 @@ def get_snp_data_from_myvariant(rs_id):
         "functional_summary_raw": None,
         "source_metadata": {
             "primary_source": "MyVariant.info",
-            "myvariant_url": resp.url,
+            "myvariant_url": record_url,
         },
     }
 
     return normalized_snp
 
 
+def normalize_local_snp_record(rs_id, local_variant):
+    """
+    This function is turning a local variant store row into the same normalized SNP dict
+    as normalize_snp_record. The position is on the assembly the store was built from.
+    """
+    assembly = (local_variant.get("assembly") or "").lower()
+    position_key = "position_hg19" if "grch37" in assembly or "hg19" in assembly else "position_hg38"
+
+    clinical_significance_list = []
+    conditions = local_variant.get("conditions")
+    if local_variant.get("clinical_significance") or conditions:
+        clinical_significance_list.append(
+            {
+                "source": "ClinVar",
+                "value": local_variant.get("clinical_significance"),
+                "conditions": sorted(set(conditions.split("|"))) if conditions else [],
+            }
+        )
+
+    return {
+        "input": rs_id,
+        "entity_type": "snp",
+        "species_detected": "Homo sapiens",
+        "basic_info": {
+            "rsid": local_variant["rsid"],
+            "chromosome": local_variant.get("chromosome"),
+            position_key: local_variant.get("position"),
+            "ref_allele": local_variant.get("ref"),
+            "alt_allele": local_variant.get("alt"),
+            "gene_symbol": local_variant.get("gene"),
+        },
+        "clinical_significance": clinical_significance_list,
+        "trait_associations": [],
+        "functional_summary_raw": None,
+        "source_metadata": {
+            "primary_source": "local variant store",
+            "assembly": local_variant.get("assembly"),
+        },
+    }
+
+
+def post_bulk_query(url, data):
+    """
+    This function is sending one bulk POST and is raising on error responses.
+    """
+    response = get_http_session().post(url, data=data, timeout=30)
+    response.raise_for_status()
+    return response
+
+
+def get_genes_from_mygene_batch(gene_queries):
+    """
+    This function is calling the MyGene.info bulk endpoint (POST /v3/query) for many symbols at once
+    and is returning {query: normalized gene dict, or None when nothing was found}.
+    """
+    url = f"{MYGENE_URL}/v3/query"
+    results = {}
+
+    for start in range(0, len(gene_queries), BATCH_SIZE):
+        chunk = gene_queries[start:start + BATCH_SIZE]
+        response = call_upstream("mygene_bulk", lambda: post_bulk_query(
+            url, {"q": ",".join(chunk), "scopes": "symbol", "species": "human", "fields": MYGENE_FIELDS},
+        ))
+
+        for hit in response.json():
+            query = hit.get("query")
+            # several hits can come back for one query, the first one is the best scored
+            if hit.get("notfound") or results.get(query) is not None:
+                continue
+            results[query] = normalize_gene_hit(query, hit, response.url)
+
+    return {query: results.get(query) for query in gene_queries}
+
+
+def get_snps_from_myvariant_batch(rs_ids):
+    """
+    This function is calling the MyVariant.info bulk endpoint (POST /v1/variant) for many rsIDs at once
+    and is returning {rsID: normalized SNP dict, None when nothing was found, or the exception when
+    the request failed}. Like the single lookup, rsIDs MyVariant.info has no answer for are taken
+    from the local variant store when they are in it.
+    """
+    url = f"{MYVARIANT_URL}/v1/variant"
+    results = {}
+
+    for start in range(0, len(rs_ids), BATCH_SIZE):
+        chunk = rs_ids[start:start + BATCH_SIZE]
+        try:
+            response = call_upstream("myvariant_bulk", lambda: post_bulk_query(
+                url, {"ids": ",".join(chunk), "fields": MYVARIANT_FIELDS},
+            ))
+        except Exception as fetch_error:
+            results.update((rs_id, fetch_error) for rs_id in chunk)
+            continue
+
+        for record in response.json():
+            query = record.get("query")
+            # picking the first variant for each rsID, same as the single lookup
+            if record.get("notfound") or results.get(query) is not None:
+                continue
+            results[query] = normalize_snp_record(query, record, response.url)
+
+    for rs_id in rs_ids:
+        if results.get(rs_id) is None or isinstance(results[rs_id], Exception):
+            local_variant = get_local_variant(rs_id)
+            if local_variant is not None:
+                results[rs_id] = normalize_local_snp_record(rs_id, local_variant)
+    return {rs_id: results.get(rs_id) for rs_id in rs_ids}
+
+
 #Configuring LLM
 
 SUMMARY_SYSTEM_PROMPT = """
@@ -241,6 +418,34 @@ Rules:
 - If there are no notable details beyond basic ID and location, return an empty list for 'notable_details'.
 """
 
+PACKED_PROMPT_NOTE = """
+Packed requests:
+Instead of a single object you may receive a JSON array of such objects. Then respond with a JSON array that
+contains exactly one summary object per input object, each following the schema above, and copy every object's
+"input" unchanged so each summary can be matched to its object. Summarize every object on its own; never use facts
+from one object in the summary of another.
+"""
+
+# what every summary object must contain, used to validate packed responses element by element
+SUMMARY_FIELDS = {
+    "input": str,
+    "entity_type": str,
+    "species": str,
+    "headline": str,
+    "functional_role": str,
+    "disease_associations": list,
+    "notable_details": list,
+    "source_list": list,
+}
+
+
+def genai_types():
+    """
+    This function is returning google.genai.types, imported on first use like the client.
+    """
+    from google.genai import types
+    return types
+
 
 def build_gemini_client():
     """
@@ -251,40 +456,235 @@ def build_gemini_client():
     if not api_key:
         raise RuntimeError("Gemini API key is missing. Set GOOGLE_API_KEY or GEMINI_API_KEY in your environment.")
 
+    # imported here rather than at module load: google.genai alone takes ~0.5 s to import
+    from google import genai
     client = genai.Client(api_key=api_key)
     return client
 
 
+def get_gemini_client():
+    """
+    This function is returning the process-wide Gemini client, built on first use,
+    so a server process does not open a new client for every request.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = build_gemini_client()
+        return _client
+
+
+def prewarm():
+    """
+    This function is paying the one-off startup costs before the first lookup: it builds the
+    Gemini client, opens a pooled connection to MyGene.info and MyVariant.info with a HEAD
+    request and opens the summary cache and local variant store. The steps run concurrently;
+    it is returning each step's duration in ms, failed steps are reported and skipped.
+    """
+    steps = {
+        "gemini_client": get_gemini_client,
+        "mygene": lambda: get_http_session().head(MYGENE_URL, timeout=5, allow_redirects=False).close(),
+        "myvariant": lambda: get_http_session().head(MYVARIANT_URL, timeout=5, allow_redirects=False).close(),
+        "summary_cache": get_summary_cache,
+        "variant_store": lambda: get_local_variant("rs7412"),
+    }
+
+    def timed(step):
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception as prewarm_error:
+            print(f"prewarm error: {prewarm_error}", file=sys.stderr)
+        return round((time.perf_counter() - started) * 1000, 3)
+
+    with ThreadPoolExecutor(max_workers=len(steps)) as pool:
+        futures = {name: pool.submit(timed, step) for name, step in steps.items()}
+    return {name: future.result() for name, future in futures.items()}
+
+
 def summarize_bio_entity(normalized_entity, client):
     """
     This function is sending the normalized entity to Gemini and is returning the parsed JSON summary.
+    Summaries are cached under a hash of the entity, the system prompt and the model,
+    so an unchanged record is only ever summarized once, also when several requests
+    ask for it at the same moment.
     """
-    entity_text = json.dumps(normalized_entity)
+    system_prompt = SUMMARY_SYSTEM_PROMPT.strip()
+    cache = get_summary_cache()
+    cache_key = summary_cache_key(normalized_entity, system_prompt, SUMMARY_MODEL)
+    if cache is not None:
+        cached_summary = cache.get(cache_key)
+        if cached_summary is not None:
+            return for_input(cached_summary, normalized_entity)
+
+    def generate():
+        entity_text = json.dumps(normalized_entity)
+
+        response = client.models.generate_content(
+            model=SUMMARY_MODEL,
+            contents=[entity_text],
+            config=genai_types().GenerateContentConfig(
+                system_instruction=system_prompt,
+                response_mime_type="application/json",
+                # HttpOptions timeout is in milliseconds
+                http_options=genai_types().HttpOptions(timeout=int(SUMMARY_TIMEOUT_S * 1000)),
+            ),
+        )
+
+        summary_text = response.text.strip()
+        summary = json.loads(summary_text)
+        if cache is not None:
+            cache.put(cache_key, summary)
+        return summary
+
+    # the same entity being summarized for another request right now: wait for that call
+    return for_input(coalesce(("summary", cache_key), generate), normalized_entity)
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
 
+def pack_entities(normalized_entities, token_budget=PACK_TOKEN_BUDGET, max_output_tokens=PACK_MAX_OUTPUT_TOKENS):
+    """
+    This function is splitting entities into packs for summarize_bio_entities: a pack is closed
+    when its entity JSON would go over token_budget or when the expected answer would go over
+    max_output_tokens. An entity bigger than the budget gets a pack of its own.
+    """
+    max_entities = max(1, max_output_tokens // PACK_OUTPUT_TOKENS_PER_ENTITY)
+    packs, current, used = [], [], 0
+    for entity in normalized_entities:
+        tokens = estimate_tokens(json.dumps(entity))
+        if current and (used + tokens > token_budget or len(current) >= max_entities):
+            packs.append(current)
+            current, used = [], 0
+        current.append(entity)
+        used += tokens
+    if current:
+        packs.append(current)
+    return packs
+
+
+def validate_summary(summary, normalized_entity):
+    """
+    This function is checking one summary from a packed response against the schema and its entity
+    and is returning what is wrong with it, or None when it is fine.
+    """
+    if not isinstance(summary, dict):
+        return "summary is not a JSON object"
+    for field, expected_type in SUMMARY_FIELDS.items():
+        if not isinstance(summary.get(field), expected_type):
+            return f"'{field}' is missing or not a {expected_type.__name__}"
+    if str(summary["entity_type"]).lower() != normalized_entity["entity_type"]:
+        return f"entity_type is {summary['entity_type']!r}, expected {normalized_entity['entity_type']!r}"
+    return None
+
+
+def summarize_pack(pack, client):
+    """
+    This function is sending several normalized entities to Gemini in one request and is returning
+    ({input: summary} for the valid answers, {input: error message} for the rest).
+    """
+    timeout_s = SUMMARY_TIMEOUT_S + PACK_TIMEOUT_PER_ENTITY_S * (len(pack) - 1)
     response = client.models.generate_content(
-        model="models/gemini-2.5-flash",
-        contents=[entity_text],
-        config=types.GenerateContentConfig(
-            system_instruction=SUMMARY_SYSTEM_PROMPT.strip(),
+        model=SUMMARY_MODEL,
+        contents=[json.dumps(pack)],
+        config=genai_types().GenerateContentConfig(
+            system_instruction=SUMMARY_SYSTEM_PROMPT.strip() + "\n" + PACKED_PROMPT_NOTE,
             response_mime_type="application/json",
+            # HttpOptions timeout is in milliseconds
+            http_options=genai_types().HttpOptions(timeout=int(timeout_s * 1000)),
         ),
     )
-
-    summary_text = response.text.strip()
-    return json.loads(summary_text)
-
+    try:
+        answers = json.loads(response.text.strip())
+    except ValueError as parse_error:
+        return {}, {entity["input"]: f"response is not valid JSON: {parse_error}" for entity in pack}
+    if not isinstance(answers, list):
+        return {}, {entity["input"]: "response is not a JSON array" for entity in pack}
+
+    by_input = {}
+    for answer in answers:
+        if isinstance(answer, dict) and isinstance(answer.get("input"), str):
+            by_input.setdefault(answer["input"], answer)
+
+    summaries, errors = {}, {}
+    for entity in pack:
+        answer = by_input.get(entity["input"])
+        problem = "no summary returned" if answer is None else validate_summary(answer, entity)
+        if problem:
+            errors[entity["input"]] = problem
+        else:
+            summaries[entity["input"]] = answer
+    return summaries, errors
 
 
-def test_in_terminal(user_query):
+def summarize_bio_entities(normalized_entities, client, token_budget=PACK_TOKEN_BUDGET, retries=PACK_RETRIES):
+    """
+    This function is summarizing many entities with as few Gemini calls as the token budget allows
+    and is returning {input: summary, or the exception for entities that could not be summarized}.
+    Cached summaries are used as is, every element of a packed answer is validated, and only the
+    entities with a missing or invalid answer are sent again, up to `retries` more times.
+    Summaries are cached under the same key as summarize_bio_entity.
+    """
+    system_prompt = SUMMARY_SYSTEM_PROMPT.strip()
+    cache = get_summary_cache()
+    results, keys, todo = {}, {}, []
+    for entity in normalized_entities:
+        keys[entity["input"]] = summary_cache_key(entity, system_prompt, SUMMARY_MODEL)
+        cached_summary = cache.get(keys[entity["input"]]) if cache is not None else None
+        if cached_summary is not None:
+            results[entity["input"]] = for_input(cached_summary, entity)
+        else:
+            todo.append(entity)
+
+    errors = {}
+    for attempt in range(retries + 1):
+        if not todo:
+            break
+        failed = []
+        for pack in pack_entities(todo, token_budget):
+            if len(pack) == 1:
+                # nothing to pack: the regular single-entity call (also joins an identical call in flight)
+                try:
+                    results[pack[0]["input"]] = summarize_bio_entity(pack[0], client)
+                except Exception as llm_error:
+                    errors[pack[0]["input"]] = str(llm_error)
+                    failed.append(pack[0])
+                continue
+            try:
+                summaries, pack_errors = summarize_pack(pack, client)
+            except Exception as llm_error:
+                summaries, pack_errors = {}, {entity["input"]: str(llm_error) for entity in pack}
+            for query, summary in summaries.items():
+                results[query] = summary
+                if cache is not None:
+                    cache.put(keys[query], summary)
+            errors.update(pack_errors)
+            failed.extend(entity for entity in pack if entity["input"] in pack_errors)
+        todo = failed
+
+    for entity in todo:
+        results[entity["input"]] = ValueError(errors.get(entity["input"], "no summary returned"))
+    return results
+
+
+
+def test_in_terminal(user_query, client=None, verbose=True):
     '''
+    verbose=False keeps the pipeline quiet (no error messages or JSON dumps on stdout),
+    which is what the web frontend uses.
+
     user_query = input("Enter a gene symbol or SNP rsID (e.g., TP53 or rs7412): ").strip()
     if not user_query:
         print("Empty input, exiting.")
         return
     '''
+    log = print if verbose else (lambda *args: None)
+
     kind = classify_user_input(user_query)
     if kind == "unknown":
-        print("Could not classify input as gene or SNP.")
+        log("Could not classify input as gene or SNP.")
         return 'error'
 
     try:
@@ -293,27 +693,310 @@ def test_in_terminal(user_query):
         else:
             normalized_entity = get_snp_data_from_myvariant(user_query)
     except Exception as fetch_error:
-        print(f"Error while fetching data: {fetch_error}")
+        log(f"Error while fetching data: {fetch_error}")
         return 'error'
 
     try:
-        client = build_gemini_client()
+        if client is None:
+            client = get_gemini_client()
         summary = summarize_bio_entity(normalized_entity, client)
     except Exception as llm_error:
-        print(f"Error during LLM summarization: {llm_error}")
-        print("Here is the normalized JSON for debugging:")
-        print(json.dumps(normalized_entity, indent=2))
+        log(f"Error during LLM summarization: {llm_error}")
+        if verbose:
+            log("Here is the normalized JSON for debugging:")
+            log(json.dumps(normalized_entity, indent=2))
         return 'error'
 
-
-    print("\n------------- LLM summary ---------------")
-    print(json.dumps(summary, indent=2))
-    print("\n------------- Normalized JSON ---------------")
-    print(json.dumps(normalized_entity, indent=2))
+    if verbose:
+        log("\n------------- LLM summary ---------------")
+        log(json.dumps(summary, indent=2))
+        log("\n------------- Normalized JSON ---------------")
+        log(json.dumps(normalized_entity, indent=2))
 
     return summary
     
 
+def run_batch(user_queries, client=None, max_workers=8, chunk_size=BATCH_SIZE, packed=False,
+              pack_token_budget=PACK_TOKEN_BUDGET):
+    """
+    This function is looking up many gene symbols / rsIDs through the bulk endpoints,
+    summarizing them concurrently and yielding one record per query as soon as it is ready.
+    Queries are fetched chunk_size at a time, and the next chunk is fetched while the
+    summaries of the previous one are still running, so thousands of queries never sit
+    in memory or wait on a single huge fetch. Each summarized record has "timings"
+    (fetch_ms for its chunk's bulk fetch, summary_ms for its LLM call and total_ms from the
+    start of its chunk's fetch until it is yielded, time spent waiting for a worker included).
+    With packed=True several entities share one Gemini call (see summarize_bio_entities).
+    """
+    queries = list(dict.fromkeys(q.strip() for q in user_queries if q and q.strip()))
+    kinds = {query: classify_user_input(query) for query in queries}
+    fetches = [
+        ("gene", get_genes_from_mygene_batch),
+        ("snp", get_snps_from_myvariant_batch),
+    ]
+
+    def timed_summaries(entities):
+        started = time.perf_counter()
+        if packed:
+            summaries = summarize_bio_entities(entities, client, token_budget=pack_token_budget)
+        else:
+            summaries = {}
+            for entity in entities:
+                try:
+                    summaries[entity["input"]] = summarize_bio_entity(entity, client)
+                except Exception as llm_error:
+                    summaries[entity["input"]] = llm_error
+        return summaries, (time.perf_counter() - started) * 1000
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = {}
+        in_flight = 0
+
+        def finished(futures):
+            nonlocal in_flight
+            for future in futures:
+                entities, fetch_ms, chunk_started = pending.pop(future)
+                in_flight -= len(entities)
+                try:
+                    summaries, summary_ms = future.result()
+                except Exception as llm_error:
+                    summaries, summary_ms = {entity["input"]: llm_error for entity in entities}, None
+                for entity in entities:
+                    query = entity["input"]
+                    record = {"input": query, "entity_type": kinds[query], "normalized": entity}
+                    summary = summaries.get(query)
+                    if summary is None or isinstance(summary, Exception):
+                        record["error"] = f"Error during LLM summarization: {summary}"
+                    else:
+                        record["summary"] = summary
+                        record["timings"] = {"fetch_ms": round(fetch_ms, 1), "summary_ms": round(summary_ms, 1),
+                                             "total_ms": round((time.perf_counter() - chunk_started) * 1000, 1)}
+                    yield record
+
+        for start in range(0, len(queries), chunk_size):
+            chunk = queries[start:start + chunk_size]
+            started = time.perf_counter()
+            entities = {}
+            for kind, fetch in fetches:
+                batch = [query for query in chunk if kinds[query] == kind]
+                if not batch:
+                    continue
+                try:
+                    entities.update(fetch(batch))
+                except Exception as fetch_error:
+                    for query in batch:
+                        record = {"input": query, "entity_type": kind, "error": f"Error while fetching data: {fetch_error}"}
+                        if isinstance(fetch_error, UpstreamUnavailable):
+                            record["skipped"] = True
+                        yield record
+            fetch_ms = (time.perf_counter() - started) * 1000
+
+            for query in chunk:
+                if kinds[query] == "unknown":
+                    yield {"input": query, "entity_type": "unknown", "error": "Could not classify input as gene or SNP."}
+                elif query in entities and entities[query] is None:
+                    yield {"input": query, "entity_type": kinds[query], "error": f"No {kinds[query]} found for query: {query}"}
+                elif isinstance(entities.get(query), Exception):
+                    record = {"input": query, "entity_type": kinds[query],
+                              "error": f"Error while fetching data: {entities[query]}"}
+                    if isinstance(entities[query], UpstreamUnavailable):
+                        record["skipped"] = True
+                    yield record
+
+            found = [entity for entity in entities.values() if entity is not None and not isinstance(entity, Exception)]
+            if found and client is None:
+                client = get_gemini_client()
+            groups = pack_entities(found, pack_token_budget) if packed else [[entity] for entity in found]
+            for group in groups:
+                pending[pool.submit(timed_summaries, group)] = (group, fetch_ms, started)
+                in_flight += len(group)
+
+            # keep about one chunk of summaries queued, fetching the next chunk overlaps with the rest
+            while in_flight > max(chunk_size, max_workers):
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                yield from finished(done)
+            yield from finished([future for future in list(pending) if future.done()])
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            yield from finished(done)
+
+
+def read_queries(stream):
+    """
+    This function is reading gene symbols / rsIDs from a text stream: one or more per line,
+    separated by whitespace or commas, with blank lines and # comments skipped.
+    """
+    for line in stream:
+        line = line.split("#", 1)[0]
+        for query in line.replace(",", " ").split():
+            yield query
+
+
+def load_checkpoint(path):
+    """
+    This function is reading a JSONL output file from an earlier run and is returning the
+    state of each input in it: "done" when it has a summary, "skipped" when its upstream's
+    circuit was open and "failed" for any other error. The last line for an input wins, and
+    a line cut off by an interruption is ignored.
+    """
+    states = {}
+    if not os.path.exists(path):
+        return states
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(record, dict):
+                continue
+            if "summary" in record:
+                states[record.get("input")] = "done"
+            elif record.get("skipped"):
+                states[record.get("input")] = "skipped"
+            else:
+                states[record.get("input")] = "failed"
+    return states
+
+
+def drop_checkpoint_records(path, inputs):
+    """
+    This function is rewriting a JSONL output file without the records of the given inputs,
+    so the inputs that are run again end up with one line each instead of a second one. A
+    line cut off by an interruption is dropped too.
+    """
+    tmp_path = path + ".tmp"
+    with open(path, encoding="utf-8") as src, open(tmp_path, "w", encoding="utf-8") as dst:
+        for line in src:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict) and record.get("input") in inputs:
+                continue
+            dst.write(line if line.endswith("\n") else line + "\n")
+    os.replace(tmp_path, path)
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    pos = (len(ordered) - 1) * q
+    low = int(pos)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+
+def batch_command(argv=None):
+    """
+    This function is the command line entry point. A single query prints the summary like
+    test_in_terminal; a file, stdin or several queries run through run_batch and stream one
+    JSON line per entity, with a throughput / latency summary on stderr at the end.
+    """
+    parser = argparse.ArgumentParser(description="Summarize gene symbols and rsIDs with MyGene / MyVariant and Gemini.")
+    parser.add_argument("queries", nargs="*", help="gene symbols or rsIDs, e.g. TP53 rs7412")
+    parser.add_argument("-i", "--input", help="file with one or more queries per line, '-' for stdin")
+    parser.add_argument("-o", "--output", help="JSONL file to write (default: stdout)")
+    parser.add_argument("--resume", action="store_true",
+                        help="append to --output and skip inputs that already have a record there")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="with --resume, run the inputs whose record is an error again")
+    parser.add_argument("-w", "--workers", type=int, default=8, help="concurrent LLM summaries")
+    parser.add_argument("--chunk-size", type=int, default=500, help="queries per bulk fetch")
+    parser.add_argument("--packed", action="store_true", help="summarize several entities per Gemini call")
+    parser.add_argument("--pack-token-budget", type=int, default=PACK_TOKEN_BUDGET,
+                        help="entity JSON tokens per packed call")
+    args = parser.parse_args(argv)
+
+    if not args.input and len(args.queries) <= 1:
+        user_query = args.queries[0] if args.queries else input("Enter a gene symbol or SNP rsID (e.g., TP53 or rs7412): ").strip()
+        if not user_query:
+            print("Empty input, exiting.")
+            return 1
+        return 0 if test_in_terminal(user_query) != "error" else 1
+
+    if args.resume and not args.output:
+        parser.error("--resume needs --output")
+    if args.retry_failed and not args.resume:
+        parser.error("--retry-failed needs --resume")
+    if args.output and os.path.exists(args.output) and not args.resume:
+        parser.error(f"{args.output} exists, pass --resume to continue it or remove it first")
+
+    queries = list(args.queries)
+    if args.input:
+        if args.input == "-":
+            queries.extend(read_queries(sys.stdin))
+        else:
+            with open(args.input, encoding="utf-8") as f:
+                queries.extend(read_queries(f))
+
+    unique = list(dict.fromkeys(queries))
+    states = load_checkpoint(args.output) if args.resume else {}
+    # lookups skipped behind an open circuit are always run again, errors only when asked to
+    rerun = {"skipped", "failed"} if args.retry_failed else {"skipped"}
+    todo = [query for query in unique if states.get(query) in (None, *rerun)]
+    retried = {query for query in todo if query in states}
+    if retried:
+        drop_checkpoint_records(args.output, retried)
+
+    out = open(args.output, "a", encoding="utf-8") if args.output else sys.stdout
+    if args.resume and out.tell() > 0:
+        # an interrupted run can leave a half-written last line
+        with open(args.output, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                out.write("\n")
+
+    # fail before the first line is written, not with a traceback halfway through the batch
+    client = None
+    if todo:
+        try:
+            client = get_gemini_client()
+        except Exception as client_error:
+            print(f"Could not create the Gemini client: {client_error}", file=sys.stderr)
+            if out is not sys.stdout:
+                out.close()
+            return 1
+
+    latencies, ok, failed = [], 0, 0
+    started = time.perf_counter()
+    interrupted = False
+    try:
+        for record in run_batch(todo, client=client, max_workers=args.workers, chunk_size=args.chunk_size, packed=args.packed,
+                                pack_token_budget=args.pack_token_budget):
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            if "summary" in record:
+                ok += 1
+                latencies.append(record["timings"]["total_ms"])
+            else:
+                failed += 1
+    except KeyboardInterrupt:
+        interrupted = True
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.perf_counter() - started
+    done = ok + failed
+    print(
+        f"{'interrupted after' if interrupted else 'finished'} {done}/{len(todo)} queries in {elapsed:.1f}s "
+        f"({done / elapsed if elapsed else 0:.2f}/s): {ok} summarized, {failed} failed, "
+        f"{len(unique) - len(todo)} already in the output",
+        file=sys.stderr,
+    )
+    if latencies:
+        print(
+            f"latency ms (fetch start to result): p50 {percentile(latencies, 0.5):.0f}  p90 {percentile(latencies, 0.9):.0f}  "
+            f"p99 {percentile(latencies, 0.99):.0f}  max {max(latencies):.0f}",
+            file=sys.stderr,
+        )
+    if interrupted and args.output:
+        print(f"rerun with --resume -o {args.output} to continue", file=sys.stderr)
+    return 130 if interrupted else (1 if failed else 0)
+
 
 if __name__ == "__main__":
-    test_in_terminal()
+    sys.exit(batch_command())
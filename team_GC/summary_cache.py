@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# an empty GC_SUMMARY_CACHE_PATH turns the cache off
+SUMMARY_CACHE_PATH = os.environ.get(
+    "GC_SUMMARY_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "summaries.sqlite"),
+)
+SUMMARY_CACHE_MAX_ENTRIES = int(os.environ.get("GC_SUMMARY_CACHE_MAX_ENTRIES", 10000))
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+# what the user typed and the query URL say nothing about the record: TP53 and tp53, or a single and a
+# batch lookup of the same gene, share one summary
+KEY_IGNORED_FIELDS = ("input", "source_metadata")
+
+
+def summary_cache_key(normalized_entity, system_prompt, model):
+    """
+    This function is hashing the canonical JSON of the entity (without KEY_IGNORED_FIELDS)
+    together with the system prompt and the model name, so an unchanged record maps to the
+    same key and any prompt or model change maps to a new one.
+    """
+    record = {key: value for key, value in normalized_entity.items() if key not in KEY_IGNORED_FIELDS}
+    canonical = json.dumps(record, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    digest = hashlib.sha256()
+    for part in (model, system_prompt, canonical):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class SummaryCache:
+    """
+    This class is storing parsed Gemini summaries in SQLite under their content hash,
+    dropping the least recently used ones once there are more than max_entries.
+    """
+
+    def __init__(self, path, max_entries=SUMMARY_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            " key TEXT PRIMARY KEY, summary TEXT NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS summaries_lru ON summaries (accessed_at)")
+
+    def get(self, key):
+        """
+        This method is returning the cached summary dict for key, or None.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT summary FROM summaries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE summaries SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key, summary):
+        """
+        This method is storing a summary dict and evicting the oldest entries past max_entries.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries (key, summary, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(summary), now, now),
+            )
+            self._conn.execute(
+                "DELETE FROM summaries WHERE key IN ("
+                " SELECT key FROM summaries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM summaries")
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+        return {"entries": entries, "max_entries": self.max_entries, "hits": self.hits, "misses": self.misses}
+
+
+def for_input(summary, normalized_entity):
+    """
+    This function is returning a shared or cached summary with its input set to this entity's,
+    since entities that only differ in input share one summary.
+    """
+    if isinstance(summary, dict) and summary.get("input") != normalized_entity["input"]:
+        return dict(summary, input=normalized_entity["input"])
+    return summary
+
+
+def get_summary_cache():
+    """
+    This function is returning the process-wide summary cache, or None when it is turned off.
+    """
+    global _cache
+    if not SUMMARY_CACHE_PATH:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = SummaryCache(SUMMARY_CACHE_PATH)
+        return _cache
@@ -0,0 +1,334 @@
+import collections
+import os
+import sqlite3
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# sockets kept per upstream host, should cover the number of lookups served at once
+HTTP_POOL_MAXSIZE = int(os.environ.get("GC_HTTP_POOL_MAXSIZE", 32))
+# SQLite variant store built by team_bioinformatics_minors/variant_store.py, skipped when the file is missing
+VARIANT_STORE_PATH = os.environ.get(
+    "GC_VARIANT_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "variant_store.sqlite"),
+)
+
+# circuit breaker per upstream: opens when, over the last BREAKER_WINDOW_S seconds and at least
+# BREAKER_MIN_CALLS calls, half of them failed or 80% took longer than BREAKER_SLOW_CALL_S
+BREAKER_WINDOW_S = float(os.environ.get("GC_BREAKER_WINDOW_S", 60))
+BREAKER_MIN_CALLS = int(os.environ.get("GC_BREAKER_MIN_CALLS", 5))
+BREAKER_ERROR_RATE = 0.5
+BREAKER_SLOW_CALL_S = float(os.environ.get("GC_BREAKER_SLOW_CALL_S", 5))
+# bulk POSTs of up to 1000 IDs (30 s timeout) have their own breakers ("mygene_bulk", "myvariant_bulk"),
+# so a slow batch does not open the circuit of the single lookups and is judged by a longer threshold
+BREAKER_BULK_SLOW_CALL_S = float(os.environ.get("GC_BREAKER_BULK_SLOW_CALL_S", 20))
+BREAKER_SLOW_RATE = 0.8
+# how long an open circuit rejects calls before letting a probe through (doubled per failed probe)
+BREAKER_OPEN_S = float(os.environ.get("GC_BREAKER_OPEN_S", 30))
+BREAKER_MAX_OPEN_S = 300
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def build_http_session(pool_maxsize=10, retries=3, backoff_factor=0.5):
+    """
+    This function is building a requests.Session with a keep-alive connection pool per host,
+    gzip encoding and retry with exponential backoff on connection errors and 429/5xx responses.
+    """
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET", "POST"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=pool_maxsize, max_retries=retry)
+
+    session = requests.Session()
+    session.headers.update({"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"})
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_http_session():
+    """
+    This function is returning the process-wide session, so every lookup reuses warm connections.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = build_http_session(pool_maxsize=HTTP_POOL_MAXSIZE)
+        return _session
+
+
+def http_pool_stats():
+    """
+    This function is reporting, per upstream host, how many sockets were opened,
+    how many are idle in the pool and how many requests the pool has served.
+    """
+    stats = {}
+    if _session is None:
+        return stats
+
+    adapter = _session.get_adapter("https://")
+    pools = adapter.poolmanager.pools
+    for key in pools.keys():
+        pool = pools.get(key)
+        if pool is None:
+            continue
+        idle = 0
+        if pool.pool is not None:
+            with pool.pool.mutex:
+                idle = sum(1 for conn in pool.pool.queue if conn is not None)
+        stats[key.key_host] = {
+            "connections_opened": pool.num_connections,
+            "requests": pool.num_requests,
+            "idle_connections": idle,
+            "pool_maxsize": adapter._pool_maxsize,
+        }
+    return stats
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+_flight_counts = {}
+
+
+def coalesce(key, work):
+    """
+    This function is running work() once for all concurrent callers with the same key
+    (e.g. ("mygene", "TP53")). Callers arriving while it runs wait and get the same
+    result, or the same exception. Nothing is kept after the call finishes.
+    """
+    kind = key[0]
+    with _flights_lock:
+        counts = _flight_counts.setdefault(kind, {"executed": 0, "coalesced": 0})
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = {"done": threading.Event(), "value": None, "error": None}
+            counts["executed"] += 1
+        else:
+            counts["coalesced"] += 1
+
+    if not leader:
+        flight["done"].wait()
+        if flight["error"] is not None:
+            raise flight["error"]
+        return flight["value"]
+
+    try:
+        flight["value"] = work()
+    except BaseException as error:
+        flight["error"] = error
+        raise
+    finally:
+        with _flights_lock:
+            del _flights[key]
+        flight["done"].set()
+    return flight["value"]
+
+
+def coalesce_stats():
+    """
+    This function is reporting, per kind of work, how many calls ran and how many joined a call in flight.
+    """
+    with _flights_lock:
+        return {kind: dict(counts) for kind, counts in _flight_counts.items()}
+
+
+_variant_store = None
+_variant_store_lock = threading.Lock()
+
+
+def get_local_variant(rs_id):
+    """
+    This function is looking an rsID up in the local variant store and is returning the stored row
+    as a dict (plus the store's genome assembly), or None when there is no store or no such rsID.
+    """
+    global _variant_store
+    number = rs_id.strip().lower()
+    number = number[2:] if number.startswith("rs") else number
+    if not number.isdigit() or not VARIANT_STORE_PATH or not os.path.exists(VARIANT_STORE_PATH):
+        return None
+
+    with _variant_store_lock:
+        if _variant_store is None:
+            # read-only, the store is only written by its build script
+            _variant_store = sqlite3.connect(f"file:{VARIANT_STORE_PATH}?mode=ro", uri=True, check_same_thread=False)
+            _variant_store.row_factory = sqlite3.Row
+        row = _variant_store.execute("SELECT * FROM variants WHERE rsid = ?", (int(number),)).fetchone()
+        if row is None:
+            return None
+        assembly = _variant_store.execute("SELECT value FROM meta WHERE key = 'assembly'").fetchone()
+
+    variant = dict(row)
+    variant["rsid"] = f"rs{variant['rsid']}"
+    variant["assembly"] = assembly[0] if assembly else None
+    return variant
+
+
+class UpstreamUnavailable(RuntimeError):
+    """
+    This class is the error raised instead of calling an upstream whose circuit is open.
+    """
+
+
+class CircuitBreaker:
+    """
+    This class is tracking one upstream's recent calls. closed: calls go through; open: calls
+    are rejected at once with UpstreamUnavailable; half_open: after the cool-down one probe call
+    goes through, closing the circuit when it succeeds and opening it again for longer when not.
+    Unlike team_bioinformatics_minors/circuit.py, which wants two good probes in a row, one probe
+    is enough here: a lookup makes a single call per upstream, so a second probe would mean keeping
+    the next user waiting on a failure for another whole cool-down.
+    """
+
+    def __init__(self, name, slow_call_s=BREAKER_SLOW_CALL_S):
+        self.name = name
+        self.slow_call_s = slow_call_s
+        self.state = "closed"
+        self.calls = collections.deque(maxlen=50)
+        self.opened_at = 0.0
+        self.open_for = BREAKER_OPEN_S
+        self.probing = False
+        self.opened = 0
+        self.rejected = 0
+        self.last_error = None
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            now = time.monotonic()
+            if self.state == "open" and now - self.opened_at >= self.open_for:
+                self.state = "half_open"
+                self.probing = False
+            if self.state == "closed":
+                return
+            if self.state == "half_open" and not self.probing:
+                self.probing = True
+                return
+            self.rejected += 1
+            retry_in = max(0.0, self.open_for - (now - self.opened_at))
+        raise UpstreamUnavailable(f"{self.name} is unavailable (circuit open), skipped for the next {retry_in:.0f}s")
+
+    def record(self, ok, seconds, error=None):
+        with self.lock:
+            now = time.monotonic()
+            if not ok:
+                self.last_error = error
+            if self.state == "half_open":
+                self.probing = False
+                if ok and seconds < self.slow_call_s:
+                    self.state = "closed"
+                    self.open_for = BREAKER_OPEN_S
+                    self.calls.clear()
+                else:
+                    self.open(now, min(self.open_for * 2, BREAKER_MAX_OPEN_S))
+                return
+            if self.state == "open":
+                return
+            self.calls.append((now, ok, seconds))
+            errors, slow, total = self.rates(now)
+            if total >= BREAKER_MIN_CALLS and (errors / total >= BREAKER_ERROR_RATE or slow / total >= BREAKER_SLOW_RATE):
+                self.open(now, BREAKER_OPEN_S)
+
+    def cancel(self):
+        with self.lock:
+            self.probing = False
+
+    def open(self, now, open_for):
+        self.state = "open"
+        self.opened_at = now
+        self.open_for = open_for
+        self.opened += 1
+
+    def rates(self, now):
+        while self.calls and now - self.calls[0][0] > BREAKER_WINDOW_S:
+            self.calls.popleft()
+        errors = sum(1 for _, ok, _ in self.calls if not ok)
+        slow = sum(1 for _, ok, seconds in self.calls if ok and seconds >= self.slow_call_s)
+        return errors, slow, len(self.calls)
+
+    def stats(self):
+        with self.lock:
+            now = time.monotonic()
+            errors, slow, total = self.rates(now)
+            latencies = sorted(seconds for _, _, seconds in self.calls)
+            state = self.state
+            if state == "open" and now - self.opened_at >= self.open_for:
+                state = "half_open"
+            return {
+                "state": state,
+                "calls": total,
+                "error_rate": round(errors / total, 3) if total else 0.0,
+                "slow_rate": round(slow / total, 3) if total else 0.0,
+                "p95_ms": round(latencies[min(total - 1, int(0.95 * total))] * 1000, 1) if total else None,
+                "opened": self.opened,
+                "rejected": self.rejected,
+                "last_error": self.last_error,
+            }
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(source):
+    """
+    This function is returning the process-wide circuit breaker of an upstream ("mygene", "myvariant",
+    or "mygene_bulk" / "myvariant_bulk" for their bulk endpoints).
+    """
+    with _breakers_lock:
+        if source not in _breakers:
+            slow_call_s = BREAKER_BULK_SLOW_CALL_S if source.endswith("_bulk") else BREAKER_SLOW_CALL_S
+            _breakers[source] = CircuitBreaker(source, slow_call_s)
+        return _breakers[source]
+
+
+def call_upstream(source, work):
+    """
+    This function is running work() (one or more requests to the upstream source) behind its
+    circuit breaker. Connection errors, timeouts and 5xx responses count as failures; answers
+    like 404 or "no hits" (ValueError) show the upstream is up. While the circuit is open,
+    UpstreamUnavailable is raised right away instead of waiting for the timeout.
+    """
+    breaker = get_breaker(source)
+    breaker.allow()
+    started = time.monotonic()
+    try:
+        value = work()
+    except requests.HTTPError as error:
+        status = error.response.status_code if error.response is not None else 500
+        breaker.record(status < 500, time.monotonic() - started, f"HTTP {status}")
+        raise
+    except requests.RequestException as error:
+        breaker.record(False, time.monotonic() - started, type(error).__name__)
+        raise
+    except ValueError:
+        breaker.record(True, time.monotonic() - started)
+        raise
+    except BaseException:
+        breaker.cancel()
+        raise
+    breaker.record(True, time.monotonic() - started)
+    return value
+
+
+def upstream_health():
+    """
+    This function is reporting, per upstream, the circuit state and the error rate, slow-call rate
+    and p95 latency over the recent calls.
+    """
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.stats() for breaker in breakers}
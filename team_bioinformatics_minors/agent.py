@@ -1,25 +1,320 @@
-import requests
-from google import genai
-from google.genai import types
+import asyncio
+import importlib
 import os
 from dotenv import load_dotenv
-from typing import Dict, List, Optional, Any
+from typing import TYPE_CHECKING, AsyncIterator, Dict, Iterator, List, Optional, Set, Any
 import json
-from helpers import filter_high_impact_variants, source_mapper
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from helpers import JsonArrayParser, PartialVariants, filter_high_impact_variants, source_mapper
+from tracing import Tracer, current_span, span, traced_submit
+from deadline import Deadline, DeadlineExceeded, current_deadline, deadline_scope
+from singleflight import FlightGroups
+from gene_index import GeneIds, GeneIndex, get_gene_index
+from variant_store import VariantRecord, VariantStore, get_variant_store
+from pruning import CHARS_PER_TOKEN, DEFAULT_TOKEN_BUDGET, estimate_tokens, prune_sources
+from transport import HttpTransport, get_transport
+from async_transport import AsyncHttpTransport, get_async_transport
+from cache import MISS, ResponseCache, cached_call, cached_collector, get_response_cache, normalize_query
+from background_loop import iterate_sync, run_sync
+
+if TYPE_CHECKING:
+    from google.genai import types
+
+    from variants import VariantTable
 
 load_dotenv()
 GOOGLE_API = os.getenv("GEMINI_API_KEY")
 
+# upstream base URLs, overridable so the benchmarks can point them at local stubs
+MYGENE_URL = os.getenv("MYGENE_URL", "https://mygene.info")
+MYVARIANT_URL = os.getenv("MYVARIANT_URL", "https://myvariant.info")
+ENSEMBL_URL = os.getenv("ENSEMBL_URL", "https://rest.ensembl.org")
+NCBI_EUTILS_URL = os.getenv("NCBI_EUTILS_URL", "https://eutils.ncbi.nlm.nih.gov/entrez/eutils")
+CLINICALTABLES_URL = os.getenv("CLINICALTABLES_URL", "https://clinicaltables.nlm.nih.gov")
+UNIPROT_URL = os.getenv("UNIPROT_URL", "https://rest.uniprot.org")
+
+GENE_SOURCES = ("ensembl_gene_and_variants", "ncbi_gene", "uniprot", "mygene")
+SNP_SOURCES = ("clinicaltables", "ensembl_vep", "ncbi_snp", "myvariant")
+COLLECTION_MODES = ("planner", "direct")
+
+# upstream service behind each source, one circuit breaker per service
+UPSTREAMS = {
+    "mygene": MYGENE_URL,
+    "myvariant": MYVARIANT_URL,
+    "ensembl": ENSEMBL_URL,
+    "ncbi": NCBI_EUTILS_URL,
+    "clinicaltables": CLINICALTABLES_URL,
+    "uniprot": UNIPROT_URL,
+}
+SOURCE_UPSTREAM = {
+    "ensembl_gene_and_variants": "ensembl",
+    "ncbi_gene": "ncbi",
+    "uniprot": "uniprot",
+    "mygene": "mygene",
+    "clinicaltables": "clinicaltables",
+    "ensembl_vep": "ensembl",
+    "ncbi_snp": "ncbi",
+    "myvariant": "myvariant",
+}
+# sources the local variant store can answer without their upstream
+LOCAL_SNP_SOURCES = ("clinicaltables", "ncbi_snp")
+
+# max ids per request on each bulk endpoint
+BATCH_LIMITS = {
+    "mygene": 1000,
+    "myvariant": 1000,
+    "ensembl_lookup": 1000,
+    "ensembl_vep": 200,
+    "ncbi": 200,
+}
+
+# Ensembl overlap/region accepts up to 5 Mb, smaller windows keep each stream short
+VARIANT_WINDOW = 100_000
+VARIANT_FETCH_WORKERS = 4
+# stop fetching windows once this many pathogenic variants are in hand
+VARIANT_LIMIT = 100
+
+# end-to-end budget per query (collection + summary), seconds
+DEFAULT_DEADLINE_S = float(os.getenv("BIOINFO_DEADLINE_S", "30"))
+# kept back from collection for the summary call, at most this share of the budget
+SUMMARY_RESERVE_S = 10
+SUMMARY_RESERVE_SHARE = 0.4
+
+
+def _ensembl_locus(record: Dict) -> Dict:
+    return {
+        "id": record["id"],
+        "seq_region_name": record["seq_region_name"],
+        "start": record["start"],
+        "end": record["end"],
+    }
+
+
+# only cache the filtered variant list when the Ensembl calls actually returned something, for every window
+def _has_variants(out: Any) -> bool:
+    return isinstance(out, list) and len(out) > 0 and not isinstance(out, PartialVariants)
+
+
+def _variant_windows(gene_data: Any) -> List[str]:
+    # overlap URLs covering the gene, VARIANT_WINDOW bases each
+    if isinstance(gene_data, str):
+        # bare Ensembl ID without coordinates, stream the whole gene in one go
+        return [f"{ENSEMBL_URL}/overlap/id/{gene_data}"]
+    region = gene_data["seq_region_name"]
+    return [
+        f"{ENSEMBL_URL}/overlap/region/human/{region}:{start}-{min(start + VARIANT_WINDOW - 1, gene_data['end'])}"
+        for start in range(gene_data["start"], gene_data["end"] + 1, VARIANT_WINDOW)
+    ]
+
+
+def _chunks(items: List[str], size: int) -> Iterator[List[str]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+# self._client before the first use
+_UNBUILT = object()
+
+# collector tasks arun() stopped waiting for at the deadline, kept referenced until they finish
+_background_tasks: set = set()
+
+
+def _genai_types():
+    # google.genai takes ~0.5 s to import, so it is loaded on the first LLM call (or by prewarm()), not with the agent
+    from google.genai import types
+    return types
+
+
+def _llm_config(**kwargs) -> "types.GenerateContentConfig":
+    # a Gemini call may not outlive the current deadline (HttpOptions timeout is in milliseconds)
+    types = _genai_types()
+    deadline = current_deadline()
+    if deadline is not None:
+        kwargs["http_options"] = types.HttpOptions(timeout=max(1, int(deadline.timeout() * 1000)))
+    return types.GenerateContentConfig(**kwargs)
+
+
+class _PlannerConversation:
+    """
+    State of one planner run: the tool set and prompt for the query type,
+    the messages so far and what the tool calls collected.
+    BioinfoAgent._run_tool_execution drives the turns.
+    """
+
+    def __init__(self, agent: "BioinfoAgent", query: str):
+        types = _genai_types()
+        self.agent = agent
+        self.query = query
+        self.query_type = agent.classify_input(query)
+        self.tool = agent._planner_tool(self.query_type)
+        self.prompt = (
+            f"You are a Bioinformatic Data Collector. Use the provided functions to gather ALL raw data for the {self.query_type.upper()}.\n"
+            f"- Respond ONLY with function calls until you have everything you can get.\n"
+            f"- When done, return ONE JSON object: "
+            f'{{"query":"{query}","type":"{self.query_type}","sources":{{...}}}} and STOP.'
+        )
+        self.contents = [
+            types.Content(role="user", parts=[types.Part.from_text(text=f"Collect all data for {query}")])
+        ]
+        self.collected: Dict[str, Any] = {}
+        self.missing: List[str] = []
+        self.skipped: List[str] = []
+
+    def config(self) -> "types.GenerateContentConfig":
+        return _llm_config(system_instruction=self.prompt, tools=[self.tool])
+
+    def function_calls(self, resp) -> List[tuple]:
+        calls = []
+        for cand in resp.candidates:
+            if not cand.content or not cand.content.parts:
+                continue
+            for p in cand.content.parts:
+                if getattr(p, "function_call", None):
+                    calls.append((p.function_call.name, dict(p.function_call.args)))
+        return calls
+
+    def unavailable(self, calls: List[tuple], fn_map: Dict[str, Any]) -> set:
+        # indexes of the calls whose source has an open circuit and nothing cached or local to answer from
+        return {i for i, (name, _) in enumerate(calls)
+                if name in fn_map and not self.agent.source_available(name.replace("collect_", ""), self.query)}
+
+    def add_tool_responses(self, resp, calls: List[tuple], outputs: Dict[int, Any], fn_map: Dict[str, Any],
+                           late: set):
+        """outputs maps call index -> result; calls without an entry were skipped."""
+        types = _genai_types()
+        encoded_chars = 0
+        tool_parts = []
+        with span("encode_tool_responses", "json") as encode_span:
+            for i, (name, _) in enumerate(calls):
+                out = outputs.get(i, {"error": "source unavailable (circuit open), skipped"})
+                if name in fn_map:
+                    source = name.replace("collect_", "")
+                    if i not in outputs:
+                        self.skipped.append(source)
+                    elif i in late:
+                        self.missing.append(source)
+                    else:
+                        self.collected[source] = out
+                text = json.dumps(out if out is not None else {"result": "None"})
+                encoded_chars += len(text)
+                tool_parts.append(
+                    types.Part.from_function_response(
+                        name=name,
+                        response={"content": [{"text": text}]},
+                    )
+                )
+            encode_span.set(chars=encoded_chars)
+
+        self.contents.append(resp.candidates[0].content)
+        self.contents.append(types.Content(role="tool", parts=tool_parts))
+
+    def answer(self, resp) -> Optional[Any]:
+        # the planner's final JSON, None when it answered with anything else
+        final_text = resp.text or ""
+        try:
+            with span("decode_planner_answer", "json", chars=len(final_text)):
+                parsed = json.loads(final_text)
+        except Exception:
+            return None
+        if isinstance(parsed, dict):
+            if self.missing:
+                parsed["missing_sources"] = list(dict.fromkeys(self.missing))
+            if self.skipped:
+                parsed["skipped_sources"] = list(dict.fromkeys(self.skipped))
+        return parsed
+
+    def result(self) -> Dict[str, Any]:
+        # what the tool calls collected, for a planner that ran out of turns or time
+        return {"query": self.query, "type": self.query_type, "sources": self.collected,
+                "missing_sources": [m for m in dict.fromkeys(self.missing) if m not in self.collected],
+                "skipped_sources": [m for m in dict.fromkeys(self.skipped) if m not in self.collected]}
+
+
 class BioinfoAgent:
-    def __init__(self):
+    def __init__(self, max_tool_workers: int = 4, transport: Optional[HttpTransport] = None,
+                 cache: Optional[ResponseCache] = None, prompt_token_budget: int = DEFAULT_TOKEN_BUDGET,
+                 gene_index: Optional[GeneIndex] = None, variant_store: Optional[VariantStore] = None,
+                 deadline_s: Optional[float] = DEFAULT_DEADLINE_S,
+                 async_transport: Optional[AsyncHttpTransport] = None):
         self.query_type = None
         self.query = None
         self.collected_data = {}
+        # upper bound on collectors run at once for a single planner turn
+        self.max_tool_workers = max_tool_workers
+        # pooled keep-alive session of run_batch()'s bulk requests, owns the rate limits and breakers
+        self.http = transport or get_transport()
+        # every collector's transport: one httpx pool per event loop (the sync API's is the background loop's),
+        # sharing the sync transport's rate limits and breakers
+        self.ahttp = async_transport or (get_async_transport() if transport is None else
+                                         AsyncHttpTransport(limiter=self.http.limiter, breakers=self.http.breakers))
+        # persistent upstream cache, repeat lookups skip the network
+        self.cache = cache if cache is not None else get_response_cache()
+        # upper bound on source data embedded in the ai_summary prompt
+        self.prompt_token_budget = prompt_token_budget
+        # local symbol -> Entrez/Ensembl/UniProt index (gene_index.py), None until it has been built
+        self.gene_index = gene_index if gene_index is not None else get_gene_index()
+        # local rsID -> position/alleles/ClinVar store (variant_store.py), first tier for SNP basics
+        self.variant_store = variant_store if variant_store is not None else get_variant_store()
+        # end-to-end budget of run(), None for no limit
+        self.deadline_s = deadline_s
+        # identical calls in flight on this agent are joined; another agent may have other sources or settings
+        self.flights = FlightGroups()
+        # circuit breakers live on the transport, keyed by the upstream each host belongs to
+        for upstream, url in UPSTREAMS.items():
+            self.http.breakers.register(upstream, url)
         if not GOOGLE_API:
              print("Error: GEMINI_API_KEY not found. Please check your .env file.")
-             self.client = None
-        else:
-             self.client = genai.Client(api_key=GOOGLE_API)
+        # the Gemini client is built on first use (or by prewarm()), see the client property
+        self._client = None if not GOOGLE_API else _UNBUILT
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is _UNBUILT:
+            with self._client_lock:
+                if self._client is _UNBUILT:
+                    from google import genai
+                    self._client = genai.Client(api_key=GOOGLE_API)
+        return self._client
+
+    @client.setter
+    def client(self, value):
+        self._client = value
+
+    def prewarm(self) -> Dict[str, float]:
+        """
+        Pays the one-off startup costs before the first query arrives:
+        imports google.genai and numpy and builds the Gemini client, opens a pooled
+        connection (DNS, TCP, TLS) to every upstream host and reads the first
+        pages of the local gene index, variant store and response cache.
+        The steps run concurrently. Returns each step's duration in ms;
+        failed steps are printed and skipped.
+        """
+        steps = {"gemini_client": lambda: (_genai_types(), self.client),
+                 "variants": lambda: importlib.import_module("variants")}
+        for upstream, url in UPSTREAMS.items():
+            # the collectors' connections live in the background loop's pool
+            steps[upstream] = lambda url=url: run_sync(self.ahttp.warm(url))
+        if self.gene_index is not None:
+            steps["gene_index"] = lambda: self.gene_index.resolve("TP53")
+        if self.variant_store is not None:
+            steps["variant_store"] = lambda: self.variant_store.get("rs7412")
+        if self.cache is not None:
+            steps["response_cache"] = lambda: self.cache.get("mygene", "TP53")
+
+        def timed(step):
+            started = time.perf_counter()
+            try:
+                step()
+            except Exception as e:
+                print(f"prewarm error: {e}")
+            return round((time.perf_counter() - started) * 1000, 3)
+
+        with ThreadPoolExecutor(max_workers=len(steps)) as pool:
+            futures = {name: pool.submit(timed, step) for name, step in steps.items()}
+        return {name: future.result() for name, future in futures.items()}
 
     def classify_input(self, query: str) -> str:
         query = query.strip().upper()
@@ -28,50 +323,103 @@ class BioinfoAgent:
         else:
             return "gene"
         
-    def collect_mygene(self, gene: str):
+    def deadline_scope(self, seconds: Optional[float] = None):
+        """
+        Context manager starting the per-query deadline (seconds, default
+        self.deadline_s) for callers that drive collect() and the summary
+        themselves, like the Streamlit app; run() opens one on its own.
+        """
+        return deadline_scope(seconds if seconds is not None else self.deadline_s)
+
+    def _summary_reserve(self, deadline: Deadline) -> float:
+        return min(SUMMARY_RESERVE_S, SUMMARY_RESERVE_SHARE * deadline.seconds)
+
+    def source_available(self, source: str, query: Optional[str] = None) -> bool:
+        """
+        False when the upstream behind source has an open circuit and query
+        cannot be answered without it (response cache, local variant store).
+        """
+        if self.http.breakers.get(SOURCE_UPSTREAM[source]).available():
+            return True
+        if query is None:
+            return False
+        if self.cache is not None and self.cache.get(source, query) is not MISS:
+            return True
+        return source in LOCAL_SNP_SOURCES and self.local_variant(query) is not None
+
+    def resolve_gene(self, gene: str) -> Optional[GeneIds]:
+        # identifiers from the local index, None when there is no index or the symbol is unknown/ambiguous
+        if self.gene_index is None or not gene:
+            return None
+        with span("gene_index_lookup", "index", gene=gene) as lookup_span:
+            ids = self.gene_index.resolve(gene)
+            lookup_span.set(found=ids is not None)
+        return ids
+
+    def local_variant(self, snp_id: str) -> Optional[VariantRecord]:
+        # SNP basics from the local store, None when there is no store or the rsID is not in it
+        if self.variant_store is None or not snp_id:
+            return None
+        with span("variant_store_lookup", "index", snp=snp_id) as lookup_span:
+            record = self.variant_store.get(snp_id)
+            lookup_span.set(found=record is not None)
+        return record
+
+    # ---- collectors, awaited by the pipeline; the collect_* methods below are their blocking versions ----
+
+    @cached_collector("mygene")
+    async def acollect_mygene(self, gene: str):
 
+        # the response being read when a JSON error hits: the search, or the gene record
+        response = None
         try:
-            # get gene id
-            url = "https://mygene.info/v3/query"
-            params = {
-                "q": gene,
-                "species": "human",
-                "size": 1,
-                "fields": "entrezgene,ensembl.gene,symbol,name"
-            }
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
+            ids = self.resolve_gene(gene)
+            if ids:
+                # MyGene's _id for human genes is the Entrez ID
+                gene_id = ids.entrez_id
+            else:
+                # get gene id
+                url = f"{MYGENE_URL}/v3/query"
+                params = {
+                    "q": gene,
+                    "species": "human",
+                    "size": 1,
+                    "fields": "entrezgene,ensembl.gene,symbol,name"
+                }
+                response = await self.ahttp.get(url, params=params, timeout=10)
+                response.raise_for_status()
+                data = response.json()
 
-            if "hits" not in data or len(data["hits"]) == 0:
-                print("No gene found.")
-                return None
+                if "hits" not in data or len(data["hits"]) == 0:
+                    print("No gene found.")
+                    return None
 
-            gene_id = data["hits"][0]["_id"]
+                gene_id = data["hits"][0]["_id"]
 
             # use gene id to get full gene info
-            gene_url = f"https://mygene.info/v3/gene/{gene_id}"
+            gene_url = f"{MYGENE_URL}/v3/gene/{gene_id}"
             fetch_params = {
                 "fields": "symbol,name,summary,genomic_pos_hg38,pathway,clinvar"
             }
 
-            response2 = requests.get(gene_url, params=fetch_params)
-            response2.raise_for_status()
-            data2 = response2.json()
+            response = await self.ahttp.get(gene_url, params=fetch_params, timeout=10)
+            response.raise_for_status()
+            data2 = response.json()
             return data2
-        except requests.exceptions.JSONDecodeError as e:
-            print(f"MyGene.info JSON error: {e} - Response: {response.text[:200]}")
+        except ValueError as e:
+            print(f"MyGene.info JSON error: {e} - Response: {response.text[:200] if response is not None else None}")
             return None
         except Exception as e:
             print(f"MyGene.info error: {e}")
             return None
     
-    def collect_myvariant(self, query: str) -> Optional[Dict]:
+    @cached_collector("myvariant")
+    async def acollect_myvariant(self, query: str) -> Optional[Dict]:
         try:
 
             fields = "clinvar,dbnsfp,cadd,cosmic,gnomad,dbsnp,hgvs,gene,refseq,ensembl,exac"
-            url = f"https://myvariant.info/v1/variant/{query}?fields={fields}&dotfield=true&size=5"
-            response = requests.get(url, timeout=10)
+            url = f"{MYVARIANT_URL}/v1/variant/{query}?fields={fields}&dotfield=true&size=5"
+            response = await self.ahttp.get(url, timeout=10)
             response.raise_for_status() 
 
             if response.text.strip():
@@ -80,66 +428,122 @@ class BioinfoAgent:
             else:
                 print(f"MyVariant.info: Empty response for {query}")
                 return None
-        except requests.exceptions.JSONDecodeError as e:
+        except ValueError as e:
             print(f"MyVariant.info JSON error: {e} - Response: {response.text[:200]}")
             return None
         except Exception as e:
             print(f"MyVariant.info error: {e}")
             return None
         
-    def collect_ensembl_gene(self, gene: str) -> Optional[Dict]:
+    @cached_collector("ensembl_lookup")
+    async def acollect_ensembl_gene(self, gene: str) -> Optional[Dict]:
         try:
-            url = f"https://rest.ensembl.org/lookup/symbol/homo_sapiens/{gene}"
+            ids = self.resolve_gene(gene)
+            if ids and ids.ensembl_locus():
+                return ids.ensembl_locus()
+
+            url = f"{ENSEMBL_URL}/lookup/symbol/homo_sapiens/{gene}"
             headers = {"Content-Type": "application/json"}
-            response = requests.get(url, headers=headers, timeout=10)
+            response = await self.ahttp.get(url, headers=headers, timeout=10)
             response.raise_for_status()
-            return response.json()["id"]
+            return _ensembl_locus(response.json())
         except Exception as e:
             print(f"Ensembl gene lookup error: {e}")
             return None
 
-    def collect_ensembl_variants(self, gene_data: Dict) -> Optional[List[Dict]]:
+    async def acollect_ensembl_variants(self, gene_data: Dict, limit: int = VARIANT_LIMIT) -> Optional["VariantTable"]:
+        """
+        Streams the variants overlapping the gene in VARIANT_WINDOW-sized
+        windows, at most VARIANT_FETCH_WORKERS at once. Only high-impact
+        variants are kept while parsing, and remaining windows are skipped
+        once `limit` pathogenic variants have been found. If some windows
+        failed or the deadline cut the streams short, the table holds what
+        was read and is marked incomplete.
+        """
         if not gene_data:
             return None
-        try:
-
-            url = f"https://rest.ensembl.org/overlap/id/{gene_data}?feature=variation"
-            params = {"feature": "variation"}
-            headers = {"Content-Type": "application/json"}
-
-            response = requests.get(url, headers=headers, params=params, timeout=15)
-            response.raise_for_status()
-            # dont wanna overwhelm - changeable limit
-            return response.json()
-        except Exception as e:
-            print(f"Ensembl variants error: {e}")
+        # numpy comes with the first gene's variants, not with the agent
+        from variants import VariantTableBuilder, variant_priority
+
+        headers = {"Content-Type": "application/json"}
+        urls = _variant_windows(gene_data)
+        kept = VariantTableBuilder()
+        # adjacent windows both return a variant (or indel) that crosses their boundary
+        seen: Set[str] = set()
+        pathogenic = 0
+        failed = 0
+        enough = cut_short = False
+        windows = asyncio.Semaphore(VARIANT_FETCH_WORKERS)
+        deadline = current_deadline()
+
+        async def fetch_window(url):
+            nonlocal pathogenic, failed, enough, cut_short
+            async with windows:
+                if enough:
+                    return
+                try:
+                    async with self.ahttp.stream("GET", url, headers=headers, params={"feature": "variation"},
+                                                 timeout=15) as response:
+                        response.raise_for_status()
+                        parser = JsonArrayParser()
+                        async for chunk in response.aiter_bytes(64 * 1024):
+                            for v in parser.feed(chunk):
+                                priority = variant_priority(v)
+                                if priority is None or v.get("id") in seen:
+                                    continue
+                                if v.get("id"):
+                                    seen.add(v["id"])
+                                kept.append(v)
+                                if priority == 0:
+                                    pathogenic += 1
+                                    enough = enough or pathogenic >= limit
+                                if enough:
+                                    return
+                                if deadline is not None and deadline.expired():
+                                    cut_short = True
+                                    return
+                            if parser.finished:
+                                return
+                        raise ValueError(f"{url} ended before its variant array did")
+                except Exception as e:
+                    print(f"Ensembl variants error: {e}")
+                    failed += 1
+
+        await asyncio.gather(*(fetch_window(url) for url in urls))
+        if failed == len(urls):
             return None
-        
-    def collect_ensembl_gene_and_variants(self, gene: str):
-        ensembl_gene = self.collect_ensembl_gene(gene)
+        return kept.build(complete=failed == 0 and not cut_short)
+
+    @cached_collector("ensembl_gene_and_variants", cacheable=_has_variants)
+    async def acollect_ensembl_gene_and_variants(self, gene: str):
+        ensembl_gene = await self.acollect_ensembl_gene(gene)
         if not ensembl_gene:
             return {"ensembl_gene": None, "ensembl_variants": None}
-        variants = self.collect_ensembl_variants(ensembl_gene) or []
-        filter = filter_high_impact_variants(variants)
-        return filter
-    
-    def collect_ensembl_vep(self, snp_id: str) -> Optional[List[Dict]]:
+        return filter_high_impact_variants(await self.acollect_ensembl_variants(ensembl_gene))
+
+    @cached_collector("ensembl_vep")
+    async def acollect_ensembl_vep(self, snp_id: str) -> Optional[List[Dict]]:
         try:
-            url = f"https://rest.ensembl.org/vep/homo_sapiens/id/{snp_id}"
+            url = f"{ENSEMBL_URL}/vep/homo_sapiens/id/{snp_id}"
             headers = {"Content-Type": "application/json"}
-            response = requests.get(url, headers=headers, timeout=10)
+            response = await self.ahttp.get(url, headers=headers, timeout=10)
             response.raise_for_status()
             return response.json()
         except Exception as e:
             print(f"Ensembl VEP error: {e}")
             return None
     
-    def collect_clinicaltables(self, snp_id: str) -> Optional[Dict]:
+    @cached_collector("clinicaltables")
+    async def acollect_clinicaltables(self, snp_id: str) -> Optional[Dict]:
         try:
-            url = "https://clinicaltables.nlm.nih.gov/api/snps/v3/search"
+            local = self.local_variant(snp_id)
+            if local:
+                return local.as_clinicaltables()
+
+            url = f"{CLINICALTABLES_URL}/api/snps/v3/search"
             params = {"terms": snp_id}
 
-            response = requests.get(url, params=params, timeout=5)
+            response = await self.ahttp.get(url, params=params, timeout=5)
             response.raise_for_status()
             data = response.json()
             if len(data) >= 4 and data[3]:
@@ -159,34 +563,39 @@ class BioinfoAgent:
             return None
 
     #https://www.ncbi.nlm.nih.gov/books/NBK25500/
-    def collect_ncbi_gene(self, gene_symbol: str) -> Optional[Dict]:
+    @cached_collector("ncbi_gene")
+    async def acollect_ncbi_gene(self, gene_symbol: str) -> Optional[Dict]:
         try:
-            search_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
-            #AND Homo sapiens[Organism]
-            search_params = {
-                "db": "gene",
-                "term": f"{gene_symbol}[Gene Name] AND Homo sapiens[Organism]",
-                "retmode": "json",
-                "retmax": "1"
-            }
+            ids = self.resolve_gene(gene_symbol)
+            if ids:
+                gene_id = ids.entrez_id
+            else:
+                search_url = f"{NCBI_EUTILS_URL}/esearch.fcgi"
+                #AND Homo sapiens[Organism]
+                search_params = {
+                    "db": "gene",
+                    "term": f"{gene_symbol}[Gene Name] AND Homo sapiens[Organism]",
+                    "retmode": "json",
+                    "retmax": "1"
+                }
 
-            search_response = requests.get(search_url, params=search_params, timeout=10)
-            search_response.raise_for_status()
-            search_data = search_response.json()
+                search_response = await self.ahttp.get(search_url, params=search_params, timeout=10)
+                search_response.raise_for_status()
+                search_data = search_response.json()
 
-            if "esearchresult" not in search_data or not search_data["esearchresult"].get("idlist"):
-                return None
+                if "esearchresult" not in search_data or not search_data["esearchresult"].get("idlist"):
+                    return None
 
-            gene_id = search_data["esearchresult"]["idlist"][0]
+                gene_id = search_data["esearchresult"]["idlist"][0]
 
-            summary_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esummary.fcgi"
+            summary_url = f"{NCBI_EUTILS_URL}/esummary.fcgi"
             summary_params = {
                 "db": "gene",
                 "id": gene_id,
                 "retmode": "json"
             }
 
-            summary_response = requests.get(summary_url, params=summary_params, timeout=10)
+            summary_response = await self.ahttp.get(summary_url, params=summary_params, timeout=10)
             summary_response.raise_for_status()
             summary_data = summary_response.json()
 
@@ -198,18 +607,23 @@ class BioinfoAgent:
             print(f"NCBI Gene error: {e}")
             return None
 
-    def collect_ncbi_snp(self, snp_id: str) -> Optional[Dict]:
+    @cached_collector("ncbi_snp")
+    async def acollect_ncbi_snp(self, snp_id: str) -> Optional[Dict]:
         try:
+            local = self.local_variant(snp_id)
+            if local:
+                return local.as_ncbi_summary()
+
             id = snp_id.lower().replace("rs", "")
 
-            url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esummary.fcgi"
+            url = f"{NCBI_EUTILS_URL}/esummary.fcgi"
             params = {
                 "db": "snp",
                 "id": id,
                 "retmode": "json"
             }
 
-            response = requests.get(url, params=params, timeout=10)
+            response = await self.ahttp.get(url, params=params, timeout=10)
             response.raise_for_status()
             data = response.json()
 
@@ -221,16 +635,24 @@ class BioinfoAgent:
             print(f"ncbi dbSNP error: {e}")
             return None
 
-    def collect_uniprot(self, gene_symbol: str) -> Optional[Dict]:
+    @cached_collector("uniprot")
+    async def acollect_uniprot(self, gene_symbol: str) -> Optional[Dict]:
         try:
-            url = "https://rest.uniprot.org/uniprotkb/search"
+            ids = self.resolve_gene(gene_symbol)
+            if ids and ids.uniprot_id:
+                # exact entry instead of a ranked search
+                response = await self.ahttp.get(f"{UNIPROT_URL}/uniprotkb/{ids.uniprot_id}", params={"format": "json"}, timeout=10)
+                response.raise_for_status()
+                return response.json()
+
+            url = f"{UNIPROT_URL}/uniprotkb/search"
             params = {
                 "query": f"gene:{gene_symbol} AND organism_id:9606",
                 "format": "json",
                 "size": "1"
             }
 
-            response = requests.get(url, params=params, timeout=10)
+            response = await self.ahttp.get(url, params=params, timeout=10)
             response.raise_for_status()
             data = response.json()
 
@@ -241,8 +663,216 @@ class BioinfoAgent:
         except Exception as e:
             print(f"uniport error: {e}")
             return None
-    
-    def _make_tool_decl(self, name: str, params: Dict) -> types.FunctionDeclaration:
+
+    # ---- synchronous collectors: the async ones above, run on the background loop ----
+
+    def collect_mygene(self, gene: str):
+        return run_sync(self.acollect_mygene(gene))
+
+    def collect_myvariant(self, query: str) -> Optional[Dict]:
+        return run_sync(self.acollect_myvariant(query))
+
+    def collect_ensembl_gene(self, gene: str) -> Optional[Dict]:
+        return run_sync(self.acollect_ensembl_gene(gene))
+
+    def collect_ensembl_variants(self, gene_data: Dict, limit: int = VARIANT_LIMIT) -> Optional["VariantTable"]:
+        return run_sync(self.acollect_ensembl_variants(gene_data, limit))
+
+    def collect_ensembl_gene_and_variants(self, gene: str):
+        return run_sync(self.acollect_ensembl_gene_and_variants(gene))
+
+    def collect_ensembl_vep(self, snp_id: str) -> Optional[List[Dict]]:
+        return run_sync(self.acollect_ensembl_vep(snp_id))
+
+    def collect_clinicaltables(self, snp_id: str) -> Optional[Dict]:
+        return run_sync(self.acollect_clinicaltables(snp_id))
+
+    def collect_ncbi_gene(self, gene_symbol: str) -> Optional[Dict]:
+        return run_sync(self.acollect_ncbi_gene(gene_symbol))
+
+    def collect_ncbi_snp(self, snp_id: str) -> Optional[Dict]:
+        return run_sync(self.acollect_ncbi_snp(snp_id))
+
+    def collect_uniprot(self, gene_symbol: str) -> Optional[Dict]:
+        return run_sync(self.acollect_uniprot(gene_symbol))
+
+    # ---- bulk collectors used by run_batch, each returns {normalized query: payload} ----
+
+    def _split_cached(self, source: str, queries: List[str]):
+        hits, misses = {}, []
+        for q in queries:
+            value = self.cache.get(source, q) if self.cache is not None else MISS
+            if value is MISS:
+                misses.append(q)
+            else:
+                hits[normalize_query(q)] = value
+        return hits, misses
+
+    def _store_batch(self, source: str, results: Dict[str, Any]):
+        if self.cache is None:
+            return
+        for key, value in results.items():
+            if value is not None:
+                self.cache.set(source, key, value)
+
+    def collect_mygene_batch(self, genes: List[str]) -> Dict[str, Any]:
+        results, missing = self._split_cached("mygene", genes)
+        fetched = {}
+        try:
+            for chunk in _chunks(missing, BATCH_LIMITS["mygene"]):
+                response = self.http.post(
+                    f"{MYGENE_URL}/v3/query",
+                    data={
+                        "q": ",".join(chunk),
+                        "scopes": "symbol",
+                        "species": "human",
+                        "fields": "entrezgene,symbol,name,summary,genomic_pos_hg38,pathway,clinvar",
+                    },
+                    timeout=30,
+                )
+                response.raise_for_status()
+                for hit in response.json():
+                    key = normalize_query(hit.pop("query", ""))
+                    if hit.get("notfound") or key in fetched:
+                        continue
+                    hit.pop("_score", None)
+                    fetched[key] = hit
+        except Exception as e:
+            print(f"MyGene.info batch error: {e}")
+        self._store_batch("mygene", fetched)
+        results.update(fetched)
+        return results
+
+    def collect_ncbi_gene_batch(self, entrez_ids: Dict[str, str]) -> Dict[str, Any]:
+        # entrez_ids maps normalized gene symbol -> Entrez Gene ID (from MyGene)
+        results, missing = self._split_cached("ncbi_gene", list(entrez_ids))
+        fetched = {}
+        try:
+            for chunk in _chunks(missing, BATCH_LIMITS["ncbi"]):
+                ids = {str(entrez_ids[q]): normalize_query(q) for q in chunk}
+                response = self.http.post(
+                    f"{NCBI_EUTILS_URL}/esummary.fcgi",
+                    data={"db": "gene", "id": ",".join(ids), "retmode": "json"},
+                    timeout=30,
+                )
+                response.raise_for_status()
+                result = response.json().get("result", {})
+                for uid, key in ids.items():
+                    if uid in result:
+                        fetched[key] = result[uid]
+        except Exception as e:
+            print(f"NCBI Gene batch error: {e}")
+        self._store_batch("ncbi_gene", fetched)
+        results.update(fetched)
+        return results
+
+    def collect_ensembl_gene_batch(self, genes: List[str]) -> Dict[str, Any]:
+        results, missing = self._split_cached("ensembl_lookup", genes)
+        fetched = {}
+        for gene in list(missing):
+            ids = self.resolve_gene(gene)
+            if ids and ids.ensembl_locus():
+                fetched[normalize_query(gene)] = ids.ensembl_locus()
+                missing.remove(gene)
+        try:
+            for chunk in _chunks(missing, BATCH_LIMITS["ensembl_lookup"]):
+                response = self.http.post(
+                    f"{ENSEMBL_URL}/lookup/symbol/homo_sapiens",
+                    json={"symbols": chunk},
+                    headers={"Content-Type": "application/json", "Accept": "application/json"},
+                    timeout=30,
+                )
+                response.raise_for_status()
+                for symbol, record in response.json().items():
+                    if record and record.get("id"):
+                        fetched[normalize_query(symbol)] = _ensembl_locus(record)
+        except Exception as e:
+            print(f"Ensembl gene batch lookup error: {e}")
+        self._store_batch("ensembl_lookup", fetched)
+        results.update(fetched)
+        return results
+
+    def collect_myvariant_batch(self, snp_ids: List[str]) -> Dict[str, Any]:
+        results, missing = self._split_cached("myvariant", snp_ids)
+        fetched: Dict[str, Any] = {}
+        try:
+            for chunk in _chunks(missing, BATCH_LIMITS["myvariant"]):
+                response = self.http.post(
+                    f"{MYVARIANT_URL}/v1/variant",
+                    data={
+                        "ids": ",".join(chunk),
+                        "fields": "clinvar,dbnsfp,cadd,cosmic,gnomad,dbsnp,hgvs,gene,refseq,ensembl,exac",
+                        "dotfield": "true",
+                    },
+                    timeout=30,
+                )
+                response.raise_for_status()
+                for doc in response.json():
+                    key = normalize_query(doc.pop("query", ""))
+                    if doc.get("notfound"):
+                        continue
+                    # an rsID can map to several alleles, keep them all like the single lookup does
+                    if key in fetched:
+                        previous = fetched[key]
+                        fetched[key] = (previous if isinstance(previous, list) else [previous]) + [doc]
+                    else:
+                        fetched[key] = doc
+        except Exception as e:
+            print(f"MyVariant.info batch error: {e}")
+        self._store_batch("myvariant", fetched)
+        results.update(fetched)
+        return results
+
+    def collect_ensembl_vep_batch(self, snp_ids: List[str]) -> Dict[str, Any]:
+        results, missing = self._split_cached("ensembl_vep", snp_ids)
+        fetched: Dict[str, List[Dict]] = {}
+        try:
+            for chunk in _chunks(missing, BATCH_LIMITS["ensembl_vep"]):
+                response = self.http.post(
+                    f"{ENSEMBL_URL}/vep/homo_sapiens/id",
+                    json={"ids": chunk},
+                    headers={"Content-Type": "application/json", "Accept": "application/json"},
+                    timeout=60,
+                )
+                response.raise_for_status()
+                for record in response.json():
+                    key = normalize_query(record.get("input") or record.get("id", ""))
+                    fetched.setdefault(key, []).append(record)
+        except Exception as e:
+            print(f"Ensembl VEP batch error: {e}")
+        self._store_batch("ensembl_vep", fetched)
+        results.update(fetched)
+        return results
+
+    def collect_ncbi_snp_batch(self, snp_ids: List[str]) -> Dict[str, Any]:
+        results, missing = self._split_cached("ncbi_snp", snp_ids)
+        fetched = {}
+        for snp_id in list(missing):
+            local = self.local_variant(snp_id)
+            if local:
+                fetched[normalize_query(snp_id)] = local.as_ncbi_summary()
+                missing.remove(snp_id)
+        try:
+            for chunk in _chunks(missing, BATCH_LIMITS["ncbi"]):
+                ids = {q.lower().replace("rs", ""): normalize_query(q) for q in chunk}
+                response = self.http.post(
+                    f"{NCBI_EUTILS_URL}/esummary.fcgi",
+                    data={"db": "snp", "id": ",".join(ids), "retmode": "json"},
+                    timeout=30,
+                )
+                response.raise_for_status()
+                result = response.json().get("result", {})
+                for uid, key in ids.items():
+                    if uid in result:
+                        fetched[key] = result[uid]
+        except Exception as e:
+            print(f"ncbi dbSNP batch error: {e}")
+        self._store_batch("ncbi_snp", fetched)
+        results.update(fetched)
+        return results
+
+    def _make_tool_decl(self, name: str, params: Dict) -> "types.FunctionDeclaration":
+        types = _genai_types()
         return types.FunctionDeclaration(
             name=name,
             description=params.get("description", ""),
@@ -253,23 +883,42 @@ class BioinfoAgent:
             ),
         )
 
-    def _run_tool_execution(self, query: str) -> Dict[str, Any]:
-        if not self.client:
-            return {"error": "API client not initialized"}
-
-        query_type = self.classify_input(query)
-        fn_map = {
-            "collect_ensembl_gene_and_variants": self.collect_ensembl_gene_and_variants,
-            "collect_ncbi_gene": self.collect_ncbi_gene,
-            "collect_uniprot": self.collect_uniprot,
-            "collect_mygene": self.collect_mygene,
-
-            "collect_clinicaltables": self.collect_clinicaltables,
-            "collect_ensembl_vep": self.collect_ensembl_vep,
-            "collect_ncbi_snp": self.collect_ncbi_snp,
-            "collect_myvariant": self.collect_myvariant,
+    def _tool_functions(self) -> Dict[str, Any]:
+        return {
+            "collect_ensembl_gene_and_variants": self.acollect_ensembl_gene_and_variants,
+            "collect_ncbi_gene": self.acollect_ncbi_gene,
+            "collect_uniprot": self.acollect_uniprot,
+            "collect_mygene": self.acollect_mygene,
+
+            "collect_clinicaltables": self.acollect_clinicaltables,
+            "collect_ensembl_vep": self.acollect_ensembl_vep,
+            "collect_ncbi_snp": self.acollect_ncbi_snp,
+            "collect_myvariant": self.acollect_myvariant,
         }
 
+    async def _call_tool(self, fn_map: Dict[str, Any], name: str, args: Dict[str, Any]) -> Any:
+        py_fn = fn_map.get(name)
+        if not py_fn:
+            return {"error": "tool not available"}
+
+        try:
+            if name == "collect_ensembl_gene_and_variants":
+                return await py_fn(args.get("gene"))
+            elif name in ("collect_ncbi_gene", "collect_uniprot"):
+                return await py_fn(args.get("gene_symbol"))
+            elif name in ("collect_mygene"):
+                return await py_fn(args.get("gene"))
+            elif name in ("collect_clinicaltables", "collect_ensembl_vep", "collect_ncbi_snp"):
+                return await py_fn(args.get("snp_id"))
+            elif name == "collect_myvariant":
+                return await py_fn(args.get("query"))
+            else:
+                return await py_fn(**args)
+        except Exception as e:
+            return {"error": str(e)}
+
+    def _planner_tool(self, query_type: str) -> "types.Tool":
+        types = _genai_types()
         gene_tool_decls = [
             self._make_tool_decl("collect_ensembl_gene_and_variants", {
             "description": "Fetch Ensembl gene metadata and the overlapping variants for the given gene symbol.",
@@ -315,97 +964,66 @@ class BioinfoAgent:
             }),
         ]
 
-        tool = types.Tool(function_declarations=(gene_tool_decls if query_type == "gene" else snp_tool_decls))
-
-        planner_prompt = (
-            f"You are a Bioinformatic Data Collector. Use the provided functions to gather ALL raw data for the {query_type.upper()}.\n"
-            f"- Respond ONLY with function calls until you have everything you can get.\n"
-            f"- When done, return ONE JSON object: "
-            f'{{"query":"{query}","type":"{query_type}","sources":{{...}}}} and STOP.'
-        )
+        return types.Tool(function_declarations=(gene_tool_decls if query_type == "gene" else snp_tool_decls))
 
-        contents = [
-            types.Content(role="user", parts=[types.Part.from_text(text=f"Collect all data for {query}")])
-        ]
+    async def _run_tool_execution(self, query: str) -> Dict[str, Any]:
+        if not self.client:
+            return {"error": "API client not initialized"}
 
-        collected = {}
+        planner = _PlannerConversation(self, query)
+        fn_map = self._tool_functions()
+        deadline = current_deadline()
         for attempt in range(3):
-            resp = self.client.models.generate_content(
-                model="gemini-2.5-flash",
-                contents=contents,
-                config=types.GenerateContentConfig(
-                    system_instruction=planner_prompt,
-                    tools=[tool],
-                ),
-
-            )
-
-            function_calls = []
-            for cand in resp.candidates:
-                if not cand.content or not cand.content.parts:
-                    continue
-                for p in cand.content.parts:
-                    if getattr(p, "function_call", None):
-                        function_calls.append(p.function_call)
-
-            if function_calls:
-                tool_parts = []
-                for fc in function_calls:
-                    name = fc.name
-                    args = dict(fc.args)
-                    py_fn = fn_map.get(name)
-                    if not py_fn:
-                        tool_parts.append(
-                            types.Part.from_function_response(
-                                name=name,
-                                response={"content": [{"text": json.dumps({"error": "tool not available"})}]},
-                            )
-                        )
-                        continue
-
-                    try:
-                        if name == "collect_ensembl_gene_and_variants":
-                            out = py_fn(args.get("gene"))
-                        elif name in ("collect_ncbi_gene", "collect_uniprot"):
-                            out = py_fn(args.get("gene_symbol"))
-                        elif name in ("collect_mygene"):
-                            out = py_fn(args.get("gene"))
-                        elif name in ("collect_clinicaltables", "collect_ensembl_vep", "collect_ncbi_snp"):
-                            out = py_fn(args.get("snp_id"))
-                        elif name == "collect_myvariant":
-                            out = py_fn(args.get("query"))
-                        else:
-                            out = py_fn(**args)
-                    except Exception as e:
-                        out = {"error": str(e)}
-
-                    collected[name.replace("collect_", "")] = out
-                    tool_parts.append(
-                        types.Part.from_function_response(
-                            name=name,
-                            response={"content": [{"text": json.dumps(out if out is not None else {"result": "None"})}]},
-                        )
+            # no time for another turn: summarize what the earlier turns collected
+            if deadline is not None and deadline.expired():
+                break
+            try:
+                with span("planner_turn", "llm", turn=attempt, model="gemini-2.5-flash"):
+                    resp = await self.client.aio.models.generate_content(
+                        model="gemini-2.5-flash",
+                        contents=planner.contents,
+                        config=planner.config(),
                     )
+            except Exception as e:
+                if deadline is None or not deadline.expired():
+                    raise
+                print(f"planner turn cut off by the deadline: {e}")
+                break
 
-
-                contents.append(resp.candidates[0].content)
-                contents.append(types.Content(role="tool", parts=tool_parts))
+            calls = planner.function_calls(resp)
+            if calls:
+                # sources with an open circuit are answered right away instead of waiting out their timeout
+                skip = planner.unavailable(calls, fn_map)
+                run = [i for i in range(len(calls)) if i not in skip]
+                # run every call of this turn concurrently, the ones still out at the deadline are left behind
+                tasks, late = await self._gather(lambda call: self._call_tool(fn_map, *call), [calls[i] for i in run])
+                outputs = {i: {"error": "deadline exceeded"} if task in late else task.result()
+                           for i, task in zip(run, tasks)}
+                planner.add_tool_responses(resp, calls, outputs, fn_map,
+                                           late={i for i, task in zip(run, tasks) if task in late})
                 continue
 
-            final_text = resp.text or ""
-            try:
-                parsed = json.loads(final_text)
-                return parsed
-            except Exception:
-                break
+            answer = planner.answer(resp)
+            if answer is not None:
+                return answer
+            break
 
-        return {"query": query, "type": query_type, "sources": collected}
+        return planner.result()
     
-    def ai_summary(self, data: Dict[str, Any]) -> str:
-        if not self.client:
-             return "API Client not initialized."
-
-        data_sources_json = json.dumps(data['sources'], indent=2)
+    def _summary_prompt(self, data: Dict[str, Any]) -> tuple:
+        # only the fields the summary sections use go into the prompt
+        with span("prune_and_encode_sources", "json"):
+            pruned_sources, prompt_stats = prune_sources(data['sources'], self.prompt_token_budget)
+            data_sources_json = json.dumps(pruned_sources)
+        missing = data.get("missing_sources") or []
+        skipped = data.get("skipped_sources") or []
+        missing_note = ""
+        if missing:
+            missing_note += f"NOTE: these sources did not answer in time and are NOT in the data: {', '.join(missing)}. "
+        if skipped:
+            missing_note += f"NOTE: these sources are currently unavailable and were skipped: {', '.join(skipped)}. "
+        if missing_note:
+            missing_note += "Say so where their information would belong."
         
         prompt = f"""You are a clinical data aggregation system analyzing bioinformatics API responses.
 
@@ -421,6 +1039,7 @@ class BioinfoAgent:
 
             DATA FROM MULTIPLE SOURCES (these are the ONLY sources you can use):
             {data_sources_json}
+            {missing_note}
 
             Generate a concise, structured clinical insight summary following this exact format:
 
@@ -456,34 +1075,395 @@ class BioinfoAgent:
             Screening recommendations
 
         """
-        try:
-            response = self.client.models.generate_content(
-                model="gemini-2.5-flash", 
-                contents=prompt,
+        template_chars = len(prompt) - len(data_sources_json)
+        prompt_stats["prompt_chars_before"] = template_chars + prompt_stats["source_chars_before"]
+        prompt_stats["prompt_chars_after"] = len(prompt)
+        prompt_stats["prompt_tokens_before"] = prompt_stats["prompt_chars_before"] // CHARS_PER_TOKEN + 1
+        prompt_stats["prompt_tokens_after"] = estimate_tokens(prompt)
+        return prompt, prompt_stats
+
+    async def aai_summary(self, data: Dict[str, Any], prompt_stats: Optional[Dict[str, int]] = None) -> str:
+        """
+        prompt_stats, when given, is filled with the prompt size before and
+        after source pruning.
+        """
+        if not self.client:
+             return "API Client not initialized."
 
-            )
+        prompt, stats = self._summary_prompt(data)
+        if prompt_stats is not None:
+            prompt_stats.update(stats)
+        try:
+            with span("ai_summary", "llm", model="gemini-2.5-flash",
+                      prompt_chars=len(prompt), prompt_tokens=stats["prompt_tokens_after"]):
+                response = await self.client.aio.models.generate_content(
+                    model="gemini-2.5-flash", 
+                    contents=prompt,
+                    config=_llm_config(),
+                )
             return response.text
         except Exception as e:
             return f"error generating summary: {e}"
+
+    def ai_summary(self, data: Dict[str, Any], prompt_stats: Optional[Dict[str, int]] = None) -> str:
+        return run_sync(self.aai_summary(data, prompt_stats))
+
+    async def aai_summary_stream(self, data: Dict[str, Any],
+                                 prompt_stats: Optional[Dict[str, int]] = None) -> AsyncIterator[str]:
+        """
+        Same prompt as aai_summary, but yields the markdown in chunks as Gemini
+        produces it so the UI can render sections before the whole summary is done.
+        """
+        if not self.client:
+             yield "API Client not initialized."
+             return
+
+        prompt, stats = self._summary_prompt(data)
+        if prompt_stats is not None:
+            prompt_stats.update(stats)
+        try:
+            with span("ai_summary_stream", "llm", model="gemini-2.5-flash",
+                      prompt_chars=len(prompt), prompt_tokens=stats["prompt_tokens_after"]) as llm_span:
+                started = time.perf_counter()
+                first_chunk = True
+                deadline = current_deadline()
+                async for chunk in await self.client.aio.models.generate_content_stream(
+                    model="gemini-2.5-flash",
+                    contents=prompt,
+                    config=_llm_config(),
+                ):
+                    if deadline is not None and deadline.expired():
+                        llm_span.set(truncated=True)
+                        yield "\n\n_Summary cut short: the response-time budget ran out._"
+                        return
+                    if chunk.text:
+                        if first_chunk:
+                            llm_span.set(first_chunk_ms=round((time.perf_counter() - started) * 1000, 3))
+                            first_chunk = False
+                        yield chunk.text
+        except Exception as e:
+            yield f"error generating summary: {e}"
+
+    def ai_summary_stream(self, data: Dict[str, Any], prompt_stats: Optional[Dict[str, int]] = None) -> Iterator[str]:
+        return iterate_sync(self.aai_summary_stream(data, prompt_stats))
     
-    def run(self, query: str) -> Dict[str, Any]:
+    async def _run_direct_collection(self, query: str) -> Dict[str, Any]:
+        # the useful tool set per query type is fixed, so call all of it without asking the planner
+        query = query.strip()
+        query_type = self.classify_input(query)
+        fn_map = self._tool_functions()
+        names = GENE_SOURCES if query_type == "gene" else SNP_SOURCES
+
+        async def call(name):
+            try:
+                return await fn_map["collect_" + name](query)
+            except Exception as e:
+                return {"error": str(e)}
+
+        # sources with an open circuit are not called at all
+        skipped = [name for name in names if not self.source_available(name, query)]
+        names = [name for name in names if name not in skipped]
+        tasks, late = await self._gather(call, names)
+        sources = {name: task.result() for name, task in zip(names, tasks) if task not in late}
+        return {"query": query, "type": query_type, "sources": sources,
+                "missing_sources": [name for name, task in zip(names, tasks) if task in late],
+                "skipped_sources": skipped}
+
+    async def _gather(self, fn, items: List[Any]):
+        """
+        Runs fn over items as tasks on the running loop, at most
+        max_tool_workers at once, and waits until all are done or the current
+        deadline passes. Returns the tasks (in item order) and the set still
+        running; those are not waited for, they finish (and fill the cache)
+        in the background.
+        """
+        workers = asyncio.Semaphore(max(1, self.max_tool_workers))
+
+        async def bounded(item):
+            async with workers:
+                return await fn(item)
+
+        tasks = [asyncio.ensure_future(bounded(item)) for item in items]
+        if not tasks:
+            return tasks, set()
+        deadline = current_deadline()
+        _, late = await asyncio.wait(tasks, timeout=deadline.remaining() if deadline is not None else None)
+        if late:
+            current_span().set(missing=len(late))
+            for task in late:
+                # the loop only holds weak references to tasks
+                _background_tasks.add(task)
+                task.add_done_callback(_background_tasks.discard)
+        return tasks, late
+
+    async def acollect(self, query: str, mode: str = "planner") -> Dict[str, Any]:
+        """
+        mode="planner" lets Gemini pick the collectors (up to three LLM turns),
+        mode="direct" calls every collector for the query type and only uses
+        the LLM for the summary.
+        """
+        if mode not in COLLECTION_MODES:
+            raise ValueError(f"unknown collection mode {mode!r}, expected one of {COLLECTION_MODES}")
+
+        # identical queries collected at the same moment (several users, same gene) share one collection
+        try:
+            collected_data, shared = await self.flights.group("collect").do(
+                (normalize_query(query), mode), lambda: self._collect(query, mode)
+            )
+        except DeadlineExceeded as e:
+            # joined a collection that outlasts this caller's budget
+            return {"error": str(e)}
+        if shared:
+            current_span().set(coalesced=True)
+        return dict(collected_data)
+
+    def collect(self, query: str, mode: str = "planner") -> Dict[str, Any]:
+        return run_sync(self.acollect(query, mode))
+
+    async def _collect(self, query: str, mode: str) -> Dict[str, Any]:
         print("running")
-        collected_data = self._run_tool_execution(query)
+        # within a deadline, collection stops early enough to leave time for the summary
+        deadline = current_deadline()
+        with deadline_scope(deadline.reserve(self._summary_reserve(deadline)) if deadline is not None else None):
+            if mode == "direct":
+                collected_data = await self._run_direct_collection(query)
+            else:
+                collected_data = await self._run_tool_execution(query)
         print("done collecting")
+        return self._collection_done(collected_data, mode)
+
+    def _collection_done(self, collected_data: Dict[str, Any], mode: str) -> Dict[str, Any]:
+        if "error" not in collected_data:
+            collected_data["collection_mode"] = mode
+            collected_data.setdefault("missing_sources", [])
+            collected_data.setdefault("skipped_sources", [])
+            if collected_data["skipped_sources"]:
+                current_span().set(skipped=len(collected_data["skipped_sources"]))
+        return collected_data
+
+    async def arun(self, query: str, mode: str = "planner", tracer: Optional[Tracer] = None,
+                   deadline_s: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Pass a Tracer to export the full span timeline afterwards
+        (tracer.to_json() / tracer.to_chrome_trace()); the per-stage breakdown
+        is always attached to the result under "timings".
+
+        The whole run is bounded by deadline_s (default self.deadline_s):
+        sources that have not answered when collection's share of it is up
+        are listed under "missing_sources" and the summary is written from
+        the rest.
+
+        Collectors share one pooled httpx client per event loop
+        (AsyncHttpTransport) and Gemini is called through client.aio, so many
+        queries can be in flight on one loop without a thread each.
+        """
+        tracer = tracer or Tracer(query)
+        with tracer.activate(), self.deadline_scope(deadline_s) as deadline, \
+                span("run", "run", query=query, mode=mode) as run_span:
+            if deadline is not None:
+                run_span.set(deadline_ms=round(deadline.remaining() * 1000, 3))
+            # concurrent runs of the same query wait for the first one instead of repeating it
+            try:
+                result, shared = await self.flights.group("run").do(
+                    (normalize_query(query), mode), lambda: self._run(query, mode)
+                )
+            except DeadlineExceeded as e:
+                # joined a run that outlasts this caller's budget
+                result, shared = {"error": str(e)}, True
+            if shared:
+                run_span.set(coalesced=True)
+
+        result = dict(result)
+        result["timings"] = tracer.breakdown()
+        return result
+
+    def run(self, query: str, mode: str = "planner", tracer: Optional[Tracer] = None,
+            deadline_s: Optional[float] = None) -> Dict[str, Any]:
+        """
+        arun() for synchronous callers (the Streamlit app, scripts): runs on
+        the process-wide background loop, so concurrent run() calls from any
+        thread share one connection pool and join each other's work.
+        """
+        return run_sync(self.arun(query, mode, tracer, deadline_s))
+
+    async def _run(self, query: str, mode: str) -> Dict[str, Any]:
+        collected_data = await self.acollect(query, mode)
         if "error" in collected_data:
             return collected_data
-        
-        summary = self.ai_summary(collected_data)
+        prompt_stats: Dict[str, int] = {}
+        summary = await self.aai_summary(collected_data, prompt_stats)
+        return self.build_result(query, collected_data, summary, prompt_stats)
+
+    def build_result(self, query: str, collected_data: Dict[str, Any], summary: Optional[str],
+                     prompt_stats: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        result = self._build_result(query, collected_data["type"], collected_data["sources"], summary)
+        result["collection_mode"] = collected_data.get("collection_mode")
+        result["missing_sources"] = collected_data.get("missing_sources", [])
+        result["skipped_sources"] = collected_data.get("skipped_sources", [])
+        result["prompt_stats"] = prompt_stats or {}
+        return result
 
-        sources = source_mapper(list(collected_data["sources"].keys()))
+    def _build_result(self, query: str, query_type: str, raw_data: Dict[str, Any], summary: Optional[str]) -> Dict[str, Any]:
+        sources = source_mapper(list(raw_data.keys()))
         result = {
             "query": query,
-            "type": collected_data["type"],
+            "type": query_type,
             "data_sources_used": sources,
-            "raw_data": collected_data["sources"],
+            "raw_data": raw_data,
             "ai_summary": summary
         }
 
         return result
 
+    def run_batch(self, queries: List[str], summarize: bool = True, max_workers: int = 8,
+                  deadline_s: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Collect data for many gene symbols / rsIDs at once through the upstream
+        bulk endpoints (MyGene, MyVariant, Ensembl lookup + VEP, NCBI esummary)
+        and yield one run()-shaped result per unique query as soon as all of
+        its sources are in (and its summary is written, if summarize=True).
+
+        The whole batch is bounded by deadline_s (default: none, or the
+        enclosing deadline_scope). Queries still waiting for a source when
+        collection's share of it is up are summarized without it and list it
+        under "missing_sources", like run().
+        """
+        with deadline_scope(deadline_s):
+            yield from self._run_batch(queries, summarize, max_workers)
+
+    def _run_batch(self, queries: List[str], summarize: bool, max_workers: int) -> Iterator[Dict[str, Any]]:
+        unique: Dict[str, str] = {}
+        for q in queries:
+            q = q.strip()
+            if q and normalize_query(q) not in unique:
+                unique[normalize_query(q)] = q
+        genes = [q for q in unique.values() if self.classify_input(q) == "gene"]
+        snps = [q for q in unique.values() if self.classify_input(q) == "snp"]
+
+        query_type = {normalize_query(q): "gene" for q in genes}
+        query_type.update({normalize_query(q): "snp" for q in snps})
+        collected: Dict[str, Dict[str, Any]] = {key: {} for key in unique}
+        missing: Dict[str, List[str]] = {key: [] for key in unique}
+        summarizing = set()
+        deadline = current_deadline()
+        # within a deadline, collection stops early enough to leave time for the summaries
+        collection = deadline.reserve(self._summary_reserve(deadline)) if deadline is not None else None
+
+        pool = ThreadPoolExecutor(max_workers=max_workers)
+        tasks: Dict[Any, Any] = {}
+
+        def submit(source, keys, fn, *args):
+            # workers see the caller's deadline and tracer
+            tasks[traced_submit(pool, fn, *args)] = (source, keys)
+
+        def record(source, keys, out):
+            # returns the queries whose last missing source just arrived
+            ready = []
+            for key in keys:
+                collected[key][source] = out.get(key)
+                expected = GENE_SOURCES if query_type[key] == "gene" else SNP_SOURCES
+                if len(collected[key]) == len(expected):
+                    ready.append(key)
+            return ready
+
+        def finish(key):
+            expected = GENE_SOURCES if query_type[key] == "gene" else SNP_SOURCES
+            sources = {name: collected[key][name] for name in expected if name not in missing[key]}
+            # empty because the upstream's circuit was open, not because it had nothing
+            skipped = [name for name, value in sources.items() if value is None and not self.source_available(name)]
+            collected_data = {"query": unique[key], "type": query_type[key], "sources": sources,
+                              "missing_sources": missing[key], "skipped_sources": skipped,
+                              "collection_mode": "batch"}
+            summary = None
+            prompt_stats: Dict[str, int] = {}
+            if summarize:
+                summary = self.ai_summary(collected_data, prompt_stats)
+            return self.build_result(unique[key], collected_data, summary, prompt_stats)
+
+        def summarize_later(key):
+            summarizing.add(key)
+            submit("summary", [key], finish, key)
+
+        # genes the local index knows go straight to NCBI esummary instead of waiting for MyGene's Entrez IDs
+        local_entrez: Dict[str, str] = {}
+        for g in genes:
+            ids = self.resolve_gene(g)
+            if ids:
+                local_entrez[normalize_query(g)] = ids.entrez_id
+
+        if genes:
+            gene_keys = [normalize_query(g) for g in genes]
+            submit("mygene", gene_keys, self.collect_mygene_batch, genes)
+            if local_entrez:
+                submit("ncbi_gene", list(local_entrez), self.collect_ncbi_gene_batch, local_entrez)
+            submit("ensembl_lookup", gene_keys, self.collect_ensembl_gene_batch, genes)
+            for g in genes:
+                submit("uniprot", [normalize_query(g)], lambda g=g: {normalize_query(g): self.collect_uniprot(g)})
+        if snps:
+            snp_keys = [normalize_query(s) for s in snps]
+            submit("myvariant", snp_keys, self.collect_myvariant_batch, snps)
+            submit("ensembl_vep", snp_keys, self.collect_ensembl_vep_batch, snps)
+            submit("ncbi_snp", snp_keys, self.collect_ncbi_snp_batch, snps)
+            for s in snps:
+                submit("clinicaltables", [normalize_query(s)], lambda s=s: {normalize_query(s): self.collect_clinicaltables(s)})
+
+        try:
+            pending = set(tasks)
+            while pending:
+                timeout = max(0.0, collection.remaining()) if collection is not None and len(summarizing) < len(unique) else None
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    # collection's share of the deadline is up: summarize every query with what it has
+                    for future, (source, _) in list(tasks.items()):
+                        if source != "summary":
+                            del tasks[future]
+                    for key in unique:
+                        if key not in summarizing:
+                            expected = GENE_SOURCES if query_type[key] == "gene" else SNP_SOURCES
+                            missing[key] = [name for name in expected if name not in collected[key]]
+                            summarize_later(key)
+                    current_span().set(missing=sum(1 for names in missing.values() if names))
+                    pending = set(tasks)
+                    continue
+                for future in done:
+                    source, keys = tasks.pop(future)
+                    if source == "summary":
+                        yield future.result()
+                        continue
+                    try:
+                        out = future.result() or {}
+                    except Exception as e:
+                        print(f"batch {source} error: {e}")
+                        out = {}
+
+                    ready = []
+                    if source == "mygene":
+                        # NCBI esummary needs Entrez IDs, which MyGene just gave us
+                        keys = [k for k in keys if k not in local_entrez]
+                        entrez = {k: out[k].get("entrezgene") or out[k].get("_id") for k in keys if out.get(k)}
+                        ready += record("ncbi_gene", [k for k in keys if not entrez.get(k)], {})
+                        if entrez:
+                            submit("ncbi_gene", [k for k in keys if entrez.get(k)], self.collect_ncbi_gene_batch,
+                                   {k: v for k, v in entrez.items() if v})
+                    if source == "ensembl_lookup":
+                        # no bulk overlap endpoint, so variants are fetched per gene with the resolved loci
+                        ready += record("ensembl_gene_and_variants", [k for k in keys if not out.get(k)],
+                                        {k: {"ensembl_gene": None, "ensembl_variants": None} for k in keys})
+                        for key in keys:
+                            if out.get(key):
+                                submit("ensembl_gene_and_variants", [key], lambda key=key, locus=out[key]: {
+                                    key: cached_call(self.cache, "ensembl_gene_and_variants", key,
+                                                     lambda: filter_high_impact_variants(
+                                                         self.collect_ensembl_variants(locus)),
+                                                     _has_variants)
+                                })
+                    else:
+                        ready += record(source, keys, out)
+
+                    for key in ready:
+                        summarize_later(key)
+                pending = set(tasks)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
 
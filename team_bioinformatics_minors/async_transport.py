@@ -0,0 +1,362 @@
+import asyncio
+import collections
+import contextlib
+import threading
+import time
+import weakref
+from typing import TYPE_CHECKING, Any, AsyncIterator, Deque, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from circuit import BreakerBoard, CircuitOpen
+from deadline import Deadline, current_deadline
+from ratelimit import THROTTLE_STATUSES, HostScheduler, RateLimiter
+from tracing import span
+from transport import MAX_RETRY_AFTER, RETRY_STATUSES, get_transport
+
+if TYPE_CHECKING:
+    import httpx
+
+# hedging: a GET still running after the host's p95 gets a duplicate, first answer wins
+HEDGE_QUANTILE = 0.95
+HEDGE_MIN_SAMPLES = 20
+HEDGE_WINDOW = 200
+# at most this share of a host's requests may be hedges, so a slow host is not hit twice as hard
+HEDGE_BUDGET = 0.1
+
+
+class LatencyTracker:
+    """Sliding window of recent request latencies per (method, host)."""
+
+    def __init__(self, window: int = HEDGE_WINDOW):
+        self.window = window
+        self._samples: Dict[Tuple[str, str], Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, key: Tuple[str, str], seconds: float):
+        with self._lock:
+            self._samples.setdefault(key, collections.deque(maxlen=self.window)).append(seconds)
+
+    def quantile(self, key: Tuple[str, str], q: float, min_samples: int = HEDGE_MIN_SAMPLES) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def stats(self, method: str = "GET") -> Dict[str, Dict[str, Optional[float]]]:
+        """p50 / p95 per host of method's recent requests (the p95 is the hedging threshold), in milliseconds."""
+        with self._lock:
+            keys = [key for key in self._samples if key[0] == method]
+        stats = {}
+        for key in keys:
+            p50 = self.quantile(key, 0.5, min_samples=1)
+            p95 = self.quantile(key, HEDGE_QUANTILE, min_samples=1)
+            stats[key[1]] = {"p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+                             "p95_ms": round(p95 * 1000, 1) if p95 is not None else None}
+        return stats
+
+
+class AsyncHttpTransport:
+    """
+    asyncio counterpart of HttpTransport on a pooled httpx.AsyncClient:
+    the same per-host pacing (adaptive concurrency slot, token bucket,
+    Retry-After) and circuit breakers as the sync transport, so sync and
+    async callers share one quota, one set of rate_stats() and one view of
+    upstream health; retries on 5xx / connection errors with exponential
+    backoff, deadline-capped timeouts and hedging of slow GETs.
+
+    An httpx client belongs to the event loop it was created on, so each
+    loop using the transport gets its own client.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        retries: int = 3,
+        backoff_factor: float = 0.5,
+        timeout: float = 15,
+        limiter: Optional[RateLimiter] = None,
+        breakers: Optional[BreakerBoard] = None,
+        throttle_retries: int = 4,
+        hedge: bool = True,
+    ):
+        sync = get_transport() if limiter is None or breakers is None else None
+        self.limiter = limiter or sync.limiter
+        self.breakers = breakers or sync.breakers
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.timeout = timeout
+        self.throttle_retries = throttle_retries
+        self.hedge = hedge
+        self.latency = LatencyTracker()
+        # event loop -> client; entries go away with their loop
+        self._loops: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = \
+            weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._host_stats: Dict[str, Dict[str, int]] = {}
+
+    def _client(self) -> "httpx.AsyncClient":
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._loops.get(loop)
+            if client is None:
+                # httpx is only needed once something runs async, keep it out of the import path
+                import httpx
+                client = httpx.AsyncClient(
+                    limits=httpx.Limits(max_connections=self.max_connections,
+                                        max_keepalive_connections=self.max_keepalive_connections),
+                    timeout=self.timeout,
+                    follow_redirects=True,
+                )
+                self._loops[loop] = client
+            return client
+
+    async def request(self, method: str, url: str, **kwargs) -> "httpx.Response":
+        """
+        Same contract as HttpTransport.request: raises CircuitOpen for hosts
+        with an open circuit and DeadlineExceeded once the deadline is gone;
+        5xx after the last retry is returned, not raised.
+        """
+        async with self._request(method, url, False, kwargs) as response:
+            return response
+
+    async def get(self, url: str, **kwargs) -> "httpx.Response":
+        return await self.request("GET", url, **kwargs)
+
+    @contextlib.asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs) -> AsyncIterator["httpx.Response"]:
+        """Like request(), but the body is left unread for aiter_bytes(); closed when the block ends."""
+        async with self._request(method, url, True, kwargs) as response:
+            yield response
+
+    @contextlib.asynccontextmanager
+    async def _request(self, method: str, url: str, stream: bool, kwargs: Dict[str, Any]) -> AsyncIterator["httpx.Response"]:
+        import httpx
+
+        client = self._client()
+        timeout = kwargs.pop("timeout", self.timeout)
+        parts = urlsplit(url)
+        host = parts.netloc
+        scheduler = self.limiter.scheduler(host)
+        if scheduler.limit.api_key and scheduler.limit.key_param:
+            kwargs["params"] = dict(kwargs.get("params") or {}, **{scheduler.limit.key_param: scheduler.limit.api_key})
+        deadline = current_deadline()
+        breaker = self.breakers.for_host(host)
+
+        with span(f"{method} {host}", "http", host=host, path=parts.path, transport="async") as http_span:
+            try:
+                breaker.allow()
+            except CircuitOpen:
+                http_span.set(circuit="open")
+                raise
+            hedge_after = self._hedge_delay(method, host, stream)
+            hedged = False
+            started = time.monotonic()
+            try:
+                if hedge_after is None:
+                    response, retries, throttled, waited = await self._send(client, scheduler, deadline, method, url,
+                                                                            timeout, stream, kwargs)
+                else:
+                    (response, retries, throttled, waited), hedged = await self._send_hedged(
+                        client, scheduler, deadline, method, url, timeout, kwargs, hedge_after)
+            except httpx.TransportError as e:
+                breaker.record(False, time.monotonic() - started, type(e).__name__)
+                self._record(host, errors=1)
+                raise
+            except BaseException:
+                breaker.cancel()
+                raise
+            breaker.record(response.status_code < 500, time.monotonic() - started, f"HTTP {response.status_code}")
+
+            try:
+                if not stream:
+                    await response.aread()
+                size = int(response.headers.get("Content-Length", 0)) if stream else len(response.content)
+                self._record(host, retries=retries, throttled=throttled, bytes=size)
+                http_span.set(status=response.status_code, bytes=size, retries=retries, throttled=throttled,
+                              queue_wait_ms=round(waited * 1000, 3), hedged=hedged)
+                yield response
+            finally:
+                await response.aclose()
+
+    async def _send(self, client: "httpx.AsyncClient", scheduler: HostScheduler, deadline: Optional[Deadline],
+                    method: str, url: str, timeout: float, stream: bool, kwargs: Dict[str, Any],
+                    slotted: Optional[asyncio.Event] = None) -> Tuple["httpx.Response", int, int, float]:
+        # one logical request: retries of 5xx / connection errors and of throttled responses;
+        # returns (response, retries, throttled, waited). slotted is set once the request holds its slot and token
+        import httpx
+
+        retries = throttled = 0
+        waited = 0.0
+        while True:
+            attempt_timeout = deadline.timeout(timeout) if deadline is not None else timeout
+            # the slot reports throttling to the host's adaptive limit and pauses its bucket on Retry-After
+            async with scheduler.aslot() as ticket:
+                if slotted is not None:
+                    slotted.set()
+                started = time.monotonic()
+                try:
+                    request = client.build_request(method, url, timeout=attempt_timeout, **kwargs)
+                    response = await client.send(request, stream=True)
+                except httpx.TransportError:
+                    ticket.report(None)
+                    if retries >= self.retries:
+                        raise
+                    response = None
+                else:
+                    ticket.report(response.status_code, response.headers.get("Retry-After"))
+                    if method == "GET" and not stream and not ticket.throttled:
+                        self.latency.observe((method, scheduler.host), time.monotonic() - started)
+            waited += ticket.waited
+
+            if response is not None and response.status_code in THROTTLE_STATUSES and throttled < self.throttle_retries:
+                backoff = min(ticket.retry_after if ticket.retry_after is not None
+                              else self.backoff_factor * 2 ** throttled, MAX_RETRY_AFTER)
+                throttled += 1
+            elif response is None or (response.status_code in RETRY_STATUSES and retries < self.retries):
+                backoff = self.backoff_factor * 2 ** retries
+                retries += 1
+            else:
+                return response, retries, throttled, waited
+
+            if deadline is not None and backoff >= deadline.remaining():
+                # no time to sit out the pause: hand back what we have, or give up on the connection error
+                if response is None:
+                    raise httpx.ConnectError(f"no time left to retry {url}")
+                return response, retries, throttled, waited
+            if response is not None:
+                await response.aclose()
+            await asyncio.sleep(backoff)
+
+    def _hedge_delay(self, method: str, host: str, stream: bool) -> Optional[float]:
+        # GETs with a body read in one go only (streamed responses are consumed by the caller)
+        if not self.hedge or method != "GET" or stream:
+            return None
+        p95 = self.latency.quantile((method, host), HEDGE_QUANTILE)
+        if p95 is None:
+            return None
+        with self._lock:
+            stats = self._host_stats.get(host, {})
+            if stats.get("hedged", 0) >= HEDGE_BUDGET * stats.get("requests", 0):
+                return None
+        return p95
+
+    async def _send_hedged(self, client: "httpx.AsyncClient", scheduler: HostScheduler, deadline: Optional[Deadline],
+                           method: str, url: str, timeout: float, kwargs: Dict[str, Any],
+                           hedge_after: float) -> Tuple[Tuple["httpx.Response", int, int, float], bool]:
+        """
+        Sends the request and, if it has not answered hedge_after seconds
+        after going out, a duplicate; returns the first successful answer and
+        whether a duplicate went out. The slower copy is cancelled.
+        """
+        slotted = asyncio.Event()
+        tasks = {asyncio.ensure_future(self._send(client, scheduler, deadline, method, url, timeout, False,
+                                                  dict(kwargs), slotted))}
+        try:
+            # time spent queued for a slot or a token is pacing, not a slow host: the timer starts once the request is out
+            out = asyncio.ensure_future(slotted.wait())
+            await asyncio.wait(tasks | {out}, return_when=asyncio.FIRST_COMPLETED)
+            out.cancel()
+            done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+            if done:
+                return done.pop().result(), False
+
+            self._record(scheduler.host, request=False, hedged=1)
+            tasks.add(asyncio.ensure_future(self._send(client, scheduler, deadline, method, url, timeout, False,
+                                                       dict(kwargs))))
+            error: Optional[BaseException] = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                answers = [task for task in done if task.exception() is None]
+                for extra in answers[1:]:
+                    await extra.result()[0].aclose()
+                if answers:
+                    return answers[0].result(), True
+                error = error or next(iter(done)).exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _record(self, host: str, request: bool = True, **counts: int):
+        with self._lock:
+            stats = self._host_stats.setdefault(
+                host, {"requests": 0, "errors": 0, "retries": 0, "throttled": 0, "hedged": 0, "bytes": 0}
+            )
+            stats["requests"] += request
+            for key, value in counts.items():
+                stats[key] += value
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Per-host request/error/retry/throttle/hedge/byte counters of the async requests."""
+        with self._lock:
+            return {host: dict(counts) for host, counts in self._host_stats.items()}
+
+    def pool_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Per-host view of the connection pools of every loop's client (open
+        and idle sockets) merged with our own request/retry/hedge/byte
+        counters.
+        """
+        stats = self.stats()
+        with self._lock:
+            clients = list(self._loops.values())
+        for client in clients:
+            # httpx keeps its connections on the transport's httpcore pool
+            for connection in list(client._transport._pool.connections):
+                origin = connection._origin
+                host = origin.host.decode()
+                if origin.port not in (None, 80, 443):
+                    host = f"{host}:{origin.port}"
+                counts = stats.setdefault(host, {})
+                counts["open_connections"] = counts.get("open_connections", 0) + 1
+                counts["idle_connections"] = counts.get("idle_connections", 0) + connection.is_idle()
+                counts["pool_maxsize"] = self.max_connections
+        return stats
+
+    def latency_stats(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """p50 / p95 of recent non-streamed GETs per host (the p95 is the hedging threshold), in milliseconds."""
+        return self.latency.stats("GET")
+
+    async def warm(self, url: str, timeout: float = 5) -> int:
+        """
+        Opens a pooled keep-alive connection to url's host on the running
+        loop's client with a HEAD request (paced like any other request), so
+        the first real request skips DNS, TCP and TLS setup. Returns the
+        status code.
+        """
+        import httpx
+
+        parts = urlsplit(url)
+        with span(f"HEAD {parts.netloc}", "http", host=parts.netloc, path=parts.path, prewarm=True, transport="async"):
+            async with self.limiter.scheduler(parts.netloc).aslot() as ticket:
+                try:
+                    response = await self._client().head(url, timeout=timeout, follow_redirects=False)
+                except httpx.TransportError:
+                    ticket.report(None)
+                    raise
+                ticket.report(response.status_code, response.headers.get("Retry-After"))
+        return response.status_code
+
+    async def aclose(self):
+        # closes the client of the running loop; the others are closed from their own loops
+        with self._lock:
+            client = self._loops.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+
+_shared_transport: Optional[AsyncHttpTransport] = None
+_shared_lock = threading.Lock()
+
+
+def get_async_transport() -> AsyncHttpTransport:
+    # process-wide, so every agent's arun() on a loop shares one connection pool
+    global _shared_transport
+    with _shared_lock:
+        if _shared_transport is None:
+            _shared_transport = AsyncHttpTransport()
+        return _shared_transport
@@ -0,0 +1,75 @@
+import asyncio
+import queue
+import threading
+from typing import Any, AsyncIterator, Coroutine, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_thread: Optional[threading.Thread] = None
+_lock = threading.Lock()
+# end of an iterate_sync() stream
+_DONE = object()
+
+
+def get_background_loop() -> asyncio.AbstractEventLoop:
+    """
+    The process-wide event loop the synchronous API (run(), collect(),
+    collect_* ...) runs its coroutines on, in a daemon thread started on
+    first use. One loop means one httpx pool and one set of in-flight calls
+    for every thread.
+    """
+    global _loop, _thread
+    with _lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            _thread = threading.Thread(target=loop.run_forever, name="bioinfo-loop", daemon=True)
+            _thread.start()
+            _loop = loop
+        return _loop
+
+
+def run_sync(coro: Coroutine[Any, Any, T]) -> T:
+    """
+    Runs coro on the background loop and blocks until it is done. The task
+    starts with a copy of the caller's context, so the active tracer, span
+    and deadline carry over. Must not be called from the loop's own thread.
+    """
+    loop = get_background_loop()
+    if threading.current_thread() is _thread:
+        coro.close()
+        raise RuntimeError("run_sync() called from the background loop, await the coroutine instead")
+    future = asyncio.run_coroutine_threadsafe(coro, loop)
+    try:
+        return future.result()
+    finally:
+        # e.g. KeyboardInterrupt while waiting: don't leave the task running
+        future.cancel()
+
+
+def iterate_sync(agen: AsyncIterator[T]) -> Iterator[T]:
+    """
+    Iterates an async generator from a thread. The whole generator runs as
+    one task on the background loop (so its context variables stay in one
+    task) and hands its items over through a queue. Stopping early cancels
+    the task.
+    """
+    items: "queue.Queue[Any]" = queue.Queue()
+
+    async def pump():
+        try:
+            async for item in agen:
+                items.put(item)
+        finally:
+            items.put(_DONE)
+
+    future = asyncio.run_coroutine_threadsafe(pump(), get_background_loop())
+    try:
+        while True:
+            item = items.get()
+            if item is _DONE:
+                break
+            yield item
+        future.result()
+    finally:
+        future.cancel()
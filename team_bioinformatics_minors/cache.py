@@ -0,0 +1,300 @@
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from tracing import current_span, span
+
+DAY = 24 * 60 * 60
+
+# upstream records change slowly; ID lookups almost never
+SOURCE_TTLS = {
+    "mygene": 7 * DAY,
+    "myvariant": 7 * DAY,
+    "ensembl_lookup": 30 * DAY,
+    "ensembl_gene_and_variants": 7 * DAY,
+    "ensembl_vep": 7 * DAY,
+    "clinicaltables": 30 * DAY,
+    "ncbi_gene": 7 * DAY,
+    "ncbi_snp": 7 * DAY,
+    "uniprot": 7 * DAY,
+}
+DEFAULT_TTL = DAY
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# writes between exact recounts of the cache size; other processes sharing the file make the running total drift
+RECOUNT_EVERY = 1000
+# finished run() results (summary included) shared by every app session
+DEFAULT_RESULT_TTL = 6 * 60 * 60
+DEFAULT_RESULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "responses.sqlite")
+
+MISS = object()
+
+
+def normalize_query(query: Any) -> str:
+    # BRCA1 / brca1 / " rs334 " all hit the same entry
+    return " ".join(str(query).split()).upper()
+
+
+class ResponseCache:
+    """
+    Disk-backed (SQLite) cache of upstream payloads keyed on source + normalized
+    query, with a TTL per source and LRU eviction once the file exceeds max_bytes.
+    Safe to share between threads and between the Streamlit/Flask processes.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES,
+                 ttls: Optional[Dict[str, float]] = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttls = dict(SOURCE_TTLS, **(ttls or {}))
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, source TEXT NOT NULL, value TEXT NOT NULL,"
+            " size INTEGER NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses (accessed_at)")
+        # running size of all entries, so a write doesn't have to sum the whole table
+        self._bytes = self._count_bytes()
+        self._writes = 0
+
+    def _key(self, source: str, query: Any) -> str:
+        return f"{source}:{normalize_query(query)}"
+
+    def get(self, source: str, query: Any) -> Any:
+        key = self._key(source, query)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at, size FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttls.get(source, DEFAULT_TTL):
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._bytes -= row[2]
+                self.misses[source] = self.misses.get(source, 0) + 1
+                return MISS
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits[source] = self.hits.get(source, 0) + 1
+        return json.loads(row[0])
+
+    def set(self, source: str, query: Any, value: Any):
+        payload = json.dumps(value, separators=(",", ":"))
+        now = time.time()
+        key = self._key(source, query)
+        with self._lock:
+            replaced = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, source, value, size, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, source, payload, len(payload), now, now),
+            )
+            self._bytes += len(payload) - (replaced[0] if replaced else 0)
+            self._writes += 1
+            if self._writes % RECOUNT_EVERY == 0:
+                self._bytes = self._count_bytes()
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _count_bytes(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def _evict(self):
+        # the running total may be off by what other processes wrote, confirm before deleting anything
+        self._bytes = self._count_bytes()
+        if self._bytes <= self.max_bytes:
+            return
+        # drop least recently used entries until we are back under the cap
+        excess = self._bytes - self.max_bytes
+        freed = 0
+        stale = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            stale.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+        self._bytes -= freed
+
+    def invalidate(self, source: str, query: Any):
+        key = self._key(source, query)
+        with self._lock:
+            row = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._bytes -= row[0]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+            hits, misses = dict(self.hits), dict(self.misses)
+        return {
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "hits": sum(hits.values()),
+            "misses": sum(misses.values()),
+            "by_source": {
+                source: {"hits": hits.get(source, 0), "misses": misses.get(source, 0)}
+                for source in sorted(set(hits) | set(misses))
+            },
+        }
+
+
+class ResultCache:
+    """
+    In-memory cache of finished results keyed on the normalized query and the
+    collection mode (planner and direct runs give different results), shared
+    across app sessions. Entries expire after ttl seconds and the least
+    recently used ones are dropped once the JSON size of all entries exceeds
+    max_bytes. get() returns (value, stored_at) so callers can show the age.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_RESULT_TTL, max_bytes: int = DEFAULT_RESULT_MAX_BYTES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, Optional[str]], Tuple[Any, float, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, query: Any, mode: Optional[str] = None) -> Optional[Tuple[Any, float]]:
+        key = (normalize_query(query), mode)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() - entry[1] > self.ttl:
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], entry[1]
+
+    def set(self, query: Any, value: Any, mode: Optional[str] = None):
+        key = (normalize_query(query), mode)
+        size = len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, time.time(), size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: Tuple[str, Optional[str]]):
+        self._bytes -= self._entries.pop(key)[2]
+
+    def invalidate(self, query: Any, mode: Optional[str] = None):
+        with self._lock:
+            if (normalize_query(query), mode) in self._entries:
+                self._drop((normalize_query(query), mode))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def cached_call(cache: Optional[ResponseCache], source: str, query: Any, fetch: Callable[[], Any],
+                cacheable: Callable[[Any], bool] = lambda value: value is not None) -> Any:
+    if cache is None or not query:
+        return fetch()
+
+    value = cache.get(source, query)
+    if value is not MISS:
+        current_span().set(cache="hit")
+        return value
+
+    current_span().set(cache="miss")
+    value = fetch()
+    if cacheable(value):
+        cache.set(source, query, value)
+    return value
+
+
+def cached_collector(source: str, cacheable: Callable[[Any], bool] = lambda value: value is not None):
+    """
+    Wraps a single-argument async acollect_* method so it is served from
+    self.cache when possible. Failed lookups (not cacheable) are never
+    stored. Identical calls already in flight on the same agent and event
+    loop are joined instead of repeated.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(self, query):
+            with span(fn.__name__, "collector", query=query) as collector_span:
+                value, shared = await self.flights.group("collector").do(
+                    (source, normalize_query(query)), lambda: _acached_call(self, source, query, fn, cacheable),
+                )
+                if shared:
+                    collector_span.set(coalesced=True)
+                return value
+        return wrapper
+    return decorator
+
+
+async def _acached_call(agent: Any, source: str, query: Any, fn: Callable, cacheable: Callable[[Any], bool]) -> Any:
+    # cached_call for coroutines; SQLite lookups take well under a millisecond, not worth a trip to a worker thread
+    cache = getattr(agent, "cache", None)
+    if cache is None or not query:
+        return await fn(agent, query)
+
+    value = cache.get(source, query)
+    if value is not MISS:
+        current_span().set(cache="hit")
+        return value
+
+    current_span().set(cache="miss")
+    value = await fn(agent, query)
+    if cacheable(value):
+        cache.set(source, query, value)
+    return value
+
+
+_shared_cache: Optional[ResponseCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """
+    Process-wide cache at $BIOINFO_CACHE_PATH (default .cache/responses.sqlite
+    next to this file). Setting BIOINFO_CACHE_PATH to an empty string disables it.
+    """
+    global _shared_cache
+    path = os.getenv("BIOINFO_CACHE_PATH", DEFAULT_CACHE_PATH)
+    if not path:
+        return None
+    with _shared_lock:
+        if _shared_cache is None:
+            max_bytes = int(os.getenv("BIOINFO_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+            _shared_cache = ResponseCache(path, max_bytes=max_bytes)
+        return _shared_cache
@@ -0,0 +1,186 @@
+import collections
+import os
+import threading
+import time
+from typing import Any, Deque, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+# rolling window the error and slow-call rates are computed over
+WINDOW_S = float(os.getenv("BIOINFO_BREAKER_WINDOW_S", "60"))
+WINDOW_CALLS = 50
+# no verdict on fewer calls than this
+MIN_CALLS = int(os.getenv("BIOINFO_BREAKER_MIN_CALLS", "5"))
+ERROR_RATE = float(os.getenv("BIOINFO_BREAKER_ERROR_RATE", "0.5"))
+# calls slower than SLOW_CALL_S count against the source too, a hung host is as bad as a failing one
+SLOW_CALL_S = float(os.getenv("BIOINFO_BREAKER_SLOW_CALL_S", "5"))
+SLOW_RATE = float(os.getenv("BIOINFO_BREAKER_SLOW_RATE", "0.8"))
+# open -> half-open after this long, doubled (up to MAX_OPEN_S) every time the probe fails
+OPEN_S = float(os.getenv("BIOINFO_BREAKER_OPEN_S", "30"))
+MAX_OPEN_S = 300
+# successful probes needed in half-open before closing again
+HALF_OPEN_PROBES = 2
+
+
+class CircuitOpen(Exception):
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} is unavailable (circuit open), skipped for the next {retry_in:.0f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Closed: calls go through and their outcome and latency are recorded.
+    Open: calls fail at once with CircuitOpen until the cool-down ends.
+    Half-open: one probe at a time; HALF_OPEN_PROBES successes close the
+    circuit, a failure opens it again for twice as long.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = CLOSED
+        # (finished at, ok, seconds) for the recent calls
+        self._calls: Deque[Tuple[float, bool, float]] = collections.deque(maxlen=WINDOW_CALLS)
+        self._opened_at = 0.0
+        self._open_for = OPEN_S
+        self._probing = False
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.rejected = 0
+        self.last_error: Optional[str] = None
+
+    def _advance(self, now: float):
+        if self.state == OPEN and now - self._opened_at >= self._open_for:
+            self.state = HALF_OPEN
+            self._probing = False
+            self._probe_successes = 0
+
+    def available(self) -> bool:
+        """Whether a call would be let through right now; unlike allow() it does not take the half-open probe."""
+        with self._lock:
+            self._advance(time.monotonic())
+            return self.state == CLOSED or (self.state == HALF_OPEN and not self._probing)
+
+    def allow(self):
+        """Admits one call or raises CircuitOpen. Every admitted call must end in record() or cancel()."""
+        with self._lock:
+            now = time.monotonic()
+            self._advance(now)
+            if self.state == CLOSED:
+                return
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            self.rejected += 1
+            retry_in = self._open_for - (now - self._opened_at) if self.state == OPEN else 0
+            raise CircuitOpen(self.name, max(0.0, retry_in))
+
+    def cancel(self):
+        # the call ended without saying anything about the source (e.g. our own deadline ran out)
+        with self._lock:
+            self._probing = False
+
+    def record(self, ok: bool, seconds: float, error: Optional[str] = None):
+        with self._lock:
+            now = time.monotonic()
+            if not ok:
+                self.last_error = error
+            if self.state == HALF_OPEN:
+                self._probing = False
+                if ok and seconds < SLOW_CALL_S:
+                    self._probe_successes += 1
+                    if self._probe_successes >= HALF_OPEN_PROBES:
+                        self.state = CLOSED
+                        self._open_for = OPEN_S
+                        self._calls.clear()
+                else:
+                    self._open(now, min(self._open_for * 2, MAX_OPEN_S))
+                return
+            if self.state == OPEN:
+                # a call admitted before the circuit opened, it no longer changes anything
+                return
+            self._calls.append((now, ok, seconds))
+            errors, slow, total = self._rates(now)
+            if total >= MIN_CALLS and (errors / total >= ERROR_RATE or slow / total >= SLOW_RATE):
+                self._open(now, OPEN_S)
+
+    def _open(self, now: float, open_for: float):
+        self.state = OPEN
+        self._opened_at = now
+        self._open_for = open_for
+        self.opened += 1
+
+    def _rates(self, now: float) -> Tuple[int, int, int]:
+        while self._calls and now - self._calls[0][0] > WINDOW_S:
+            self._calls.popleft()
+        errors = sum(1 for _, ok, _ in self._calls if not ok)
+        slow = sum(1 for _, ok, seconds in self._calls if ok and seconds >= SLOW_CALL_S)
+        return errors, slow, len(self._calls)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            self._advance(now)
+            errors, slow, total = self._rates(now)
+            latencies = sorted(seconds for _, _, seconds in self._calls)
+            return {
+                "state": self.state,
+                "calls": total,
+                "error_rate": round(errors / total, 3) if total else 0.0,
+                "slow_rate": round(slow / total, 3) if total else 0.0,
+                "p95_ms": round(latencies[min(total - 1, int(0.95 * total))] * 1000, 1) if total else None,
+                "retry_in_s": round(max(0.0, self._open_for - (now - self._opened_at)), 1) if self.state == OPEN else None,
+                "opened": self.opened,
+                "rejected": self.rejected,
+                "last_error": self.last_error,
+            }
+
+
+class BreakerBoard:
+    """
+    One breaker per upstream source. Hosts are mapped to their source with
+    register(); requests to a host nobody registered get a breaker of their own.
+    """
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._hosts: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def register(self, source: str, url: str):
+        with self._lock:
+            self._hosts[urlsplit(url).netloc] = source
+            self._breakers.setdefault(source, CircuitBreaker(source))
+
+    def get(self, source: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(source)
+            if breaker is None:
+                breaker = self._breakers[source] = CircuitBreaker(source)
+            return breaker
+
+    def for_host(self, host: str) -> CircuitBreaker:
+        with self._lock:
+            source = self._hosts.get(host, host)
+        return self.get(source)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {breaker.name: breaker.stats() for breaker in breakers}
+
+
+_shared_board: Optional[BreakerBoard] = None
+_shared_lock = threading.Lock()
+
+
+def get_breakers() -> BreakerBoard:
+    # process-wide, so every agent and every Streamlit session sees the same source health
+    global _shared_board
+    with _shared_lock:
+        if _shared_board is None:
+            _shared_board = BreakerBoard()
+        return _shared_board
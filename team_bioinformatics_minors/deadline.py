@@ -0,0 +1,65 @@
+import contextlib
+import contextvars
+import time
+from typing import Iterator, Optional, Union
+
+_current_deadline: contextvars.ContextVar = contextvars.ContextVar("bioinfo_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class Deadline:
+    """
+    Point in time a query has to be answered by. Travels in a context
+    variable (like the tracer), so collectors, the transport and the LLM
+    calls all see how much of the budget is left.
+    """
+
+    __slots__ = ("expires_at", "seconds")
+
+    def __init__(self, seconds: float, expires_at: Optional[float] = None):
+        self.seconds = seconds
+        self.expires_at = expires_at if expires_at is not None else time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def timeout(self, cap: Optional[float] = None) -> float:
+        """Seconds a single call may take: what is left, at most cap. Raises once nothing is left."""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"deadline of {self.seconds:g}s exceeded")
+        return remaining if cap is None else min(cap, remaining)
+
+    def reserve(self, seconds: float) -> "Deadline":
+        # the same deadline minus time kept back for a later stage (e.g. the summary after collection)
+        return Deadline(self.seconds, max(time.monotonic(), self.expires_at - seconds))
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+
+@contextlib.contextmanager
+def deadline_scope(deadline: Union[Deadline, float, None]) -> Iterator[Optional[Deadline]]:
+    """
+    Makes deadline (a Deadline or a number of seconds from now) current for
+    the block. An enclosing deadline that ends earlier stays in force; None
+    keeps whatever is current.
+    """
+    if deadline is not None and not isinstance(deadline, Deadline):
+        deadline = Deadline(deadline)
+    outer = _current_deadline.get()
+    if deadline is None or (outer is not None and outer.expires_at <= deadline.expires_at):
+        yield outer
+        return
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
@@ -0,0 +1,238 @@
+"""
+Local gene identifier index (symbol / alias -> Entrez, Ensembl, UniProt, HGNC,
+optionally GRCh38 coordinates), so collectors can skip the symbol-resolution
+round trip and call the detail endpoints directly.
+
+Build it once from downloaded public dumps (any subset, .gz is fine):
+
+    python gene_index.py --gene-info Homo_sapiens.gene_info.gz \\
+        --hgnc hgnc_complete_set.txt --ensembl-coords mart_export.txt
+
+gene_info: https://ftp.ncbi.nlm.nih.gov/gene/DATA/GENE_INFO/Mammalia/
+HGNC complete set: https://www.genenames.org/download/archive/
+--ensembl-coords is an Ensembl BioMart export with Gene stable ID, Chromosome/scaffold name, Gene
+start (bp) and Gene end (bp); without it Ensembl loci are still looked up online.
+"""
+import argparse
+import csv
+import gzip
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+DEFAULT_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "gene_index.sqlite")
+
+# names.kind: official symbols win over aliases / previous symbols
+SYMBOL, ALIAS = 0, 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS genes (
+    entrez_id TEXT PRIMARY KEY, symbol TEXT NOT NULL, hgnc_id TEXT, ensembl_id TEXT, uniprot_id TEXT,
+    chromosome TEXT, start INTEGER, end INTEGER
+);
+CREATE TABLE IF NOT EXISTS names (
+    name TEXT NOT NULL, entrez_id TEXT NOT NULL, kind INTEGER NOT NULL, PRIMARY KEY (name, entrez_id)
+) WITHOUT ROWID;
+"""
+
+
+class GeneIds(NamedTuple):
+    symbol: str
+    entrez_id: str
+    hgnc_id: Optional[str]
+    ensembl_id: Optional[str]
+    uniprot_id: Optional[str]
+    chromosome: Optional[str]
+    start: Optional[int]
+    end: Optional[int]
+
+    def ensembl_locus(self) -> Optional[Dict]:
+        # same shape as agent._ensembl_locus, only when the build had coordinates
+        if not (self.ensembl_id and self.chromosome and self.start and self.end):
+            return None
+        return {"id": self.ensembl_id, "seq_region_name": self.chromosome, "start": self.start, "end": self.end}
+
+
+class GeneIndex:
+    """Read side of the index, safe to share between threads."""
+
+    def __init__(self, path: str):
+        self.path = path
+        # read-only: the index is only ever written by build_gene_index
+        self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    def resolve(self, name: str) -> Optional[GeneIds]:
+        """
+        Official symbol first, then alias / previous symbol when it points at
+        exactly one gene. Ambiguous aliases return None so the caller falls
+        back to the upstream search.
+        """
+        key = name.strip().upper()
+        if not key:
+            return None
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT n.kind, g.symbol, g.entrez_id, g.hgnc_id, g.ensembl_id, g.uniprot_id, g.chromosome, g.start, g.end"
+                " FROM names n JOIN genes g ON g.entrez_id = n.entrez_id WHERE n.name = ? ORDER BY n.kind",
+                (key,),
+            ).fetchall()
+        best = [r for r in rows if r[0] == rows[0][0]] if rows else []
+        if len(best) != 1:
+            return None
+        return GeneIds(*best[0][1:])
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM genes").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+
+def _open_text(path: str):
+    return gzip.open(path, "rt", newline="") if path.endswith(".gz") else open(path, newline="")
+
+
+def _split(value: Optional[str], sep: str = "|") -> List[str]:
+    if not value or value == "-":
+        return []
+    return [v.strip().strip('"') for v in value.strip('"').split(sep) if v.strip().strip('"')]
+
+
+def _read_tsv(path: str) -> Iterator[Dict[str, str]]:
+    with _open_text(path) as f:
+        header = f.readline().lstrip("#").rstrip("\n").split("\t")
+        for row in csv.reader(f, delimiter="\t", quoting=csv.QUOTE_NONE):
+            yield dict(zip(header, row))
+
+
+def parse_gene_info(path: str) -> Iterator[Dict]:
+    # NCBI gene_info: tax_id GeneID Symbol LocusTag Synonyms dbXrefs chromosome ...
+    for row in _read_tsv(path):
+        if row.get("tax_id") != "9606":
+            continue
+        xrefs = {}
+        for xref in _split(row.get("dbXrefs")):
+            db, _, value = xref.partition(":")
+            xrefs.setdefault(db, value)
+        yield {
+            "entrez_id": row["GeneID"],
+            "symbol": row["Symbol"],
+            "aliases": _split(row.get("Synonyms")),
+            "hgnc_id": xrefs.get("HGNC"),
+            "ensembl_id": xrefs.get("Ensembl"),
+            "chromosome": row.get("chromosome") if row.get("chromosome") not in (None, "-") else None,
+        }
+
+
+def parse_hgnc(path: str) -> Iterator[Dict]:
+    # HGNC complete set: hgnc_id symbol ... alias_symbol prev_symbol ... entrez_id ensembl_gene_id ... uniprot_ids
+    for row in _read_tsv(path):
+        if not row.get("entrez_id"):
+            continue
+        uniprot = _split(row.get("uniprot_ids"))
+        yield {
+            "entrez_id": row["entrez_id"],
+            "symbol": row["symbol"],
+            "aliases": _split(row.get("alias_symbol")) + _split(row.get("prev_symbol")),
+            "hgnc_id": row.get("hgnc_id") or None,
+            "ensembl_id": row.get("ensembl_gene_id") or None,
+            "uniprot_id": uniprot[0] if uniprot else None,
+        }
+
+
+def parse_ensembl_coords(path: str) -> Iterator[Dict]:
+    # BioMart column names vary a little between releases, match on prefixes
+    for row in _read_tsv(path):
+        cols = {k.lower(): v for k, v in row.items()}
+        gene = next((v for k, v in cols.items() if k.startswith("gene stable id")), None)
+        chrom = next((v for k, v in cols.items() if k.startswith("chromosome")), None)
+        start = next((v for k, v in cols.items() if k.startswith("gene start")), None)
+        end = next((v for k, v in cols.items() if k.startswith("gene end")), None)
+        if gene and chrom and start and end:
+            yield {"ensembl_id": gene, "chromosome": chrom, "start": int(start), "end": int(end)}
+
+
+def build_gene_index(path: str = DEFAULT_INDEX_PATH, gene_info: Optional[str] = None, hgnc: Optional[str] = None,
+                     ensembl_coords: Optional[str] = None) -> int:
+    """
+    (Re)builds the index at path from whichever dumps are given; HGNC values
+    take precedence over gene_info for the same Entrez ID. Returns the number
+    of genes indexed.
+    """
+    genes: Dict[str, Dict] = {}
+    for source in (parse_gene_info(gene_info) if gene_info else (), parse_hgnc(hgnc) if hgnc else ()):
+        for rec in source:
+            gene = genes.setdefault(rec["entrez_id"], {"aliases": set()})
+            gene["aliases"].update(rec.pop("aliases"))
+            gene.update({k: v for k, v in rec.items() if v})
+
+    if ensembl_coords:
+        by_ensembl = {g["ensembl_id"]: g for g in genes.values() if g.get("ensembl_id")}
+        for rec in parse_ensembl_coords(ensembl_coords):
+            gene = by_ensembl.get(rec["ensembl_id"])
+            # skip patches/haplotypes, keep the primary assembly locus
+            if gene is not None and (len(rec["chromosome"]) <= 2 or "start" not in gene):
+                gene.update(chromosome=rec["chromosome"], start=rec["start"], end=rec["end"])
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    conn = sqlite3.connect(tmp)
+    conn.executescript(SCHEMA)
+    conn.executemany(
+        "INSERT INTO genes VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            (eid, g["symbol"], g.get("hgnc_id"), g.get("ensembl_id"), g.get("uniprot_id"),
+             g.get("chromosome"), g.get("start"), g.get("end"))
+            for eid, g in genes.items() if g.get("symbol")
+        ),
+    )
+    names = {}
+    for eid, g in genes.items():
+        if not g.get("symbol"):
+            continue
+        names[(g["symbol"].upper(), eid)] = SYMBOL
+        for alias in g["aliases"]:
+            names.setdefault((alias.upper(), eid), ALIAS)
+    conn.executemany("INSERT INTO names VALUES (?, ?, ?)", ((n, eid, kind) for (n, eid), kind in names.items()))
+    conn.commit()
+    conn.close()
+    # swap in atomically so running apps never see a half-built index
+    os.replace(tmp, path)
+    return len(genes)
+
+
+_shared_index: Optional[GeneIndex] = None
+_shared_lock = threading.Lock()
+
+
+def get_gene_index() -> Optional[GeneIndex]:
+    """
+    Process-wide index at $BIOINFO_GENE_INDEX_PATH (default
+    .cache/gene_index.sqlite next to this file), or None if it has not been built.
+    """
+    global _shared_index
+    path = os.getenv("BIOINFO_GENE_INDEX_PATH", DEFAULT_INDEX_PATH)
+    if not path or not os.path.exists(path):
+        return None
+    with _shared_lock:
+        if _shared_index is None:
+            _shared_index = GeneIndex(path)
+        return _shared_index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the local gene identifier index.")
+    parser.add_argument("--gene-info", help="NCBI Homo_sapiens.gene_info(.gz)")
+    parser.add_argument("--hgnc", help="HGNC hgnc_complete_set.txt")
+    parser.add_argument("--ensembl-coords", help="Ensembl BioMart export with gene coordinates")
+    parser.add_argument("--out", default=os.getenv("BIOINFO_GENE_INDEX_PATH") or DEFAULT_INDEX_PATH)
+    args = parser.parse_args()
+    if not (args.gene_info or args.hgnc):
+        parser.error("pass --gene-info and/or --hgnc")
+    count = build_gene_index(args.out, args.gene_info, args.hgnc, args.ensembl_coords)
+    print(f"indexed {count} genes into {args.out}")
@@ -1,36 +1,79 @@
-def filter_high_impact_variants(variants: list) -> list:
+import codecs
+import json
+from typing import Any, List
 
-    if not variants:
-        return []
 
-    impactful = {
-        "stop_gained", "stop_lost", "start_lost",
-        "frameshift_variant", "splice_acceptor_variant", "splice_donor_variant",
-        "transcript_ablation", "transcript_amplification", "missense_variant", "inframe_deletion", "inframe_insertion",
-        "coding_sequence_variant", "protein_altering_variant"
-    }
-    pathogenic_labels = {"pathogenic", "likely_pathogenic"}
-    pathogenic_variants = []
-    impactful_variants = []
 
-    for v in variants:
+class JsonArrayParser:
+    """
+    Incremental parser for a top-level JSON array: feed() takes the next
+    chunk of bytes and returns the elements it completed, so a large
+    Ensembl response never has to be materialized in one piece. Works the
+    same for sync and async streams.
+    """
 
-        consequence = v.get("consequence_type", "")
-        clin_sig = v.get("clinical_significance", [])
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._started = False
+        self.finished = False
 
-        if any(sig.lower() in pathogenic_labels for sig in clin_sig):
-            pathogenic_variants.append(v)
-            continue
+    def feed(self, chunk: bytes) -> List[Any]:
+        items = []
+        if self.finished:
+            return items
+        buf = self._buf + self._text.decode(chunk)
+        pos = 0
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(buf):
+                break
+            if not self._started:
+                if buf[pos] != "[":
+                    raise ValueError("expected a JSON array")
+                self._started = True
+                pos += 1
+                continue
+            if buf[pos] == "]":
+                self.finished = True
+                break
+            try:
+                item, pos = self._decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                # element is cut off at the chunk boundary, wait for more bytes
+                break
+            items.append(item)
+        self._buf = buf[pos:]
+        return items
 
-        if consequence in impactful:
-            impactful_variants.append(v)
-            continue
 
+class PartialVariants(list):
+    """
+    Variant list filtered from an incomplete VariantTable: usable like any
+    list for this answer, but not worth caching.
+    """
+
+
+def filter_high_impact_variants(variants, limit: int = 100) -> list:
+    """
+    Pathogenic first, then likely pathogenic, then high-impact consequences,
+    each ranked by Ensembl consequence severity. Accepts a VariantTable or a
+    list of Ensembl variation dicts; an incomplete table gives a
+    PartialVariants list.
+    """
+    if variants is None or len(variants) == 0:
+        return []
+
+    # variants pulls in numpy, so it is loaded with the first variant list rather than with the app
+    from variants import VariantTable
 
-    filtered = pathogenic_variants + impactful_variants
+    table = variants if isinstance(variants, VariantTable) else VariantTable.from_records(variants)
 
     #prevent large list for agent to filter
-    return filtered[:100]
+    records = table.to_records(table.top_k(limit))
+    return records if table.complete else PartialVariants(records)
 
 
 def source_mapper(sources):
@@ -48,4 +91,34 @@ def source_mapper(sources):
 
     for source in sources:
         res.append(mapped[source])
-    return res
\ No newline at end of file
+    return res
+
+
+def split_summary_sections(summary: str, partial: bool = False) -> list:
+    """
+    Splits the markdown summary into (header, content) pairs on "##".
+    With partial=True (summary still streaming) a trailing section whose
+    header line is not finished yet is left out.
+    """
+    sections = []
+    for sec in summary.split("##")[1:]:
+        lines = sec.strip().splitlines()
+        if not lines:
+            continue
+        sections.append((lines[0].strip(), "\n".join(lines[1:]).strip()))
+
+    if partial and sections and "\n" not in summary.rsplit("##", 1)[-1]:
+        sections.pop()
+    return sections
+
+
+def format_age(seconds: float) -> str:
+    # "just now", "12 min ago", "3 h ago", "2 days ago"
+    if seconds < 60:
+        return "just now"
+    if seconds < 3600:
+        return f"{int(seconds // 60)} min ago"
+    if seconds < 86400:
+        return f"{int(seconds // 3600)} h ago"
+    days = int(seconds // 86400)
+    return f"{days} day{'s' if days > 1 else ''} ago"
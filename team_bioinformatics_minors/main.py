@@ -1,49 +1,171 @@
-import requests 
-from google import genai
 import os 
+import json
+import threading
+import time
 from dotenv import load_dotenv
 import streamlit as st
 from agent import BioinfoAgent
+from cache import DEFAULT_RESULT_MAX_BYTES, DEFAULT_RESULT_TTL, ResultCache
+from helpers import format_age, source_mapper, split_summary_sections
+from tracing import Tracer, span
 load_dotenv()
 GOOGLE_API = os.getenv("GEMINI_API_KEY")
 
+
+@st.cache_resource
+def get_agent() -> BioinfoAgent:
+    # one agent (and so one Gemini client and HTTP pool) for every session and rerun
+    agent = BioinfoAgent()
+    if os.getenv("BIOINFO_PREWARM", "1") != "0":
+        # client, upstream connections and local indexes get ready while the first page renders
+        threading.Thread(target=agent.prewarm, name="prewarm", daemon=True).start()
+    return agent
+
+
+@st.cache_resource
+def get_result_cache() -> ResultCache:
+    # finished summaries shared by every session, popular queries are answered instantly
+    return ResultCache(
+        ttl=float(os.getenv("BIOINFO_RESULT_TTL", DEFAULT_RESULT_TTL)),
+        max_bytes=int(os.getenv("BIOINFO_RESULT_MAX_BYTES", DEFAULT_RESULT_MAX_BYTES)),
+    )
+
+
+results = get_result_cache()
+
 # initializing session state variables
 if "data" not in st.session_state:
     st.session_state.data = None
 if "identifier" not in st.session_state:
     st.session_state.identifier = ""
+if "cached_at" not in st.session_state:
+    st.session_state.cached_at = None
 
 st.title("Welcome to your Genetic Variant AI Agent!")
 st.write("Enter a gene ID or SNP (e.g., BRCA1, rs334)")
 
 identifier = st.text_input("Gene ID or SNP", key="identifier")
+mode = st.radio(
+    "Collection mode",
+    ["planner", "direct"],
+    horizontal=True,
+    help="planner: Gemini chooses which databases to query. direct: query every database for this input type and skip the planning step (faster).",
+)
+
+def render_section(container, header, content):
+    container.markdown(f"<h2>{header}</h2>\n\n{content}", unsafe_allow_html=True)
+
+
+def update_sections(area, bodies, summary, partial):
+    # an expander appears as soon as its "## header" line is complete, then its body keeps filling in
+    for i, (header, content) in enumerate(split_summary_sections(summary, partial=partial)):
+        if i == len(bodies):
+            bodies.append(area.expander(f"{header}", expanded=True).empty())
+        render_section(bodies[i], header, content)
+
+
+def render_sources(container, sources):
+    container.subheader("Sources and Databases")
+    container.write(f"{', '.join(sources)}")
 
-if st.button("Summarize"):
+
+def refresh_result(query, mode):
+    # drop the shared entry and run the pipeline again on this rerun
+    results.invalidate(query, mode)
+    st.session_state.refresh = True
+
+
+with st.sidebar.expander("Result cache", expanded=False):
+    st.json(results.stats())
+    if st.button("Clear result cache"):
+        results.clear()
+    st.caption("Identical requests joined while in flight")
+    st.json(get_agent().flights.stats())
+
+with st.sidebar.expander("Upstream rate limits", expanded=False):
+    st.json(get_agent().http.rate_stats())
+    st.caption("Collector connections and request counters")
+    st.json(get_agent().ahttp.pool_stats())
+
+# open circuits first so a degraded source is visible without expanding anything
+breakers = get_agent().http.breakers.stats()
+down = [name for name, health in breakers.items() if health["state"] != "closed"]
+with st.sidebar.expander("Upstream health" + (f" ({len(down)} degraded)" if down else ""), expanded=bool(down)):
+    for name in down:
+        st.error(f"{name}: {breakers[name]['state'].replace('_', '-')} ({breakers[name]['last_error']})")
+    st.json(breakers)
+
+streamed = False
+if st.button("Summarize") or st.session_state.pop("refresh", False):
+    cached = results.get(st.session_state.identifier, mode) if st.session_state.identifier else None
     if not st.session_state.identifier:
         st.error("Please enter a gene ID or SNP.")
+    elif cached:
+        entry, st.session_state.cached_at = cached
+        st.session_state.data = entry["data"]
+        st.session_state.trace = entry["trace"]
     else:
-        agent = BioinfoAgent()
+        agent = get_agent()
+        tracer = Tracer(st.session_state.identifier)
+
+        # one response-time budget for collection and summary (BIOINFO_DEADLINE_S)
+        with agent.deadline_scope():
+            with st.spinner("Fetching data..."), tracer.activate(), span("collect", "run", mode=mode):
+                collected = agent.collect(
+                    query=st.session_state.identifier,
+                    mode=mode,
+                )
+
+            if "error" in collected:
+                st.error(collected["error"])
+                st.session_state.data = None
+            else:
+                # sections stream into this area, sources are shown below it right away
+                sections_area = st.container()
+                render_sources(st, source_mapper(list(collected["sources"].keys())))
+                if collected.get("missing_sources"):
+                    st.warning("No answer in time from: " + ", ".join(collected["missing_sources"])
+                               + ". The summary is based on the other sources.")
+                if collected.get("skipped_sources"):
+                    st.warning("Skipped, currently unavailable: " + ", ".join(collected["skipped_sources"])
+                               + ". See Upstream health in the sidebar.")
+
+                summary = ""
+                bodies = []
+                prompt_stats = {}
+                with tracer.activate(), span("summarize", "run"):
+                    for chunk in agent.ai_summary_stream(collected, prompt_stats):
+                        summary += chunk
+                        update_sections(sections_area, bodies, summary, partial=True)
+                    # the last header may only have been completed by the final chunk
+                    update_sections(sections_area, bodies, summary, partial=False)
+
+                st.session_state.data = agent.build_result(st.session_state.identifier, collected, summary, prompt_stats)
+                st.session_state.data["timings"] = tracer.breakdown()
+                st.session_state.trace = json.dumps(tracer.to_chrome_trace())
+                st.session_state.cached_at = None
+                streamed = True
+                # partial results are shown but not kept, the next request tries the missing sources again
+                if not summary.startswith(("error generating summary", "API Client not initialized")) \
+                        and not collected.get("missing_sources") and not collected.get("skipped_sources"):
+                    results.set(st.session_state.identifier, {"data": st.session_state.data, "trace": st.session_state.trace},
+                                mode)
 
-        with st.spinner("Fetching data..."):
-            st.session_state.data = agent.run(
-                query=st.session_state.identifier
-            )
 if st.session_state.data:
     data = st.session_state.data
 
-    # split ai summary into collapsible subsections
-    sections = data["ai_summary"].split("##")[1:]
+    if not streamed:
+        # split ai summary into collapsible subsections
+        for header, content in split_summary_sections(data["ai_summary"]):
+            with st.expander(f"{header}", expanded=True):
+                render_section(st, header, content)
 
-    for sec in sections:
-        lines = sec.strip().splitlines()
-        header = lines[0].strip()
-        content = "\n".join(lines[1:]).strip()
-        
-        with st.expander(f"{header}", expanded=True):
-            st.markdown(f"<h2>{header}</h2>\n\n{content}", unsafe_allow_html=True)
+        render_sources(st, data["data_sources_used"])
 
-    st.subheader("Sources and Databases")
-    st.write(f"{', '.join(data['data_sources_used'])}")
+    if st.session_state.cached_at is not None:
+        st.caption(f"Cached result from {format_age(time.time() - st.session_state.cached_at)}")
+        st.button("Refresh", on_click=refresh_result, args=(data["query"], data.get("collection_mode", mode)),
+                  help="Ignore the cached result and query the databases again.")
 
     st.download_button(
         label="Download AI Summary",
@@ -52,3 +174,12 @@ if st.session_state.data:
         mime="text/plain"
     )
 
+    if data.get("timings"):
+        with st.expander("Timing breakdown", expanded=False):
+            st.json(data["timings"])
+            st.download_button(
+                label="Download trace (Chrome format)",
+                data=st.session_state.get("trace", "{}"),
+                file_name=f"{identifier}_trace.json",
+                mime="application/json"
+            )
@@ -0,0 +1,167 @@
+import json
+from typing import Any, Callable, Dict, List, Tuple
+
+# rough rule of thumb for English/JSON text with the Gemini tokenizer
+CHARS_PER_TOKEN = 4
+DEFAULT_TOKEN_BUDGET = 8000
+
+MYVARIANT_KEEP = (
+    "_id", "clinvar.", "dbsnp.rsid", "dbsnp.chrom", "dbsnp.ref", "dbsnp.alt", "dbsnp.gene.", "dbsnp.hg19.",
+    "gnomad_genome.af.", "gnomad_exome.af.", "exac.af", "cadd.phred", "cadd.consequence",
+    "dbnsfp.genename", "dbnsfp.aa.", "dbnsfp.sift.pred", "dbnsfp.polyphen2.hdiv.pred", "cosmic.cosmic_id",
+)
+MYVARIANT_DROP = (".identifiers", ".accession", ".last_evaluated", ".review_status", ".origin", ".preferred_name")
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _texts(comment: Dict) -> List[str]:
+    return [t.get("value") for t in comment.get("texts", []) if t.get("value")]
+
+
+def prune_uniprot(entry: Dict) -> Dict:
+    comments = entry.get("comments", [])
+    genes = entry.get("genes") or [{}]
+    diseases = []
+    for c in comments:
+        if c.get("commentType") != "DISEASE":
+            continue
+        disease = c.get("disease") or {}
+        diseases.append({
+            "name": disease.get("diseaseId"),
+            "acronym": disease.get("acronym"),
+            "description": disease.get("description"),
+            "note": _texts(c.get("note") or {}),
+        })
+
+    return {
+        "accession": entry.get("primaryAccession"),
+        "protein_name": ((entry.get("proteinDescription") or {}).get("recommendedName") or {}).get("fullName", {}).get("value"),
+        "gene": (genes[0].get("geneName") or {}).get("value"),
+        "function": [t for c in comments if c.get("commentType") == "FUNCTION" for t in _texts(c)],
+        "subcellular_location": [
+            loc.get("location", {}).get("value")
+            for c in comments if c.get("commentType") == "SUBCELLULAR LOCATION"
+            for loc in c.get("subcellularLocations", [])
+        ],
+        "diseases": diseases,
+    }
+
+
+def prune_ncbi_gene(doc: Dict) -> Dict:
+    keep = ("name", "description", "summary", "otheraliases", "chromosome", "maplocation", "mim", "genomicinfo")
+    return {k: doc[k] for k in keep if doc.get(k)}
+
+
+def prune_ncbi_snp(doc: Dict) -> Dict:
+    keep = ("snp_id", "genes", "clinical_significance", "conditions", "global_mafs", "chrpos", "spdi", "fxn_class",
+            "docsum")
+    return {k: doc[k] for k in keep if doc.get(k)}
+
+
+def prune_mygene(doc: Dict) -> Dict:
+    pruned = {k: doc[k] for k in ("symbol", "name", "summary", "genomic_pos_hg38", "clinvar") if doc.get(k)}
+    pathways = []
+    for db, entries in (doc.get("pathway") or {}).items():
+        for p in entries if isinstance(entries, list) else [entries]:
+            if isinstance(p, dict) and p.get("name"):
+                pathways.append(f"{p['name']} ({db})")
+    if pathways:
+        pruned["pathways"] = pathways
+    return pruned
+
+
+def prune_myvariant(doc: Any) -> Any:
+    if isinstance(doc, list):
+        return [prune_myvariant(d) for d in doc]
+    return {
+        k: v for k, v in doc.items()
+        if k.startswith(MYVARIANT_KEEP) and not k.endswith(MYVARIANT_DROP)
+    }
+
+
+def prune_ensembl_vep(records: List[Dict]) -> List[Dict]:
+    pruned = []
+    for r in records:
+        transcripts = r.get("transcript_consequences") or []
+        canonical = [t for t in transcripts if t.get("canonical")] or transcripts[:3]
+        pruned.append({
+            "id": r.get("id"),
+            "location": f"{r.get('seq_region_name')}:{r.get('start')}-{r.get('end')}",
+            "allele_string": r.get("allele_string"),
+            "most_severe_consequence": r.get("most_severe_consequence"),
+            "colocated_variants": [
+                {k: cv[k] for k in ("id", "clin_sig", "frequencies", "minor_allele", "minor_allele_freq", "phenotype_or_disease") if k in cv}
+                for cv in r.get("colocated_variants") or []
+            ],
+            "transcript_consequences": [
+                {k: t[k] for k in ("gene_symbol", "transcript_id", "consequence_terms", "impact", "amino_acids",
+                                   "protein_start", "sift_prediction", "polyphen_prediction") if k in t}
+                for t in canonical
+            ],
+        })
+    return pruned
+
+
+PRUNERS: Dict[str, Callable[[Any], Any]] = {
+    "uniprot": prune_uniprot,
+    "ncbi_gene": prune_ncbi_gene,
+    "ncbi_snp": prune_ncbi_snp,
+    "mygene": prune_mygene,
+    "myvariant": prune_myvariant,
+    "ensembl_vep": prune_ensembl_vep,
+}
+
+
+def _largest_list(obj: Any) -> Tuple[int, Any]:
+    # (serialized size, list) of the biggest list with more than one element
+    best: Tuple[int, Any] = (0, None)
+    if isinstance(obj, dict):
+        children = obj.values()
+    elif isinstance(obj, list):
+        if len(obj) > 1:
+            best = (len(json.dumps(obj)), obj)
+        children = obj
+    else:
+        return best
+    for child in children:
+        candidate = _largest_list(child)
+        if candidate[0] > best[0]:
+            best = candidate
+    return best
+
+
+def prune_sources(sources: Dict[str, Any], token_budget: int = DEFAULT_TOKEN_BUDGET) -> Tuple[Dict[str, Any], Dict[str, int]]:
+    """
+    Keeps only the fields the summary sections use, then halves the largest
+    remaining lists (variants, frequencies, ...) until the payload fits
+    token_budget. Returns the pruned sources and before/after sizes.
+    """
+    pruned = {}
+    for name, payload in sources.items():
+        pruner = PRUNERS.get(name)
+        try:
+            pruned[name] = pruner(payload) if pruner and payload else payload
+        except Exception:
+            # unexpected shape from upstream, better to send it raw than to drop it
+            pruned[name] = payload
+
+    text = json.dumps(pruned)
+    # work on a private copy, trimming must never touch the raw_data we hand back to callers
+    pruned = json.loads(text)
+    while estimate_tokens(text) > token_budget:
+        size, biggest = _largest_list(pruned)
+        if biggest is None:
+            break
+        del biggest[max(1, len(biggest) // 2):]
+        text = json.dumps(pruned)
+
+    before = len(json.dumps(sources, indent=2))
+    return pruned, {
+        "source_chars_before": before,
+        "source_chars_after": len(text),
+        "source_tokens_before": before // CHARS_PER_TOKEN + 1,
+        "source_tokens_after": estimate_tokens(text),
+    }
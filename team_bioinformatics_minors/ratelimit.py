@@ -0,0 +1,288 @@
+import asyncio
+import contextlib
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+
+class HostLimit:
+    """
+    Published limits for one upstream host. rate is requests per second
+    (None = no pacing), keyed_rate applies instead when the API key in
+    key_env is set, which is then sent as the key_param query parameter.
+    """
+
+    __slots__ = ("rate", "burst", "max_concurrency", "keyed_rate", "key_env", "key_param")
+
+    def __init__(self, rate: Optional[float] = None, burst: Optional[int] = None, max_concurrency: int = 10,
+                 keyed_rate: Optional[float] = None, key_env: Optional[str] = None, key_param: Optional[str] = None):
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.keyed_rate = keyed_rate
+        self.key_env = key_env
+        self.key_param = key_param
+
+    @property
+    def api_key(self) -> Optional[str]:
+        return os.getenv(self.key_env) if self.key_env else None
+
+    def effective_rate(self) -> Optional[float]:
+        return self.keyed_rate if self.api_key and self.keyed_rate else self.rate
+
+
+# https://www.ncbi.nlm.nih.gov/books/NBK25497/ (3/s, 10/s with an API key)
+# https://github.com/Ensembl/ensembl-rest/wiki/Rate-Limits (15/s)
+HOST_LIMITS: Dict[str, HostLimit] = {
+    "eutils.ncbi.nlm.nih.gov": HostLimit(rate=3, max_concurrency=3, keyed_rate=10,
+                                         key_env="NCBI_API_KEY", key_param="api_key"),
+    "rest.ensembl.org": HostLimit(rate=15, max_concurrency=6),
+    "mygene.info": HostLimit(max_concurrency=10),
+    "myvariant.info": HostLimit(max_concurrency=10),
+    "clinicaltables.nlm.nih.gov": HostLimit(max_concurrency=6),
+    "rest.uniprot.org": HostLimit(max_concurrency=6),
+}
+DEFAULT_LIMIT = HostLimit(max_concurrency=10)
+
+# errors that mean "slow down" rather than "this request is wrong"
+THROTTLE_STATUSES = (429, 503)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    # Retry-After is either a number of seconds or an HTTP date
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    rate tokens per second, up to burst saved up. reserve() hands out a
+    token immediately and returns how long the caller has to wait for it,
+    so waiters are served in arrival order without polling.
+    """
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            debt = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(0.0, self._paused_until - now) + debt
+
+    def pause(self, seconds: float):
+        # server told us to back off: nobody gets a token before then, and no burst afterwards
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = min(self._tokens, 0.0)
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD limit on requests in flight: +1/limit per success (about +1 per
+    round trip of the whole window), halved on a throttling error, at most
+    once per cooldown so one burst of 429s counts once. Threads (acquire)
+    and coroutines (acquire_async) count against the same limit.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1, cooldown: float = 1.0):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.cooldown = cooldown
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self.waiting = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+        # coroutines waiting for a slot, woken on their own loop by release()
+        self._async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    def acquire(self):
+        with self._cond:
+            self.waiting += 1
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.waiting -= 1
+            self.in_flight += 1
+
+    async def acquire_async(self):
+        loop = asyncio.get_running_loop()
+        waiter = None
+        try:
+            while True:
+                with self._cond:
+                    if self.in_flight < int(self.limit):
+                        self.in_flight += 1
+                        return
+                    if waiter is None:
+                        self.waiting += 1
+                    waiter = loop.create_future()
+                    self._async_waiters.append((loop, waiter))
+                await waiter
+        finally:
+            if waiter is not None:
+                with self._cond:
+                    self.waiting -= 1
+
+    def release(self, throttled: bool):
+        with self._cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if throttled:
+                if now - self._last_decrease >= self.cooldown:
+                    self.limit = max(self.min_limit, self.limit / 2)
+                    self._last_decrease = now
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, waiter)
+            except RuntimeError:
+                # that loop is closed, nobody is waiting there anymore
+                pass
+
+
+def _wake(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class Ticket:
+    # what the caller learned from the response, read back when the slot is released
+    __slots__ = ("throttled", "retry_after", "waited")
+
+    def __init__(self):
+        self.throttled = False
+        self.retry_after: Optional[float] = None
+        self.waited = 0.0
+
+    def report(self, status: Optional[int], retry_after: Optional[str] = None):
+        if status is None or status in THROTTLE_STATUSES:
+            self.throttled = True
+            self.retry_after = parse_retry_after(retry_after)
+
+
+class HostScheduler:
+    """
+    Paces one host: a concurrency slot first (adaptive), then a token from
+    the host's bucket. Keeps queue depth and wait time metrics. slot() is
+    for threads, aslot() for coroutines; both share the limit and metrics.
+    """
+
+    def __init__(self, host: str, limit: HostLimit):
+        self.host = host
+        self.limit = limit
+        rate = limit.effective_rate()
+        self.bucket = TokenBucket(rate, limit.burst) if rate else None
+        self.concurrency = AdaptiveConcurrency(limit.max_concurrency)
+        self.requests = 0
+        self.throttled = 0
+        self.max_queue_depth = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def slot(self) -> Iterator[Ticket]:
+        started = self._queued()
+        self.concurrency.acquire()
+        ticket = Ticket()
+        try:
+            delay = self.bucket.reserve() if self.bucket else 0.0
+            if delay:
+                time.sleep(delay)
+            self._started(ticket, started)
+            yield ticket
+        finally:
+            self._release(ticket)
+
+    @contextlib.asynccontextmanager
+    async def aslot(self) -> AsyncIterator[Ticket]:
+        started = self._queued()
+        await self.concurrency.acquire_async()
+        ticket = Ticket()
+        try:
+            delay = self.bucket.reserve() if self.bucket else 0.0
+            if delay:
+                await asyncio.sleep(delay)
+            self._started(ticket, started)
+            yield ticket
+        finally:
+            self._release(ticket)
+
+    def _queued(self) -> float:
+        with self._lock:
+            self.max_queue_depth = max(self.max_queue_depth, self.concurrency.waiting + 1)
+        return time.monotonic()
+
+    def _started(self, ticket: Ticket, started: float):
+        waited = ticket.waited = time.monotonic() - started
+        with self._lock:
+            self.requests += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+    def _release(self, ticket: Ticket):
+        if ticket.throttled:
+            with self._lock:
+                self.throttled += 1
+            if self.bucket and ticket.retry_after:
+                self.bucket.pause(ticket.retry_after)
+        self.concurrency.release(ticket.throttled)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            requests = self.requests
+            return {
+                "rate_per_s": self.bucket.rate if self.bucket else None,
+                "concurrency_limit": round(self.concurrency.limit, 2),
+                "max_concurrency": self.limit.max_concurrency,
+                "in_flight": self.concurrency.in_flight,
+                "queue_depth": self.concurrency.waiting,
+                "max_queue_depth": self.max_queue_depth,
+                "requests": requests,
+                "throttled": self.throttled,
+                "wait_ms_avg": round(self.wait_total / requests * 1000, 2) if requests else 0.0,
+                "wait_ms_max": round(self.wait_max * 1000, 2),
+            }
+
+
+class RateLimiter:
+    """One HostScheduler per upstream host, created on first use."""
+
+    def __init__(self, limits: Optional[Dict[str, HostLimit]] = None, default: HostLimit = DEFAULT_LIMIT):
+        self.limits = HOST_LIMITS if limits is None else limits
+        self.default = default
+        self._schedulers: Dict[str, HostScheduler] = {}
+        self._lock = threading.Lock()
+
+    def scheduler(self, host: str) -> HostScheduler:
+        with self._lock:
+            if host not in self._schedulers:
+                self._schedulers[host] = HostScheduler(host, self.limits.get(host, self.default))
+            return self._schedulers[host]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            schedulers = dict(self._schedulers)
+        return {host: s.stats() for host, s in sorted(schedulers.items())}
@@ -0,0 +1,108 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from deadline import DeadlineExceeded, current_deadline
+
+
+class _AsyncCall:
+    __slots__ = ("task", "callers")
+
+    def __init__(self, task: "asyncio.Task"):
+        self.task = task
+        self.callers = 0
+
+
+class SingleFlight:
+    """
+    Runs concurrent calls that share a key only once: the first caller
+    starts the work as a task of its own and every caller, the first one
+    included, awaits that task and receives the same value (or the same
+    exception). A caller being cancelled only stops its own wait; the work
+    is cancelled once no caller is left. A caller that joined someone
+    else's work waits no longer than its own deadline, then gets
+    DeadlineExceeded while the work carries on for the others. Calls only
+    join work running on their own event loop (the sync API shares one, see
+    background_loop.py).
+    Nothing is remembered once the call finishes, that is the caches' job.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.executed = 0
+        self.coalesced = 0
+        self._calls: Dict[Tuple[Any, Hashable], _AsyncCall] = {}
+        self._lock = threading.Lock()
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Returns (value, shared); shared is True for callers that joined
+        someone else's call. Raises DeadlineExceeded for a joining caller
+        whose deadline passes first.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            call = self._calls.get((loop, key))
+            leader = call is None
+            if leader:
+                call = self._calls[(loop, key)] = _AsyncCall(loop.create_task(fn()))
+                call.task.add_done_callback(lambda task: self._finish(loop, key, call))
+                self.executed += 1
+            else:
+                self.coalesced += 1
+            call.callers += 1
+
+        # the leader's work runs under the leader's deadline, which may be later than a joining caller's
+        deadline = None if leader else current_deadline()
+        try:
+            return await asyncio.wait_for(asyncio.shield(call.task),
+                                          deadline.remaining() if deadline is not None else None), not leader
+        except (asyncio.CancelledError, asyncio.TimeoutError) as e:
+            if call.task.done():
+                raise
+            with self._lock:
+                call.callers -= 1
+                abandoned = call.callers == 0
+                if abandoned and self._calls.get((loop, key)) is call:
+                    # nobody may join work that is about to be cancelled
+                    del self._calls[(loop, key)]
+            if abandoned:
+                call.task.cancel()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise DeadlineExceeded(f"deadline of {deadline.seconds:g}s exceeded waiting for {self.name} {key!r}") from None
+
+    def _finish(self, loop: asyncio.AbstractEventLoop, key: Hashable, call: _AsyncCall):
+        with self._lock:
+            if self._calls.get((loop, key)) is call:
+                del self._calls[(loop, key)]
+        # every caller may be gone, don't let asyncio warn about an unretrieved exception
+        if not call.task.cancelled():
+            call.task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"executed": self.executed, "coalesced": self.coalesced, "in_flight": len(self._calls)}
+
+
+class FlightGroups:
+    """
+    One SingleFlight per kind of work ("collector", "collect", "run"),
+    created on first use. Each agent has its own, so only calls made with
+    the same transport, caches and settings are joined.
+    """
+
+    def __init__(self):
+        self._groups: Dict[str, SingleFlight] = {}
+        self._lock = threading.Lock()
+
+    def group(self, name: str) -> SingleFlight:
+        with self._lock:
+            if name not in self._groups:
+                self._groups[name] = SingleFlight(name)
+            return self._groups[name]
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            groups = dict(self._groups)
+        return {name: group.stats() for name, group in sorted(groups.items())}
@@ -0,0 +1,163 @@
+import contextlib
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+_current_tracer: contextvars.ContextVar = contextvars.ContextVar("bioinfo_tracer", default=None)
+_current_span: contextvars.ContextVar = contextvars.ContextVar("bioinfo_span", default=None)
+
+
+class Span:
+    __slots__ = ("span_id", "parent_id", "name", "category", "start_ns", "end_ns", "thread_id", "attrs")
+
+    def __init__(self, span_id: int, parent_id: Optional[int], name: str, category: str, attrs: Dict[str, Any]):
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.name = name
+        self.category = category
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns: Optional[int] = None
+        self.thread_id = threading.get_ident()
+        self.attrs = attrs
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.perf_counter_ns()
+        return (end - self.start_ns) / 1e6
+
+    def set(self, **attrs: Any):
+        self.attrs.update(attrs)
+
+
+class Tracer:
+    """
+    Collects nested spans for one BioinfoAgent.run(). The active tracer and
+    parent span travel in context variables, so spans opened on worker
+    threads nest correctly as long as the work is submitted with
+    contextvars.copy_context() (see traced_submit).
+    """
+
+    def __init__(self, name: str = "run"):
+        self.name = name
+        self.wall_start = time.time()
+        self.origin_ns = time.perf_counter_ns()
+        self.spans: List[Span] = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def activate(self) -> Iterator["Tracer"]:
+        token = _current_tracer.set(self)
+        try:
+            yield self
+        finally:
+            _current_tracer.reset(token)
+
+    def start_span(self, name: str, category: str, attrs: Dict[str, Any]) -> Span:
+        parent = _current_span.get()
+        with self._lock:
+            span = Span(next(self._ids), parent.span_id if parent else None, name, category, attrs)
+            self.spans.append(span)
+        return span
+
+    def breakdown(self) -> Dict[str, Any]:
+        """
+        Wall time of the root span plus time per category (llm, http,
+        collector, json, ...) and per span name, in milliseconds.
+        """
+        roots = [s for s in self.spans if s.parent_id is None]
+        by_category: Dict[str, float] = {}
+        by_name: Dict[str, float] = {}
+        for s in self.spans:
+            by_category[s.category] = by_category.get(s.category, 0.0) + s.duration_ms
+            by_name[s.name] = by_name.get(s.name, 0.0) + s.duration_ms
+        return {
+            "total_ms": round(sum(s.duration_ms for s in roots), 3),
+            "by_category_ms": {k: round(v, 3) for k, v in sorted(by_category.items())},
+            "by_span_ms": {k: round(v, 3) for k, v in sorted(by_name.items())},
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "started_at": self.wall_start,
+            "spans": [
+                {
+                    "id": s.span_id,
+                    "parent_id": s.parent_id,
+                    "name": s.name,
+                    "category": s.category,
+                    "start_ms": round((s.start_ns - self.origin_ns) / 1e6, 3),
+                    "duration_ms": round(s.duration_ms, 3),
+                    "thread_id": s.thread_id,
+                    "attrs": s.attrs,
+                }
+                for s in self.spans
+            ],
+        }
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.to_dict(), default=str, **kwargs)
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        # load in chrome://tracing or https://ui.perfetto.dev
+        pid = os.getpid()
+        events = [
+            {
+                "name": s.name,
+                "cat": s.category,
+                "ph": "X",
+                "ts": (s.start_ns - self.origin_ns) / 1e3,
+                "dur": s.duration_ms * 1e3,
+                "pid": pid,
+                "tid": s.thread_id,
+                "args": dict(s.attrs, span_id=s.span_id, parent_id=s.parent_id),
+            }
+            for s in self.spans
+        ]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+class _NoopSpan:
+    def set(self, **attrs: Any):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+@contextlib.contextmanager
+def span(name: str, category: str = "internal", **attrs: Any) -> Iterator[Any]:
+    """
+    Opens a child span of the current one. Does nothing (and costs next to
+    nothing) when no tracer is active.
+    """
+    tracer = _current_tracer.get()
+    if tracer is None:
+        yield _NOOP
+        return
+
+    s = tracer.start_span(name, category, attrs)
+    token = _current_span.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.attrs["error"] = repr(e)
+        raise
+    finally:
+        s.end_ns = time.perf_counter_ns()
+        _current_span.reset(token)
+
+
+def current_span() -> Any:
+    return _current_span.get() or _NOOP
+
+
+def traced_submit(pool, fn: Callable, *args, **kwargs):
+    # executor threads do not inherit context variables, carry the current ones over
+    ctx = contextvars.copy_context()
+    return pool.submit(ctx.run, fn, *args, **kwargs)
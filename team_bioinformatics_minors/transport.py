@@ -0,0 +1,197 @@
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from circuit import BreakerBoard, CircuitOpen, get_breakers
+from deadline import Deadline, current_deadline
+from ratelimit import HostScheduler, RateLimiter
+from tracing import span
+
+if TYPE_CHECKING:
+    import requests
+
+# 429/503 are retried by the rate limiter (host-wide Retry-After), the rest by urllib3
+RETRY_STATUSES = (500, 502, 504)
+# longest Retry-After we are willing to sit out for a single request
+MAX_RETRY_AFTER = 30
+
+
+class HttpTransport:
+    """
+    Blocking HTTP layer of run_batch()'s bulk requests: one requests.Session
+    with a connection pool per upstream host, keep-alive, gzip and
+    retry/backoff, plus per-host pacing (token bucket, adaptive concurrency,
+    Retry-After) through a RateLimiter. It owns the limiter and circuit
+    breakers the collectors' AsyncHttpTransport shares. requests is imported
+    and the session opened on the first request, so agents that never call
+    run_batch() do not load it.
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        retries: int = 3,
+        backoff_factor: float = 0.5,
+        timeout: float = 15,
+        limiter: Optional[RateLimiter] = None,
+        throttle_retries: int = 4,
+        breakers: Optional[BreakerBoard] = None,
+    ):
+        self.timeout = timeout
+        self.backoff_factor = backoff_factor
+        self.limiter = limiter or RateLimiter()
+        self.throttle_retries = throttle_retries
+        self.breakers = breakers or get_breakers()
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.retries = retries
+        self._session: Optional["requests.Session"] = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self) -> "requests.Session":
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    self._session = self._build_session()
+        return self._session
+
+    def _build_session(self) -> "requests.Session":
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        retry = Retry(
+            total=self.retries,
+            connect=self.retries,
+            read=self.retries,
+            status=self.retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(["GET", "POST"]),
+            # urllib3 would otherwise retry 429/503 itself and sleep without pausing the other requests to the host
+            respect_retry_after_header=False,
+            raise_on_status=False,
+        )
+        # pool_connections = number of hosts kept, pool_maxsize = sockets per host
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            max_retries=retry,
+        )
+        session = requests.Session()
+        session.headers.update({"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"})
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def request(self, method: str, url: str, **kwargs) -> "requests.Response":
+        """
+        Within a deadline (deadline.deadline_scope) every attempt's timeout is
+        capped at the time left and DeadlineExceeded is raised once none is.
+        Hosts whose circuit breaker is open fail at once with CircuitOpen.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        parts = urlsplit(url)
+        host = parts.netloc
+        scheduler = self.limiter.scheduler(host)
+        api_key = scheduler.limit.api_key
+        if api_key and scheduler.limit.key_param:
+            kwargs["params"] = dict(kwargs.get("params") or {}, **{scheduler.limit.key_param: api_key})
+        deadline = current_deadline()
+        # loaded on the first request, together with the session
+        import requests
+        session = self.session
+
+        breaker = self.breakers.for_host(host)
+
+        with span(f"{method} {host}", "http", host=host, path=parts.path) as http_span:
+            try:
+                breaker.allow()
+            except CircuitOpen:
+                http_span.set(circuit="open")
+                raise
+            started = time.monotonic()
+            try:
+                response, throttled, waited = self._send(session, method, url, scheduler, deadline, kwargs)
+            except requests.RequestException as e:
+                breaker.record(False, time.monotonic() - started, type(e).__name__)
+                raise
+            except BaseException:
+                # e.g. DeadlineExceeded: our budget ran out, which says nothing about the host
+                breaker.cancel()
+                raise
+            # 4xx is the host answering; 5xx (after urllib3's retries) and connection errors count against it
+            breaker.record(response.status_code < 500, time.monotonic() - started, f"HTTP {response.status_code}")
+
+            retries = 0
+            if response.raw is not None and getattr(response.raw, "retries", None) is not None:
+                retries = len(response.raw.retries.history)
+            # streamed bodies are not read here, fall back to the declared length
+            size = int(response.headers.get("Content-Length", 0)) if kwargs.get("stream") else len(response.content)
+            http_span.set(status=response.status_code, bytes=size, retries=retries, throttled=throttled,
+                          queue_wait_ms=round(waited * 1000, 3))
+        return response
+
+    def _send(self, session: "requests.Session", method: str, url: str, scheduler: HostScheduler,
+              deadline: Optional[Deadline], kwargs: Dict[str, Any]) -> Tuple["requests.Response", int, float]:
+        import requests
+
+        # one logical request: pacing slots plus retries of throttled responses; returns (response, throttled, waited)
+        base_timeout = kwargs["timeout"]
+        waited = 0.0
+        for attempt in range(self.throttle_retries + 1):
+            if deadline is not None:
+                kwargs = dict(kwargs, timeout=deadline.timeout(base_timeout))
+            with scheduler.slot() as ticket:
+                try:
+                    response = session.request(method, url, **kwargs)
+                except requests.RequestException:
+                    ticket.report(None)
+                    raise
+                ticket.report(response.status_code, response.headers.get("Retry-After"))
+            waited += ticket.waited
+            if not ticket.throttled or attempt == self.throttle_retries:
+                break
+            backoff = ticket.retry_after if ticket.retry_after is not None else self.backoff_factor * 2 ** attempt
+            backoff = min(backoff, MAX_RETRY_AFTER)
+            if deadline is not None and backoff >= deadline.remaining():
+                # no time to sit out the pause, hand back the throttled response
+                break
+            # throttled: the whole host is paused for Retry-After, this request tries again after it
+            response.close()
+            time.sleep(backoff)
+        return response, attempt, waited
+
+    def get(self, url: str, **kwargs) -> "requests.Response":
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> "requests.Response":
+        return self.request("POST", url, **kwargs)
+
+    def rate_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Per-host pacing metrics: current adaptive concurrency limit, requests
+        in flight, queue depth (now and max), throttled responses and time
+        spent waiting for a slot or token.
+        """
+        return self.limiter.stats()
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+
+
+_shared_transport: Optional[HttpTransport] = None
+_shared_lock = threading.Lock()
+
+
+def get_transport() -> HttpTransport:
+    # process-wide transport so every agent (and every Streamlit rerun) reuses warm connections
+    global _shared_transport
+    with _shared_lock:
+        if _shared_transport is None:
+            _shared_transport = HttpTransport()
+        return _shared_transport
@@ -0,0 +1,267 @@
+"""
+Local variant store (rsID -> chromosome, position, alleles, gene, ClinVar
+significance) built from a dbSNP and/or ClinVar VCF, so SNP basics are
+answered without the network and are still there when the upstreams are
+slow or down.
+
+    python variant_store.py --vcf GCF_000001405.40.gz --vcf clinvar.vcf.gz
+
+dbSNP VCF: https://ftp.ncbi.nih.gov/snp/latest_release/VCF/
+ClinVar VCF: https://ftp.ncbi.nlm.nih.gov/pub/clinvar/vcf_GRCh38/
+Load files of the same assembly; later files fill in what earlier ones lack
+(ClinVar adds significance and conditions to dbSNP rows).
+"""
+import argparse
+import gzip
+import os
+import re
+import sqlite3
+import threading
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "variant_store.sqlite")
+
+# rsid is the integer part of the rsID, so the primary key doubles as the rsID index
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS variants (
+    rsid INTEGER PRIMARY KEY, chromosome TEXT NOT NULL, position INTEGER NOT NULL, ref TEXT, alt TEXT,
+    gene TEXT, gene_id TEXT, clinical_significance TEXT, conditions TEXT, clinvar_id TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+POSITION_INDEX = "CREATE INDEX IF NOT EXISTS variants_position ON variants (chromosome, position)"
+
+UPSERT = """
+INSERT INTO variants VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (rsid) DO UPDATE SET
+    alt = CASE WHEN alt IS NULL THEN excluded.alt
+               WHEN excluded.alt IS NULL OR instr(',' || alt || ',', ',' || excluded.alt || ',') THEN alt
+               ELSE alt || ',' || excluded.alt END,
+    gene = COALESCE(gene, excluded.gene),
+    gene_id = COALESCE(gene_id, excluded.gene_id),
+    clinical_significance = COALESCE(excluded.clinical_significance, clinical_significance),
+    conditions = COALESCE(excluded.conditions, conditions),
+    clinvar_id = COALESCE(excluded.clinvar_id, clinvar_id)
+"""
+
+# dbSNP VCFs before b152 encode CLNSIG as numbers
+CLNSIG_CODES = {
+    "0": "Uncertain significance", "1": "not provided", "2": "Benign", "3": "Likely benign",
+    "4": "Likely pathogenic", "5": "Pathogenic", "6": "drug response", "7": "histocompatibility", "255": "other",
+}
+# RefSeq chromosome accessions used by the dbSNP VCF
+REFSEQ_CHROMOSOME = re.compile(r"NC_0000(\d\d)\.\d+")
+MITOCHONDRION = "NC_012920"
+BATCH_ROWS = 50000
+
+
+class VariantRecord(NamedTuple):
+    rsid: str
+    chromosome: str
+    position: int
+    ref: Optional[str]
+    alt: Optional[str]
+    gene: Optional[str]
+    gene_id: Optional[str]
+    clinical_significance: Optional[str]
+    conditions: List[str]
+    clinvar_id: Optional[str]
+
+    def alleles(self) -> str:
+        return "/".join(a for a in [self.ref] + (self.alt or "").split(",") if a)
+
+    def as_clinicaltables(self) -> Dict:
+        # same shape as agent.collect_clinicaltables
+        return {"rsid": self.rsid, "chromosome": self.chromosome, "position": str(self.position),
+                "alleles": self.alleles(), "gene": self.gene}
+
+    def as_ncbi_summary(self) -> Dict:
+        # the subset of the dbSNP esummary document the store can answer
+        doc = {
+            "uid": self.rsid[2:], "snp_id": int(self.rsid[2:]),
+            "chr": self.chromosome, "chrpos": f"{self.chromosome}:{self.position}",
+            "genes": [{"name": self.gene, "gene_id": self.gene_id}] if self.gene else [],
+            "clinical_significance": self.clinical_significance.lower().replace(" ", "-").replace("/", ",")
+            if self.clinical_significance else "",
+            "docsum": f"SEQ=[{self.alleles()}]",
+            "source": "local variant store",
+        }
+        if self.conditions:
+            doc["conditions"] = self.conditions
+        return doc
+
+
+def rsid_number(rsid: str) -> Optional[int]:
+    value = rsid.strip().lower()
+    if value.startswith("rs"):
+        value = value[2:]
+    return int(value) if value.isdigit() else None
+
+
+class VariantStore:
+    """Read side of the store, safe to share between threads."""
+
+    def __init__(self, path: str):
+        self.path = path
+        # read-only: the store is only ever written by build_variant_store
+        self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self.meta = dict(self._conn.execute("SELECT key, value FROM meta").fetchall())
+
+    @property
+    def assembly(self) -> Optional[str]:
+        return self.meta.get("assembly")
+
+    def get(self, rsid: str) -> Optional[VariantRecord]:
+        number = rsid_number(rsid)
+        if number is None:
+            return None
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM variants WHERE rsid = ?", (number,)).fetchone()
+        return _record(row) if row else None
+
+    def at(self, chromosome: str, start: int, end: Optional[int] = None) -> List[VariantRecord]:
+        """Variants on chromosome between start and end (inclusive), through the position index."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM variants WHERE chromosome = ? AND position BETWEEN ? AND ? ORDER BY position",
+                (normalize_chromosome(chromosome), start, start if end is None else end),
+            ).fetchall()
+        return [_record(row) for row in rows]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM variants").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+
+def _record(row) -> VariantRecord:
+    return VariantRecord(f"rs{row[0]}", *row[1:8], row[8].split("|") if row[8] else [], row[9])
+
+
+def normalize_chromosome(chrom: str) -> Optional[str]:
+    # "chr17", "17" and "NC_000017.11" all become "17"; unplaced contigs and patches are dropped
+    if chrom.startswith(MITOCHONDRION):
+        return "MT"
+    match = REFSEQ_CHROMOSOME.fullmatch(chrom)
+    if match:
+        number = int(match.group(1))
+        return {23: "X", 24: "Y"}.get(number, str(number))
+    if chrom.startswith("N"):
+        return None
+    chrom = chrom[3:] if chrom.lower().startswith("chr") else chrom
+    return "MT" if chrom == "M" else chrom
+
+
+def _info(field: str) -> Dict[str, str]:
+    info = {}
+    for item in field.split(";"):
+        key, _, value = item.partition("=")
+        info[key] = value
+    return info
+
+
+def _clean(value: Optional[str]) -> Optional[str]:
+    return value.replace("_", " ") if value else None
+
+
+def parse_vcf(path: str, meta: Optional[Dict[str, str]] = None) -> Iterator[tuple]:
+    """
+    Yields one variants row per VCF line with an rsID (the ID column for
+    dbSNP, INFO RS= for ClinVar). Header values like the assembly go into meta.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt") as f:
+        for line in f:
+            if line.startswith("##"):
+                key, _, value = line[2:].rstrip("\n").partition("=")
+                if meta is not None and key in ("reference", "assembly"):
+                    meta.setdefault("assembly", os.path.basename(value))
+                continue
+            if line.startswith("#"):
+                continue
+            chrom, pos, vid, ref, alt, _qual, _filter, info_field = line.rstrip("\n").split("\t", 8)[:8]
+            info = _info(info_field)
+            rsid = rsid_number(vid) if vid.startswith("rs") else rsid_number(info.get("RS", ""))
+            chromosome = normalize_chromosome(chrom)
+            if rsid is None or chromosome is None:
+                continue
+
+            gene = gene_id = None
+            if info.get("GENEINFO"):
+                gene, _, gene_id = info["GENEINFO"].split("|")[0].partition(":")
+            significance = info.get("CLNSIG")
+            if significance:
+                significance = ",".join(CLNSIG_CODES.get(c, c) for c in re.split(r"[|,]", significance)) \
+                    if significance[0].isdigit() else _clean(significance)
+            conditions = [c for c in (_clean(d) for d in re.split(r"[|,]", info.get("CLNDN", "")))
+                          if c and c not in ("not provided", "not specified")]
+            yield (rsid, chromosome, int(pos), ref, None if alt == "." else alt, gene or None, gene_id or None,
+                   significance or None, "|".join(dict.fromkeys(conditions)) or None,
+                   None if vid.startswith("rs") or vid == "." else vid)
+
+
+def build_variant_store(path: str = DEFAULT_STORE_PATH, vcfs: Optional[List[str]] = None) -> int:
+    """
+    (Re)builds the store at path from the given VCFs. Returns the number of
+    distinct rsIDs stored.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    conn = sqlite3.connect(tmp)
+    # bulk load: nothing to recover if the build dies, the old store stays in place
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.executescript(SCHEMA)
+    meta: Dict[str, str] = {}
+    for vcf in vcfs or []:
+        batch = []
+        for row in parse_vcf(vcf, meta):
+            batch.append(row)
+            if len(batch) >= BATCH_ROWS:
+                conn.executemany(UPSERT, batch)
+                batch.clear()
+        conn.executemany(UPSERT, batch)
+        conn.commit()
+    # building the position index once after the load is much faster than maintaining it per insert
+    conn.execute(POSITION_INDEX)
+    conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", meta.items())
+    conn.commit()
+    count = conn.execute("SELECT COUNT(*) FROM variants").fetchone()[0]
+    conn.close()
+    # swap in atomically so running apps never see a half-built store
+    os.replace(tmp, path)
+    return count
+
+
+_shared_store: Optional[VariantStore] = None
+_shared_lock = threading.Lock()
+
+
+def get_variant_store() -> Optional[VariantStore]:
+    """
+    Process-wide store at $BIOINFO_VARIANT_STORE_PATH (default
+    .cache/variant_store.sqlite next to this file), or None if it has not been built.
+    """
+    global _shared_store
+    path = os.getenv("BIOINFO_VARIANT_STORE_PATH", DEFAULT_STORE_PATH)
+    if not path or not os.path.exists(path):
+        return None
+    with _shared_lock:
+        if _shared_store is None:
+            _shared_store = VariantStore(path)
+        return _shared_store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the local variant store from dbSNP / ClinVar VCFs.")
+    parser.add_argument("--vcf", action="append", required=True, help="VCF(.gz) to load (repeatable)")
+    parser.add_argument("--out", default=os.getenv("BIOINFO_VARIANT_STORE_PATH") or DEFAULT_STORE_PATH)
+    args = parser.parse_args()
+    count = build_variant_store(args.out, args.vcf)
+    print(f"stored {count} variants in {args.out}")
@@ -0,0 +1,195 @@
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+# Ensembl calculated consequences, most severe first
+# https://www.ensembl.org/info/genome/variation/prediction/predicted_data.html
+CONSEQUENCE_SEVERITY = [
+    "transcript_ablation", "splice_acceptor_variant", "splice_donor_variant", "stop_gained",
+    "frameshift_variant", "stop_lost", "start_lost", "transcript_amplification", "feature_elongation",
+    "feature_truncation", "inframe_insertion", "inframe_deletion", "missense_variant",
+    "protein_altering_variant", "splice_donor_5th_base_variant", "splice_region_variant",
+    "splice_donor_region_variant", "splice_polypyrimidine_tract_variant", "incomplete_terminal_codon_variant",
+    "start_retained_variant", "stop_retained_variant", "synonymous_variant", "coding_sequence_variant",
+    "mature_miRNA_variant", "5_prime_UTR_variant", "3_prime_UTR_variant", "non_coding_transcript_exon_variant",
+    "intron_variant", "NMD_transcript_variant", "non_coding_transcript_variant", "coding_transcript_variant",
+    "upstream_gene_variant", "downstream_gene_variant", "TFBS_ablation", "TFBS_amplification",
+    "TF_binding_site_variant", "regulatory_region_ablation", "regulatory_region_amplification",
+    "regulatory_region_variant", "intergenic_variant", "sequence_variant",
+]
+# code 0 is reserved for consequences we do not know
+CONSEQUENCE_CODES = {name: code for code, name in enumerate(CONSEQUENCE_SEVERITY, start=1)}
+
+# consequences worth keeping a variant for (variant_priority and the table filter below)
+IMPACTFUL_CONSEQUENCES = frozenset({
+    "stop_gained", "stop_lost", "start_lost",
+    "frameshift_variant", "splice_acceptor_variant", "splice_donor_variant",
+    "transcript_ablation", "transcript_amplification", "missense_variant", "inframe_deletion", "inframe_insertion",
+    "coding_sequence_variant", "protein_altering_variant",
+})
+
+# lookup tables indexed by consequence code, so filtering is a single gather
+IMPACTFUL_LUT = np.zeros(256, dtype=bool)
+IMPACTFUL_LUT[[CONSEQUENCE_CODES[name] for name in IMPACTFUL_CONSEQUENCES]] = True
+SEVERITY_LUT = np.full(256, len(CONSEQUENCE_SEVERITY) + 1, dtype=np.int32)
+SEVERITY_LUT[1:len(CONSEQUENCE_SEVERITY) + 1] = np.arange(1, len(CONSEQUENCE_SEVERITY) + 1)
+
+# one bit per ClinVar label, a variant can carry several
+CLINICAL_SIGNIFICANCE = [
+    "pathogenic", "likely_pathogenic", "uncertain_significance", "likely_benign", "benign",
+    "drug_response", "risk_factor", "protective", "association", "affects",
+    "conflicting_interpretations_of_pathogenicity", "not_provided", "other",
+]
+CLIN_SIG_BITS = {name: 1 << bit for bit, name in enumerate(CLINICAL_SIGNIFICANCE)}
+PATHOGENIC_LABELS = frozenset({"pathogenic", "likely_pathogenic"})
+PATHOGENIC_BIT = CLIN_SIG_BITS["pathogenic"]
+LIKELY_PATHOGENIC_BIT = CLIN_SIG_BITS["likely_pathogenic"]
+
+
+def clin_sig_label(label: str) -> str:
+    # Ensembl mixes "likely pathogenic" and "likely_pathogenic"
+    return label.strip().lower().replace(" ", "_")
+
+
+def variant_priority(v: dict) -> Optional[int]:
+    # 0 = pathogenic / likely pathogenic, 1 = impactful consequence, None = not worth keeping
+    clin_sig = v.get("clinical_significance") or []
+    if any(clin_sig_label(sig) in PATHOGENIC_LABELS for sig in clin_sig):
+        return 0
+    if v.get("consequence_type", "") in IMPACTFUL_CONSEQUENCES:
+        return 1
+    return None
+
+
+class VariantTable:
+    """
+    Column store for Ensembl variation records: ids and alleles as fixed-width
+    byte arrays, positions as int64, consequence and clinical significance as
+    small integer codes. About 30 bytes per variant instead of a full dict.
+    complete is False when part of the gene could not be fetched.
+    """
+
+    __slots__ = ("ids", "regions", "region_codes", "start", "end", "strand", "consequence", "clin_sig", "alleles",
+                 "complete")
+
+    def __init__(self, ids, regions, region_codes, start, end, strand, consequence, clin_sig, alleles,
+                 complete: bool = True):
+        self.ids = ids
+        self.regions = regions
+        self.region_codes = region_codes
+        self.start = start
+        self.end = end
+        self.strand = strand
+        self.consequence = consequence
+        self.clin_sig = clin_sig
+        self.alleles = alleles
+        self.complete = complete
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict]) -> "VariantTable":
+        builder = VariantTableBuilder()
+        for v in records:
+            builder.append(v)
+        return builder.build()
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    def rank_keys(self, indices: np.ndarray) -> np.ndarray:
+        # lower is better: pathogenic, then likely pathogenic, then the rest; severity breaks ties
+        sig = self.clin_sig[indices]
+        tier = 2 - ((sig & LIKELY_PATHOGENIC_BIT) != 0).astype(np.int32)
+        tier[(sig & PATHOGENIC_BIT) != 0] = 0
+        return tier * 256 + SEVERITY_LUT[self.consequence[indices]]
+
+    def high_impact_mask(self) -> np.ndarray:
+        pathogenic = (self.clin_sig & (PATHOGENIC_BIT | LIKELY_PATHOGENIC_BIT)) != 0
+        return pathogenic | IMPACTFUL_LUT[self.consequence]
+
+    def top_k(self, k: int) -> np.ndarray:
+        """
+        Indices of the k highest ranked high-impact variants, most severe first
+        (ties keep genomic order).
+        """
+        candidates = np.flatnonzero(self.high_impact_mask())
+        if len(candidates) == 0 or k <= 0:
+            return candidates[:0]
+
+        keys = self.rank_keys(candidates)
+        if len(candidates) > k:
+            part = np.argpartition(keys, k - 1)[:k]
+            candidates, keys = candidates[part], keys[part]
+        order = np.lexsort((self.start[candidates], keys))
+        return candidates[order]
+
+    def to_records(self, indices: Optional[np.ndarray] = None) -> List[Dict]:
+        if indices is None:
+            indices = np.arange(len(self))
+        records = []
+        for i in indices:
+            bits = int(self.clin_sig[i])
+            code = int(self.consequence[i])
+            records.append({
+                "id": self.ids[i].decode(),
+                "seq_region_name": self.regions[self.region_codes[i]],
+                "start": int(self.start[i]),
+                "end": int(self.end[i]),
+                "strand": int(self.strand[i]),
+                "alleles": self.alleles[i].decode().split("/") if self.alleles[i] else [],
+                "consequence_type": CONSEQUENCE_SEVERITY[code - 1] if code else None,
+                "clinical_significance": [name for name in CLINICAL_SIGNIFICANCE if bits & CLIN_SIG_BITS[name]],
+            })
+        return records
+
+
+class VariantTableBuilder:
+    """
+    Appends records into compact growable arrays while a response streams in;
+    build() freezes them into a VariantTable.
+    """
+
+    def __init__(self):
+        self._ids: List[bytes] = []
+        self._alleles: List[bytes] = []
+        self._regions: Dict[str, int] = {}
+        self._region_codes = array("B")
+        self._start = array("q")
+        self._end = array("q")
+        self._strand = array("b")
+        self._consequence = array("B")
+        self._clin_sig = array("H")
+
+    def __len__(self) -> int:
+        return len(self._start)
+
+    def append(self, v: Dict):
+        region = str(v.get("seq_region_name", ""))
+        if region not in self._regions:
+            self._regions[region] = len(self._regions)
+        bits = 0
+        for label in v.get("clinical_significance") or []:
+            bits |= CLIN_SIG_BITS.get(clin_sig_label(label), CLIN_SIG_BITS["other"])
+
+        self._ids.append(str(v.get("id", "")).encode())
+        self._alleles.append("/".join(v.get("alleles") or []).encode())
+        self._region_codes.append(self._regions[region])
+        self._start.append(int(v.get("start") or 0))
+        self._end.append(int(v.get("end") or 0))
+        self._strand.append(int(v.get("strand") or 0))
+        self._consequence.append(CONSEQUENCE_CODES.get(v.get("consequence_type", ""), 0))
+        self._clin_sig.append(bits)
+
+    def build(self, complete: bool = True) -> VariantTable:
+        return VariantTable(
+            ids=np.array(self._ids, dtype=bytes) if self._ids else np.array([], dtype="S1"),
+            regions=list(self._regions),
+            region_codes=np.frombuffer(self._region_codes, dtype=np.uint8).copy(),
+            start=np.frombuffer(self._start, dtype=np.int64).copy(),
+            end=np.frombuffer(self._end, dtype=np.int64).copy(),
+            strand=np.frombuffer(self._strand, dtype=np.int8).copy(),
+            consequence=np.frombuffer(self._consequence, dtype=np.uint8).copy(),
+            clin_sig=np.frombuffer(self._clin_sig, dtype=np.uint16).copy(),
+            alleles=np.array(self._alleles, dtype=bytes) if self._alleles else np.array([], dtype="S1"),
+            complete=complete,
+        )